@@ -0,0 +1,212 @@
+"""
+Batch generation of NPCs and locations.
+
+Runs several generations concurrently against the AI providers, bounded by a
+semaphore, and keeps generated names unique across the batch and the campaign.
+Results are yielded as each generation completes so callers can stream them.
+"""
+
+import asyncio
+import os
+from typing import Dict, Any, Optional, List, AsyncIterator, Set
+from sqlalchemy.orm import Session
+from app.models import NPC, Location
+from app.schemas import NPCCreate, LocationCreate
+from .generators import NPCGenerator, LocationGenerator
+from .json_parser import extract_int
+from .hedging import hedge_policy
+from .metrics import mark_queued
+from .cache import DEFAULT_SEED
+
+# Default number of provider requests in flight per batch
+BATCH_CONCURRENCY = int(os.getenv("AI_BATCH_CONCURRENCY", "4"))
+
+# How many times a generation is retried when it comes back with a taken name
+MAX_NAME_RETRIES = 2
+
+# Generated NPC fields without a matching column, folded into notes on save
+NPC_NOTE_FIELDS = {
+    'location': 'Found at',
+    'secrets': 'Secrets',
+    'goals': 'Goals',
+    'fears': 'Fears',
+    'relationships': 'Relationships',
+    'plot_hooks': 'Plot hooks',
+    'notable_possessions': 'Notable possessions'
+}
+
+LOCATION_COLUMNS = {
+    'name', 'type', 'population', 'demographics', 'government_type', 'economic_status',
+    'notable_features', 'description', 'history', 'defenses', 'trade_goods',
+    'ambient_description', 'notes'
+}
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Normalize a name for duplicate comparison"""
+    return ' '.join((name or '').lower().split())
+
+
+async def _generate_one(
+    kind: str,
+    campaign_context: Dict[str, Any],
+    locked_fields: Dict[str, Any],
+    location_type: Optional[str],
+    seed: Optional[int]
+) -> Dict[str, Any]:
+    if kind == 'npc':
+        return await NPCGenerator.generate_npc(campaign_context, locked_fields, seed=seed, hedge=hedge_policy('batch'))
+    return await LocationGenerator.generate_location(location_type, campaign_context, locked_fields, seed=seed, hedge=hedge_policy('batch'))
+
+
+async def generate_batch(
+    kind: str,
+    count: int,
+    campaign_context: Dict[str, Any],
+    locked_fields: Optional[Dict[str, Any]] = None,
+    location_type: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    taken_names: Optional[Set[str]] = None,
+    seed: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Generate `count` NPCs or locations concurrently, yielding each as it completes"""
+
+    locked_fields = locked_fields or {}
+    # In deterministic mode each item still needs a seed of its own, or items
+    # with the same prompt would all come back as one cached result
+    if seed is None:
+        seed = DEFAULT_SEED
+    semaphore = asyncio.Semaphore(max(1, concurrency or BATCH_CONCURRENCY))
+    taken = {normalize_name(name) for name in (taken_names or set())}
+    # A locked name is shared by the whole batch on purpose
+    dedupe = not locked_fields.get('name')
+
+    async def run(index: int) -> Dict[str, Any]:
+        item_seed = seed + index if seed is not None else None
+        context = dict(campaign_context)
+        retries = 0
+        mark_queued()
+
+        async with semaphore:
+            data = await _generate_one(kind, context, locked_fields, location_type, item_seed)
+
+            while dedupe and normalize_name(data.get('name')) in taken and retries < MAX_NAME_RETRIES:
+                retries += 1
+                context['avoid_names'] = sorted(taken)
+                if item_seed is not None:
+                    item_seed += count
+                data = await _generate_one(kind, context, locked_fields, location_type, item_seed)
+
+        if dedupe:
+            base_name = data.get('name') or 'Unnamed'
+            name = base_name
+            suffix = 2
+            while normalize_name(name) in taken:
+                name = f"{base_name} ({suffix})"
+                suffix += 1
+            data['name'] = name
+            taken.add(normalize_name(name))
+
+        return {"index": index, "data": data, "name_retries": retries}
+
+    tasks = [asyncio.create_task(run(index)) for index in range(count)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop outstanding generations if the consumer goes away early
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def _split_list(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if item and str(item).strip()]
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return []
+
+
+def npc_create_from_generated(data: Dict[str, Any]) -> NPCCreate:
+    """Map generator output onto the NPC create schema"""
+    notes = [data['notes']] if data.get('notes') else []
+    for field, label in NPC_NOTE_FIELDS.items():
+        if data.get(field):
+            value = data[field]
+            if isinstance(value, list):
+                value = ', '.join(str(item) for item in value)
+            notes.append(f"{label}: {value}")
+
+    return NPCCreate(
+        name=data.get('name') or 'Unnamed',
+        race=data.get('race'),
+        gender=data.get('gender'),
+        age=extract_int(data.get('age')),
+        occupation=data.get('occupation'),
+        personality_traits=_split_list(data.get('personality_traits')),
+        ideals=data.get('ideals'),
+        bonds=data.get('bonds') if isinstance(data.get('bonds'), str) else None,
+        flaws=data.get('flaws'),
+        appearance_description=data.get('appearance'),
+        background=data.get('background'),
+        voice_description=data.get('voice_mannerisms'),
+        notes='\n'.join(notes) or None
+    )
+
+
+def location_create_from_generated(data: Dict[str, Any]) -> LocationCreate:
+    """Map generator output onto the location create schema"""
+    demographics = data.get('demographics')
+    if isinstance(demographics, str):
+        demographics = {'description': demographics}
+    elif not isinstance(demographics, dict):
+        demographics = None
+
+    raw_goods = data.get('trade_goods')
+    if isinstance(raw_goods, list):
+        trade_goods = [item if isinstance(item, dict) else {'name': str(item).strip()} for item in raw_goods if item]
+    else:
+        trade_goods = [{'name': item} for item in _split_list(raw_goods)]
+
+    # Type-specific template fields have no column of their own
+    notes = [data['notes']] if data.get('notes') else []
+    for field, value in data.items():
+        if field in LOCATION_COLUMNS or not value:
+            continue
+        if isinstance(value, list):
+            value = ', '.join(str(item) for item in value)
+        notes.append(f"{field.replace('_', ' ').capitalize()}: {value}")
+
+    return LocationCreate(
+        name=data.get('name') or 'Unnamed Location',
+        type=data.get('type'),
+        population=extract_int(data.get('population')),
+        demographics=demographics,
+        government_type=data.get('government_type'),
+        economic_status=data.get('economic_status'),
+        notable_features=_split_list(data.get('notable_features')),
+        description=data.get('description'),
+        history=data.get('history'),
+        defenses=data.get('defenses') if isinstance(data.get('defenses'), str) else None,
+        trade_goods=trade_goods,
+        ambient_description=data.get('ambient_description'),
+        notes='\n'.join(notes) or None
+    )
+
+
+def persist_generated(db: Session, campaign_id: int, kind: str, items: List[Dict[str, Any]]) -> List[int]:
+    """Save generated NPCs or locations in a single transaction, returning their IDs"""
+    if kind == 'npc':
+        rows = [NPC(**npc_create_from_generated(item).dict(), campaign_id=campaign_id) for item in items]
+    else:
+        rows = [Location(**location_create_from_generated(item).dict(), campaign_id=campaign_id) for item in items]
+
+    try:
+        db.add_all(rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return [row.id for row in rows]
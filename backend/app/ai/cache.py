@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class GenerationCache:
+    """LRU cache of AI generation results keyed by a hash of the request"""
+
+    def __init__(self, max_entries: int = 256, persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+        if persist_path:
+            self._open_store()
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, params: Dict[str, Any]) -> str:
+        """Build the content address for a generation request"""
+        payload = json.dumps(
+            {"provider": provider, "model": model, "prompt": prompt, "params": params},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _open_store(self):
+        """Open the on-disk store and load the most recently used entries"""
+        try:
+            self._db = sqlite3.connect(self.persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS generation_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "latency REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            rows = self._db.execute(
+                "SELECT key, response, latency FROM generation_cache "
+                "ORDER BY last_used DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            # Oldest first so the most recently used entry ends up at the tail
+            for key, response, latency in reversed(rows):
+                self._entries[key] = {"response": response, "latency": latency}
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Generation cache persistence disabled: {e}")
+            self._db = None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry["latency"]
+            if self._db:
+                self._db.execute(
+                    "UPDATE generation_cache SET last_used = ? WHERE key = ?",
+                    (time.time(), key)
+                )
+                self._db.commit()
+            return entry["response"]
+
+    def put(self, key: str, response: str, latency: float):
+        """Store a response along with how long it took to generate"""
+        with self._lock:
+            self._entries[key] = {"response": response, "latency": latency}
+            self._entries.move_to_end(key)
+
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                evicted.append(evicted_key)
+
+            if self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO generation_cache (key, response, latency, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, latency, time.time())
+                )
+                if evicted:
+                    self._db.executemany(
+                        "DELETE FROM generation_cache WHERE key = ?",
+                        [(evicted_key,) for evicted_key in evicted]
+                    )
+                self._db.commit()
+
+    def clear(self):
+        """Drop all cached entries and reset statistics"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.saved_seconds = 0.0
+            if self._db:
+                self._db.execute("DELETE FROM generation_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit rate and saved latency statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._db is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3)
+            }
+
+
+def _default_seed() -> Optional[int]:
+    seed = os.getenv("AI_SEED")
+    return int(seed) if seed not in (None, "") else None
+
+
+# Seed applied to every generation when deterministic mode is enabled globally
+DEFAULT_SEED = _default_seed()
+
+# Global generation cache instance
+generation_cache = GenerationCache(
+    max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "256")),
+    persist_path=os.getenv("AI_CACHE_PATH") or None
+)
@@ -0,0 +1,217 @@
+"""
+Campaign context for the AI generators.
+
+Generation prompts are more useful when they know what already exists in the
+campaign, but listing every NPC and location would make prompts on large
+campaigns slow and expensive. This module keeps a compact one-line summary of
+each NPC, location and organization per campaign, updated incrementally as
+rows change, and picks the entries most relevant to a request until a token
+budget is used up.
+
+Summaries are loaded once per campaign and then refreshed row by row from
+the campaign change feed; the selected context is cached per campaign
+version, so repeated requests cost a dictionary lookup.
+
+Usage:
+    from app.ai.context import context_builder
+
+    campaign_context.update(context_builder.build(db, campaign_id, 'npc', locked_fields=locked))
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple, Set
+from sqlalchemy.orm import Session
+from app.models import NPC, Location, Organization
+from app.campaigns.versioning import campaign_versions, Change
+
+# Default prompt budget for existing campaign entities, in estimated tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "300"))
+
+# Selected contexts kept per process, across all campaigns
+SELECTION_CACHE_SIZE = 256
+
+# Rough characters-per-token ratio used for budgeting
+CHARS_PER_TOKEN = 4
+
+_WORD = re.compile(r"[a-z0-9']{3,}")
+
+_MODELS = {
+    'npcs': NPC,
+    'locations': Location,
+    'organizations': Organization
+}
+
+# Context keys the entries of each table are listed under
+_CONTEXT_KEYS = {
+    'npcs': 'existing_npcs',
+    'locations': 'existing_locations',
+    'organizations': 'existing_organizations'
+}
+
+# How useful each kind of entity is when generating an NPC or a location
+_KIND_WEIGHTS = {
+    'npc': {'locations': 2.0, 'organizations': 1.5, 'npcs': 1.0},
+    'location': {'locations': 2.0, 'organizations': 1.0, 'npcs': 1.0}
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _terms(*values) -> Set[str]:
+    terms = set()
+    for value in values:
+        if value:
+            terms.update(_WORD.findall(str(value).lower()))
+    return terms
+
+
+def _summarize(table: str, row) -> Dict[str, Any]:
+    """Compact one-line description of an entity"""
+    if table == 'npcs':
+        details = ' '.join(part for part in (row.race, row.occupation) if part)
+        terms = _terms(row.name, row.race, row.occupation)
+    elif table == 'locations':
+        details = row.type or ''
+        terms = _terms(row.name, row.type, row.government_type, row.economic_status)
+    else:
+        details = ', '.join(part for part in (row.type, row.scope) if part)
+        terms = _terms(row.name, row.type, row.scope)
+
+    line = f"{row.name} ({details})" if details else row.name
+    return {
+        'line': line,
+        'tokens': estimate_tokens(line) + 1,
+        'terms': terms,
+        'updated': row.updated_at or row.created_at
+    }
+
+
+class CampaignContextBuilder:
+    """Incrementally maintained, budgeted campaign context for generation prompts"""
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET):
+        self.budget = budget
+        self._entries: Dict[int, Dict[Tuple[str, int], Dict[str, Any]]] = {}
+        self._dirty: Dict[int, Set[Change]] = {}
+        self._selections: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        campaign_versions.subscribe(self._on_change)
+
+    def _on_change(self, campaign_id: int, changes: List[Change]):
+        relevant = {change for change in changes if change.table in _MODELS or change.table == 'campaigns'}
+        if not relevant:
+            return
+        with self._lock:
+            if any(change.table == 'campaigns' and change.deleted for change in relevant):
+                self.discard(campaign_id)
+            elif campaign_id in self._entries:
+                self._dirty.setdefault(campaign_id, set()).update(relevant)
+
+    def discard(self, campaign_id: int):
+        """Forget everything cached for a campaign"""
+        with self._lock:
+            self._entries.pop(campaign_id, None)
+            self._dirty.pop(campaign_id, None)
+            for key in [key for key in self._selections if key[0] == campaign_id]:
+                del self._selections[key]
+
+    def _load(self, db: Session, campaign_id: int):
+        entries = {}
+        for table, model in _MODELS.items():
+            for row in db.query(model).filter(model.campaign_id == campaign_id):
+                entries[(table, row.id)] = _summarize(table, row)
+        self._entries[campaign_id] = entries
+        self._dirty.pop(campaign_id, None)
+
+    def _refresh(self, db: Session, campaign_id: int):
+        """Apply pending row changes to a campaign's summaries"""
+        changes = self._dirty.pop(campaign_id, set())
+        entries = self._entries[campaign_id]
+        updated: Dict[str, Set[int]] = {}
+        for change in changes:
+            if change.table not in _MODELS:
+                continue
+            if change.deleted:
+                entries.pop((change.table, change.id), None)
+            else:
+                updated.setdefault(change.table, set()).add(change.id)
+
+        for table, ids in updated.items():
+            model = _MODELS[table]
+            found = set()
+            for row in db.query(model).filter(model.id.in_(ids)):
+                entries[(table, row.id)] = _summarize(table, row)
+                found.add(row.id)
+            for missing in ids - found:
+                entries.pop((table, missing), None)
+
+    def summary(self, db: Session, campaign_id: int) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        """Get the up-to-date entity summaries for a campaign"""
+        with self._lock:
+            if campaign_id not in self._entries:
+                self._load(db, campaign_id)
+            elif self._dirty.get(campaign_id):
+                self._refresh(db, campaign_id)
+            return self._entries[campaign_id]
+
+    def build(
+        self,
+        db: Session,
+        campaign_id: int,
+        kind: str,
+        location_type: Optional[str] = None,
+        locked_fields: Optional[Dict[str, Any]] = None,
+        budget: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Select the most relevant existing entities for a generation request, within a token budget"""
+        budget = self.budget if budget is None else budget
+        locked_fields = locked_fields or {}
+        request_terms = _terms(location_type, *locked_fields.values())
+        version = campaign_versions.get(campaign_id)
+        cache_key = (campaign_id, version, kind, budget, tuple(sorted(request_terms)))
+
+        with self._lock:
+            cached = self._selections.get(cache_key)
+            if cached is not None:
+                self._selections.move_to_end(cache_key)
+                return cached
+
+        entries = self.summary(db, campaign_id)
+        if budget <= 0 or not entries:
+            return {}
+
+        weights = _KIND_WEIGHTS.get(kind, _KIND_WEIGHTS['npc'])
+        # Newer entities break ties, since they are what the DM is working on
+        ranked = sorted(
+            entries.items(),
+            key=lambda item: (
+                3 * len(item[1]['terms'] & request_terms) + weights.get(item[0][0], 1.0),
+                item[1]['updated'] or datetime.min,
+                item[0][1]
+            ),
+            reverse=True
+        )
+
+        selected: Dict[str, List[str]] = {}
+        used = 0
+        for (table, _), entry in ranked:
+            if used + entry['tokens'] > budget:
+                continue
+            selected.setdefault(_CONTEXT_KEYS[table], []).append(entry['line'])
+            used += entry['tokens']
+
+        with self._lock:
+            self._selections[cache_key] = selected
+            while len(self._selections) > SELECTION_CACHE_SIZE:
+                self._selections.popitem(last=False)
+        return selected
+
+
+# Global campaign context builder instance
+context_builder = CampaignContextBuilder()
@@ -0,0 +1,515 @@
+"""
+Semantic search over campaign content.
+
+Each NPC, location, organization, plot hook, event, item, idea and session
+note is embedded from its text fields into a vector. Vectors are stored as
+float32 blobs in the entity_embeddings table, so they survive restarts, and
+held per campaign in a NumPy matrix of unit vectors, so a search is a single
+matrix-vector product.
+
+Two embedding backends are available:
+
+- hashing: a built-in feature-hashing embedder over stemmed words, word pairs
+  and character n-grams; fast, offline, and good at near matches like
+  "smuggler" for "smuggling". Each feature is spread over a few buckets, so a
+  chance collision between unrelated words only moves a score a little
+- ollama: a local Ollama embedding model via /api/embeddings, which also
+  matches on meaning
+
+Embeddings follow the campaign change feed: once a campaign has been
+searched, rows written to it are re-embedded in a background task, and only
+if their text changed. Searching never writes; new vectors are stored by
+that background task.
+
+Configuration:
+    AI_EMBEDDING_BACKEND=hashing      hashing or ollama
+    AI_EMBEDDING_MODEL=nomic-embed-text   Ollama embedding model
+    AI_EMBEDDING_DIM=1024             dimensions of the hashing embedder
+    AI_EMBEDDING_MIN_SCORE=0.2        lowest score returned (defaults per backend)
+    OLLAMA_URL=http://localhost:11434
+
+Usage:
+    from app.ai.embeddings import semantic_index
+
+    matches = await semantic_index.search(db, campaign_id, "the guy who runs the smuggling ring", limit=10)
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import NPC, Location, Organization, PlotHook, Event, Item, Idea, SessionNote, EntityEmbedding
+from app.campaigns.versioning import campaign_versions, Change
+
+EMBEDDING_BACKEND = os.getenv("AI_EMBEDDING_BACKEND", "hashing")
+EMBEDDING_MODEL = os.getenv("AI_EMBEDDING_MODEL", "nomic-embed-text")
+EMBEDDING_DIM = int(os.getenv("AI_EMBEDDING_DIM", "1024"))
+EMBEDDING_MIN_SCORE = os.getenv("AI_EMBEDDING_MIN_SCORE")
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+
+# Longest text embedded per entity; the opening fields carry most of the meaning
+MAX_TEXT_CHARS = 2000
+
+# Text fields embedded for each table, most identifying first
+TEXT_FIELDS = {
+    'npcs': (NPC, ('name', 'race', 'occupation', 'personality_traits', 'background', 'ideals', 'bonds',
+                   'flaws', 'appearance_description', 'voice_description', 'notes')),
+    'locations': (Location, ('name', 'type', 'description', 'history', 'notable_features', 'trade_goods',
+                             'defenses', 'ambient_description', 'notes')),
+    'organizations': (Organization, ('name', 'type', 'goals', 'methods', 'resources', 'reputation', 'notes')),
+    'plot_hooks': (PlotHook, ('title', 'hook_type', 'description', 'notes')),
+    'events': (Event, ('title', 'event_type', 'description', 'notes')),
+    'items': (Item, ('name', 'type', 'rarity', 'description', 'history', 'notes')),
+    'ideas_inbox': (Idea, ('content', 'notes')),
+    'session_notes': (SessionNote, ('title', 'summary', 'detailed_notes', 'dm_notes'))
+}
+
+_TABLE_CODES = {name: code for code, name in enumerate(TEXT_FIELDS)}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "he", "her", "his", "in", "is",
+    "it", "its", "of", "on", "or", "she", "that", "the", "their", "them", "they", "this", "to", "was",
+    "were", "who", "whom", "with", "guy", "one", "someone", "person"
+}
+
+_SUFFIXES = ("ings", "ing", "ers", "er", "ies", "ied", "es", "ed", "ly", "s")
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def entity_text(row, fields: Tuple[str, ...]) -> str:
+    """Text an entity is embedded from"""
+    parts = []
+    for field in fields:
+        value = getattr(row, field, None)
+        if not value:
+            continue
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value if item)
+        elif isinstance(value, dict):
+            value = ", ".join(str(item) for item in value.values() if item)
+        parts.append(str(value).replace("_", " "))
+    return ". ".join(parts)[:MAX_TEXT_CHARS]
+
+
+@lru_cache(maxsize=65536)
+def _buckets(feature: str, dim: int, probes: int) -> Tuple[int, ...]:
+    """Buckets a feature is hashed to, as bucket + 1 signed by the hash's top bit"""
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=4 * probes).digest()
+    buckets = []
+    for start in range(0, len(digest), 4):
+        hashed = int.from_bytes(digest[start:start + 4], "little")
+        # The top bit picks a sign so colliding features tend to cancel out
+        buckets.append(hashed % dim + 1 if hashed & 0x80000000 else -(hashed % dim + 1))
+    return tuple(buckets)
+
+
+class HashingEmbedder:
+    """Feature-hashing embedder; deterministic and needs no model"""
+
+    # Buckets each feature is spread over
+    PROBES = 4
+    # Unrelated text rarely scores above this, even in a campaign of a few hundred entries
+    MIN_SCORE = 0.2
+
+    def __init__(self, dim: int = EMBEDDING_DIM, min_score: float = MIN_SCORE):
+        self.dim = dim
+        self.min_score = min_score
+        self.name = f"hashing-{dim}x{self.PROBES}"
+
+    def _features(self, text: str) -> Tuple[List[str], List[float]]:
+        words = [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+        stems = [_stem(word) for word in words]
+        features = []
+        weights = []
+        for stem in stems:
+            features.append(stem)
+            weights.append(1.0)
+            padded = f"<{stem}>"
+            for start in range(len(padded) - 3):
+                features.append(padded[start:start + 4])
+                weights.append(0.3)
+        for first, second in zip(stems, stems[1:]):
+            features.append(f"{first} {second}")
+            weights.append(0.5)
+        return features, weights
+
+    def embed_one(self, text: str) -> np.ndarray:
+        features, weights = self._features(text)
+        if not features:
+            return np.zeros(self.dim, dtype=np.float32)
+        buckets = np.array([_buckets(feature, self.dim, self.PROBES) for feature in features])
+        # Each probe carries 1/sqrt(PROBES) of the weight, so a feature's norm is unchanged
+        signed = np.sign(buckets) * (np.array(weights)[:, None] * self.PROBES ** -0.5)
+        return np.bincount(np.abs(buckets).ravel() - 1, weights=signed.ravel(), minlength=self.dim).astype(np.float32)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed_one(text) for text in texts])
+
+
+class OllamaEmbedder:
+    """Embeddings from a local Ollama embedding model"""
+
+    # Sentence embedding models score loosely related text around 0.3-0.4
+    MIN_SCORE = 0.45
+
+    def __init__(self, base_url: str = OLLAMA_URL, model: str = EMBEDDING_MODEL, concurrency: int = 4,
+                 min_score: float = MIN_SCORE):
+        self.base_url = base_url
+        self.model = model
+        self.min_score = min_score
+        self.name = f"ollama-{model}"
+        self.client = httpx.AsyncClient(timeout=60.0)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _embed_one(self, text: str) -> List[float]:
+        async with self._semaphore:
+            response = await self.client.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": self.model, "prompt": text}
+            )
+            response.raise_for_status()
+            return response.json()["embedding"]
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = await asyncio.gather(*(self._embed_one(text) for text in texts))
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def create_embedder(backend: str = EMBEDDING_BACKEND):
+    options = {"min_score": float(EMBEDDING_MIN_SCORE)} if EMBEDDING_MIN_SCORE else {}
+    if backend == "ollama":
+        return OllamaEmbedder(**options)
+    if backend == "hashing":
+        return HashingEmbedder(**options)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so a dot product is the cosine similarity"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorTable:
+    """Growable matrix of unit vectors with a key per row"""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.keys: List[Tuple[str, int]] = []
+        self.hashes: List[str] = []
+        self.rows: Dict[Tuple[str, int], int] = {}
+        self.matrix = np.zeros((16, dim), dtype=np.float32)
+        # Position in TEXT_FIELDS of each row's table, so a table's rows are one mask away
+        self.table_codes = np.zeros(16, dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def content_hash(self, key: Tuple[str, int]) -> Optional[str]:
+        row = self.rows.get(key)
+        return self.hashes[row] if row is not None else None
+
+    def put(self, keys: List[Tuple[str, int]], hashes: List[str], vectors: np.ndarray):
+        """Add or replace the vectors of `keys`"""
+        for key, content_hash, vector in zip(keys, hashes, vectors):
+            row = self.rows.get(key)
+            if row is None:
+                row = len(self.keys)
+                if row == len(self.matrix):
+                    grown = np.zeros((len(self.matrix) * 2, self.dim), dtype=np.float32)
+                    grown[:row] = self.matrix[:row]
+                    self.matrix = grown
+                    self.table_codes = np.resize(self.table_codes, len(grown))
+                self.table_codes[row] = _TABLE_CODES[key[0]]
+                self.keys.append(key)
+                self.hashes.append(content_hash)
+                self.rows[key] = row
+            else:
+                self.hashes[row] = content_hash
+            self.matrix[row] = vector
+
+    def remove(self, key: Tuple[str, int]):
+        # Move the last row into the gap so the matrix stays dense
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            self.matrix[row] = self.matrix[last]
+            self.table_codes[row] = self.table_codes[last]
+            self.keys[row] = self.keys[last]
+            self.hashes[row] = self.hashes[last]
+            self.rows[self.keys[row]] = row
+        self.keys.pop()
+        self.hashes.pop()
+
+    def search(
+        self,
+        query: np.ndarray,
+        limit: int,
+        tables: Optional[Set[str]] = None,
+        min_score: float = 0.0
+    ) -> Dict[str, List[Tuple[int, float]]]:
+        """Best matches per table as (entity id, cosine similarity), highest first"""
+        count = len(self.keys)
+        if not count:
+            return {}
+        scores = self.matrix[:count] @ query
+        codes = self.table_codes[:count]
+
+        results: Dict[str, List[Tuple[int, float]]] = {}
+        for table, code in _TABLE_CODES.items():
+            if tables is not None and table not in tables:
+                continue
+            rows = np.flatnonzero((codes == code) & (scores >= min_score))
+            # Only sort the table's candidates that can make its top results
+            if len(rows) > limit:
+                rows = rows[np.argpartition(-scores[rows], limit - 1)[:limit]]
+            if len(rows):
+                rows = rows[np.argsort(-scores[rows], kind="stable")]
+                results[table] = [(self.keys[row][1], round(float(scores[row]), 4)) for row in rows]
+        return results
+
+
+class SemanticIndex:
+    """Per-campaign embedding index kept in step with the campaign change feed"""
+
+    def __init__(self, embedder=None):
+        self.embedder = embedder or create_embedder()
+        self._tables: Dict[int, VectorTable] = {}
+        self._dirty: Dict[int, Set[Change]] = {}
+        # Vectors not yet written to entity_embeddings: key -> (content hash, vector), or None once removed
+        self._unsaved: Dict[int, Dict[Tuple[str, int], Optional[Tuple[str, np.ndarray]]]] = {}
+        self._updates: Dict[int, asyncio.Task] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._lock = threading.RLock()
+        campaign_versions.subscribe(self._on_change)
+
+    def _on_change(self, campaign_id: int, changes: List[Change]):
+        relevant = {change for change in changes if change.table in TEXT_FIELDS or change.table == 'campaigns'}
+        if not relevant:
+            return
+        with self._lock:
+            if any(change.table == 'campaigns' and change.deleted for change in relevant):
+                self.discard(campaign_id)
+                return
+            if campaign_id not in self._tables:
+                return
+            self._dirty.setdefault(campaign_id, set()).update(relevant)
+        self._schedule_update(campaign_id)
+
+    def discard(self, campaign_id: int):
+        """Forget a campaign's vectors held in memory"""
+        with self._lock:
+            self._tables.pop(campaign_id, None)
+            self._dirty.pop(campaign_id, None)
+            self._unsaved.pop(campaign_id, None)
+
+    def _schedule_update(self, campaign_id: int):
+        """Re-embed changed rows and store new vectors in the background"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop here (a script or worker thread): the next search catches up
+            return
+        with self._lock:
+            update = self._updates.get(campaign_id)
+            if update is None or update.done() or update.get_loop() is not loop:
+                self._updates[campaign_id] = loop.create_task(self._update(campaign_id))
+
+    async def _update(self, campaign_id: int):
+        try:
+            with SessionLocal() as db:
+                while True:
+                    await self.index(db, campaign_id)
+                    self._save(db, campaign_id)
+                    with self._lock:
+                        if not self._dirty.get(campaign_id) and not self._unsaved.get(campaign_id):
+                            break
+        except Exception as e:
+            print(f"Semantic index update failed for campaign {campaign_id}: {e}")
+
+    async def _embed(self, texts: List[str]) -> np.ndarray:
+        return normalize(await self.embedder.embed(texts))
+
+    async def _sync_rows(self, campaign_id: int, table: VectorTable, rows: List[Tuple[str, object]]):
+        """Embed rows whose text changed, to be stored by the next update"""
+        keys, hashes, texts = [], [], []
+        for name, row in rows:
+            text = entity_text(row, TEXT_FIELDS[name][1])
+            content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            key = (name, row.id)
+            if table.content_hash(key) != content_hash:
+                keys.append(key)
+                hashes.append(content_hash)
+                texts.append(text)
+        if not keys:
+            return
+
+        vectors = await self._embed(texts)
+        table.put(keys, hashes, vectors)
+        with self._lock:
+            unsaved = self._unsaved.setdefault(campaign_id, {})
+            for key, content_hash, vector in zip(keys, hashes, vectors):
+                unsaved[key] = (content_hash, vector)
+
+    def _delete_rows(self, campaign_id: int, table: VectorTable, keys: List[Tuple[str, int]]):
+        with self._lock:
+            unsaved = self._unsaved.setdefault(campaign_id, {})
+            for key in keys:
+                table.remove(key)
+                unsaved[key] = None
+
+    def _save(self, db: Session, campaign_id: int):
+        """Write the vectors embedded since the last save to entity_embeddings"""
+        with self._lock:
+            unsaved = self._unsaved.pop(campaign_id, {})
+        if not unsaved:
+            return
+        model = self.embedder.name
+        try:
+            for name in {key[0] for key in unsaved}:
+                removed = [entity_id for (table_name, entity_id), value in unsaved.items() if table_name == name and value is None]
+                if removed:
+                    db.execute(delete(EntityEmbedding).where(
+                        EntityEmbedding.entity_type == name,
+                        EntityEmbedding.entity_id.in_(removed)
+                    ))
+                updated = [entity_id for (table_name, entity_id), value in unsaved.items() if table_name == name and value is not None]
+                if updated:
+                    db.execute(delete(EntityEmbedding).where(
+                        EntityEmbedding.entity_type == name,
+                        EntityEmbedding.entity_id.in_(updated),
+                        EntityEmbedding.model == model
+                    ))
+            stored = [(key, value) for key, value in unsaved.items() if value is not None]
+            if stored:
+                db.execute(insert(EntityEmbedding), [
+                    {
+                        "campaign_id": campaign_id,
+                        "entity_type": name,
+                        "entity_id": entity_id,
+                        "model": model,
+                        "content_hash": content_hash,
+                        "vector": vector.astype(np.float32).tobytes()
+                    }
+                    for (name, entity_id), (content_hash, vector) in stored
+                ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Keep them for the next attempt, unless they've been superseded meanwhile
+            with self._lock:
+                if campaign_id in self._tables:
+                    pending = self._unsaved.setdefault(campaign_id, {})
+                    for key, value in unsaved.items():
+                        pending.setdefault(key, value)
+            raise
+
+    async def _load(self, db: Session, campaign_id: int) -> VectorTable:
+        """Load stored vectors, then embed whatever is missing or out of date"""
+        stored = db.query(
+            EntityEmbedding.entity_type, EntityEmbedding.entity_id, EntityEmbedding.content_hash, EntityEmbedding.vector
+        ).filter(
+            EntityEmbedding.campaign_id == campaign_id,
+            EntityEmbedding.model == self.embedder.name
+        ).all()
+
+        table = None
+        if stored:
+            vectors = np.frombuffer(b"".join(row.vector for row in stored), dtype=np.float32).reshape(len(stored), -1)
+            table = VectorTable(vectors.shape[1])
+            table.put([(row.entity_type, row.entity_id) for row in stored], [row.content_hash for row in stored], vectors)
+
+        rows = []
+        for name, (model, _) in TEXT_FIELDS.items():
+            rows.extend((name, row) for row in db.query(model).filter(model.campaign_id == campaign_id))
+        if table is None:
+            # The dimension of an external model is only known after the first vector
+            sample = await self._embed([""])
+            table = VectorTable(sample.shape[1])
+
+        existing = {(name, row.id) for name, row in rows}
+        stale = [key for key in table.keys if key not in existing]
+        if stale:
+            self._delete_rows(campaign_id, table, stale)
+        await self._sync_rows(campaign_id, table, rows)
+        return table
+
+    async def _refresh(self, db: Session, campaign_id: int, table: VectorTable):
+        """Re-embed the rows changed since the last refresh"""
+        with self._lock:
+            changes = self._dirty.pop(campaign_id, set())
+        removed = [(change.table, change.id) for change in changes if change.deleted and change.table in TEXT_FIELDS]
+        if removed:
+            self._delete_rows(campaign_id, table, removed)
+
+        updated: Dict[str, Set[int]] = {}
+        for change in changes:
+            if not change.deleted and change.table in TEXT_FIELDS:
+                updated.setdefault(change.table, set()).add(change.id)
+        rows = []
+        for name, ids in updated.items():
+            model = TEXT_FIELDS[name][0]
+            rows.extend((name, row) for row in db.query(model).filter(model.id.in_(ids)))
+        await self._sync_rows(campaign_id, table, rows)
+
+    async def index(self, db: Session, campaign_id: int) -> VectorTable:
+        """Get a campaign's up-to-date vectors, building them on first use
+
+        Only reads from `db`; vectors embedded here are stored by a background update.
+        """
+        lock = self._locks.setdefault(campaign_id, asyncio.Lock())
+        async with lock:
+            table = self._tables.get(campaign_id)
+            if table is None:
+                table = await self._load(db, campaign_id)
+                with self._lock:
+                    self._tables[campaign_id] = table
+                    self._dirty.pop(campaign_id, None)
+            elif self._dirty.get(campaign_id):
+                # Changes the background update hasn't reached yet
+                await self._refresh(db, campaign_id, table)
+            return table
+
+    async def search(
+        self,
+        db: Session,
+        campaign_id: int,
+        query: str,
+        limit: int = 10,
+        tables: Optional[Set[str]] = None
+    ) -> Dict[str, List[Tuple[int, float]]]:
+        """Entities closest in meaning to `query`, as (id, score) per table"""
+        table = await self.index(db, campaign_id)
+        if self._unsaved.get(campaign_id):
+            self._schedule_update(campaign_id)
+        vector = (await self._embed([query]))[0]
+        return table.search(vector, limit, tables, self.embedder.min_score)
+
+
+# Global semantic index instance
+semantic_index = SemanticIndex()
@@ -8,7 +8,7 @@ This package contains specialized generators for different types of content:
 Each generator follows a consistent pattern:
 1. Build type-specific prompts with constraints and context
 2. Generate content using AI services
-3. Parse and validate the response
+3. Parse the response with the shared tolerant parser (app.ai.json_parser) and validate it
 4. Return structured data ready for the frontend
 
 Usage:
@@ -1,29 +1,22 @@
-import json
 from typing import Dict, Any, Optional
 from ..service import ai_manager
+from ..json_parser import parse_json_object, extract_int, is_json_object
+from ..hedging import HedgePolicy
+from ..metrics import ai_metrics
+from ..prompts import PromptTemplate, RenderedPrompt, prompt_registry, constraints_section, context_section
 
 
-class LocationGenerator:
-    """Location generation using AI services"""
-    
-    @staticmethod
-    def _build_location_prompt(location_type: str, campaign_context: Optional[Dict] = None, locked_fields: Optional[Dict] = None) -> str:
-        """Build a comprehensive location generation prompt based on type"""
-        
-        # Base prompt varies by location type
-        type_prompts = {
-            'settlement': """You are a creative dungeon master creating a new settlement (city, town, or village) for a tabletop RPG campaign.""",
-            'dungeon': """You are a creative dungeon master creating a new dungeon or underground complex for a tabletop RPG campaign.""",
-            'wilderness': """You are a creative dungeon master creating a new wilderness area or natural location for a tabletop RPG campaign.""",
-            'structure': """You are a creative dungeon master creating a new building or constructed location for a tabletop RPG campaign.""",
-            'region': """You are a creative dungeon master creating a new region or large geographical area for a tabletop RPG campaign."""
-        }
-        
-        base_prompt = type_prompts.get(location_type, type_prompts['settlement'])
-        
-        # Generate type-specific JSON structure based on actual form templates
-        if location_type == 'settlement':
-            json_structure = """{
+LOCATION_INTROS = {
+    'settlement': "You are a creative dungeon master creating a new settlement (city, town, or village) for a tabletop RPG campaign.",
+    'dungeon': "You are a creative dungeon master creating a new dungeon or underground complex for a tabletop RPG campaign.",
+    'wilderness': "You are a creative dungeon master creating a new wilderness area or natural location for a tabletop RPG campaign.",
+    'structure': "You are a creative dungeon master creating a new building or constructed location for a tabletop RPG campaign.",
+    'region': "You are a creative dungeon master creating a new region or large geographical area for a tabletop RPG campaign."
+}
+
+# JSON layouts matching the location form templates
+LOCATION_STRUCTURES = {
+    'settlement': """{
     "name": "settlement name",
     "description": "detailed description of the settlement's appearance and atmosphere",
     "history": "background story and historical significance",
@@ -34,9 +27,8 @@ class LocationGenerator:
     "notable_features": ["notable location 1", "notable location 2", "notable location 3"],
     "trade_goods": ["trade good 1", "trade good 2", "trade good 3"],
     "demographics": "description of who lives here and their composition"
-}"""
-        elif location_type == 'structure':
-            json_structure = """{
+}""",
+    'structure': """{
     "name": "building name",
     "description": "detailed description of the building's appearance and atmosphere",
     "history": "background story and historical significance",
@@ -46,9 +38,8 @@ class LocationGenerator:
     "services": ["service 1", "service 2", "service 3"],
     "security": "security measures and defenses",
     "ambient_description": "sounds, smells, and atmosphere that characters would notice"
-}"""
-        elif location_type == 'dungeon':
-            json_structure = """{
+}""",
+    'dungeon': """{
     "name": "dungeon name",
     "description": "detailed description of the dungeon's appearance and atmosphere",
     "history": "background story and historical significance",
@@ -58,9 +49,8 @@ class LocationGenerator:
     "notable_features": ["feature 1", "feature 2", "feature 3"],
     "treasures": "potential treasures and rewards",
     "ambient_description": "sounds, smells, and atmosphere that characters would notice"
-}"""
-        elif location_type == 'wilderness':
-            json_structure = """{
+}""",
+    'wilderness': """{
     "name": "wilderness area name",
     "description": "detailed description of the natural area's appearance and atmosphere",
     "history": "background story and historical significance",
@@ -71,9 +61,8 @@ class LocationGenerator:
     "wildlife": ["creature 1", "animal 2", "species 3"],
     "resources": ["resource 1", "resource 2", "resource 3"],
     "ambient_description": "sounds, smells, and atmosphere that characters would notice"
-}"""
-        elif location_type == 'region':
-            json_structure = """{
+}""",
+    'region': """{
     "name": "region name",
     "description": "detailed description of the region's geography and atmosphere",
     "history": "background story and historical significance",
@@ -84,9 +73,10 @@ class LocationGenerator:
     "climate": "climate and weather patterns",
     "natural_resources": ["resource 1", "resource 2", "resource 3"]
 }"""
-        else:
-            # Fallback to settlement structure
-            json_structure = """{{
+}
+
+# Used for location types without a form template of their own
+GENERIC_STRUCTURE = """{{
     "name": "location name",
     "type": "{location_type}",
     "description": "detailed description",
@@ -94,14 +84,12 @@ class LocationGenerator:
     "notable_features": ["feature 1", "feature 2"]
 }}"""
 
-        base_prompt += f" Generate a detailed, interesting {location_type} with the following information. Return the response as valid JSON with exactly these fields:\n\n{json_structure}\n\n"
-
-        base_prompt += """IMPORTANT: 
+LOCATION_RULES = """IMPORTANT: 
 - Arrays should contain 2-4 relevant items (notable_features, services, resources, etc.)
 - Text fields like ambient_description, security, owner should be STRINGS not arrays
 - Use appropriate values for the location type
 - Ensure all JSON arrays are properly closed with ]
-- Ensure all JSON objects are properly closed with }}
+- Ensure all JSON objects are properly closed with }
 - Use proper JSON syntax with double quotes around all strings
 - AVOID using quotes within string values - use alternative descriptions
 - Return ONLY the JSON, no additional text
@@ -115,40 +103,25 @@ FANTASY SETTING REQUIREMENTS:
 - Use generic fantasy naming conventions rather than specific real-world cultures
 - Think D&D, Lord of the Rings, or generic fantasy rather than historical periods"""
 
-        # Add type-specific guidance
-        if location_type == 'settlement':
-            base_prompt += """
-
-SETTLEMENT-SPECIFIC GUIDANCE:
+LOCATION_GUIDANCE = {
+    'settlement': """SETTLEMENT-SPECIFIC GUIDANCE:
 - Population should be realistic (hamlet: 50-100, village: 100-1000, town: 1000-5000, city: 5000+)
 - Include appropriate government for size (elder council, mayor, lord, etc.)
 - Consider defensive walls, guards, militia based on size and threat level
-- Trade goods should reflect local resources and crafts"""
-        
-        elif location_type == 'dungeon':
-            base_prompt += """
-
-DUNGEON-SPECIFIC GUIDANCE:
+- Trade goods should reflect local resources and crafts""",
+    'dungeon': """DUNGEON-SPECIFIC GUIDANCE:
 - Population refers to current inhabitants (monsters, cultists, etc.)
 - Government_type refers to hierarchy among inhabitants
 - Economic_status refers to treasure and resources present
 - Notable_features should include traps, puzzles, or unique rooms
-- Consider the dungeon's original purpose and current state"""
-        
-        elif location_type == 'wilderness':
-            base_prompt += """
-
-WILDERNESS-SPECIFIC GUIDANCE:
+- Consider the dungeon's original purpose and current state""",
+    'wilderness': """WILDERNESS-SPECIFIC GUIDANCE:
 - Population refers to wildlife and any inhabitants
 - Government_type could be "natural order" or territorial creatures
 - Economic_status refers to available resources and dangers
 - Notable_features should include terrain, landmarks, and natural hazards
-- Consider seasonal variations and weather patterns"""
-        
-        elif location_type == 'structure':
-            base_prompt += """
-
-STRUCTURE-SPECIFIC GUIDANCE:
+- Consider seasonal variations and weather patterns""",
+    'structure': """STRUCTURE-SPECIFIC GUIDANCE:
 - Population refers to occupants or capacity
 - Government_type refers to management or ownership
 - Economic_status refers to the building's wealth or purpose
@@ -157,48 +130,67 @@ STRUCTURE-SPECIFIC GUIDANCE:
 - For taverns/inns: Include fantasy elements like magical warming, enchanted kegs, rooms warded against scrying
 - For shops: Consider what magical items, spell components, or fantasy goods they might sell
 - For temples: Dedicated to fantasy deities, may have clerical magic or divine blessings
-- Use fantasy architectural elements: stone construction, wooden beams, magical lighting"""
-        
-        elif location_type == 'region':
-            base_prompt += """
-
-REGION-SPECIFIC GUIDANCE:
+- Use fantasy architectural elements: stone construction, wooden beams, magical lighting""",
+    'region': """REGION-SPECIFIC GUIDANCE:
 - Population should be the total across all settlements
 - Government_type refers to regional authority or political structure
 - Economic_status reflects the overall wealth and trade
 - Notable_features should include major landmarks and geographical features
 - Consider climate, terrain, and major settlements within"""
+}
 
-        # Add locked field constraints
-        if locked_fields and any(locked_fields.values()):
-            constraints_info = "\n\nIMPORTANT CONSTRAINTS - Use these EXACT values for the specified fields:\n"
-            for field, value in locked_fields.items():
-                if value:  # Only add non-empty constraints
-                    constraints_info += f"- {field}: {value}\n"
-            constraints_info += "\nGenerate the remaining fields to work well with these locked values. Make sure the location is cohesive and the unlocked fields complement the locked ones."
-            base_prompt += constraints_info
+LOCATION_CLOSING = "Create a unique, memorable location that would fit well in a fantasy setting. Make it interesting with clear purpose, history, and potential for adventures."
 
-        # Add campaign context if provided
-        if campaign_context:
-            context_info = f"\n\nCampaign Context:\n"
-            if campaign_context.get('world_name'):
-                context_info += f"- World: {campaign_context['world_name']}\n"
-            if campaign_context.get('campaign_name'):
-                context_info += f"- Campaign: {campaign_context['campaign_name']}\n"
-            if campaign_context.get('existing_locations'):
-                context_info += f"- Known Locations: {', '.join(campaign_context['existing_locations'])}\n"
-            if campaign_context.get('theme'):
-                context_info += f"- Campaign Theme: {campaign_context['theme']}\n"
-            
-            base_prompt += context_info + "\nConsider this context when creating the location, but don't feel restricted by it."
-        
-        base_prompt += "\n\nIMPORTANT: Return ONLY valid JSON, no additional text or formatting."
-        base_prompt += "\n\nCreate a unique, memorable location that would fit well in a fantasy setting. Make it interesting with clear purpose, history, and potential for adventures."
-        
-        return base_prompt
+
+def _location_suffix(campaign_context: Optional[Dict] = None, locked_fields: Optional[Dict] = None):
+    return [
+        constraints_section(locked_fields, "location"),
+        context_section(campaign_context, "location", include_campaign=True)
+    ]
+
+
+def location_prompt_template(location_type: str) -> PromptTemplate:
+    """Get the compiled template for a location type, compiling it on first use"""
+    name = f"location:{location_type}"
+    template = prompt_registry.get(name)
+    if template is None:
+        json_structure = LOCATION_STRUCTURES.get(location_type) or GENERIC_STRUCTURE.format(location_type=location_type)
+        intro = LOCATION_INTROS.get(location_type, LOCATION_INTROS['settlement'])
+        sections = [
+            f"{intro} Generate a detailed, interesting {location_type} with the following information. "
+            f"Return the response as valid JSON with exactly these fields:\n\n{json_structure}",
+            LOCATION_RULES,
+            LOCATION_GUIDANCE.get(location_type, ""),
+            LOCATION_CLOSING
+        ]
+        template = PromptTemplate(name, [section for section in sections if section], _location_suffix)
+        # Types come from user input, so only the known ones are kept
+        if location_type in LOCATION_STRUCTURES:
+            prompt_registry.register(template)
+    return template
+
+
+# Compile the templates for the known types up front
+for _location_type in LOCATION_INTROS:
+    location_prompt_template(_location_type)
+
+
+class LocationGenerator:
+    """Location generation using AI services"""
     
     @staticmethod
-    async def generate_location(location_type: str, campaign_context: Optional[Dict] = None, locked_fields: Optional[Dict] = None) -> Dict[str, Any]:
+    def _build_location_prompt(location_type: str, campaign_context: Optional[Dict] = None, locked_fields: Optional[Dict] = None) -> RenderedPrompt:
+        """Render the location prompt: the compiled prefix for the type plus a per-request suffix"""
+        return location_prompt_template(location_type).render(campaign_context=campaign_context, locked_fields=locked_fields)
+    
+    @staticmethod
+    async def generate_location(
+        location_type: str,
+        campaign_context: Optional[Dict] = None,
+        locked_fields: Optional[Dict] = None,
+        seed: Optional[int] = None,
+        hedge: Optional[HedgePolicy] = None
+    ) -> Dict[str, Any]:
         """Generate a complete location using AI"""
         
         try:
@@ -206,63 +198,31 @@ REGION-SPECIFIC GUIDANCE:
             
             # Generate the location using AI
             response = await ai_manager.generate_text(
-                prompt,
+                prompt.suffix,
+                prefix=prompt.prefix,  # Static part, reused by providers across requests
                 temperature=0.8,  # Higher creativity
-                max_tokens=1500   # Increased to ensure complete responses
+                max_tokens=1500,  # Increased to ensure complete responses
+                seed=seed,        # Seeded requests are reproducible and cacheable
+                hedge=hedge,
+                validate=is_json_object
             )
             
             # Parse JSON response
+            print(f"Raw AI response: {response}")  # Show full response
             try:
-                print(f"Raw AI response: {response}")  # Show full response
-                
-                # Clean up common JSON issues
-                cleaned_response = response.strip()
-                
-                # Find the JSON object - look for the first { and take everything from there
-                start_idx = cleaned_response.find('{')
-                if start_idx > 0:
-                    cleaned_response = cleaned_response[start_idx:]
-                
-                import re
-                
-                # Fix population field - extract only the numeric value
-                cleaned_response = re.sub(r'"population":\s*"([^"]*?(\d+)[^"]*?)"', r'"population": \2', cleaned_response)
-                
-                # Check if JSON ends with closing brace
-                if not cleaned_response.endswith('}'):
-                    print(f"FIXING: Response doesn't end with }}. Adding closing brace.")
-                    cleaned_response = cleaned_response.rstrip() + '}'
-                else:
-                    print("✓ Response already ends with closing brace")
-                
-                # Count braces to ensure we have a complete JSON object
-                open_braces = cleaned_response.count('{')
-                close_braces = cleaned_response.count('}')
-                print(f"Braces count: {{ = {open_braces}, }} = {close_braces}")
-                
-                if open_braces > close_braces:
-                    missing_braces = open_braces - close_braces
-                    print(f"FIXING: Missing {missing_braces} closing braces. Adding them.")
-                    cleaned_response += '}' * missing_braces
-                else:
-                    print("✓ Brace count is balanced")
-                
-                print(f"Final cleaned response length: {len(cleaned_response)}")
-                print(f"Final ends with: ...{cleaned_response[-50:]}")
-                location_data = json.loads(cleaned_response)
-                
-                # Debug: Check what type the notable_features field is after JSON parsing
-                if 'notable_features' in location_data:
-                    print(f"notable_features type: {type(location_data['notable_features'])}")
-                    print(f"notable_features value: {location_data['notable_features']}")
-                if 'services' in location_data:
-                    print(f"services type: {type(location_data['services'])}")
-                    print(f"services value: {location_data['services']}")
-                
-            except json.JSONDecodeError as e:
+                # Recover the object even from truncated or malformed output
+                location_data = parse_json_object(response)
+            except ValueError as e:
+                # If no JSON could be recovered, create a fallback location
                 print(f"JSON parsing failed: {e}")
                 print(f"Full response: {response}")
-                raise e
+                ai_metrics.record_parse_failure('location')
+                ai_metrics.record_fallback('location', 'parse_failure')
+                return LocationGenerator._create_fallback_location(location_type)
+            
+            # Keep only the numeric part of the population, e.g. "around 1,200"
+            if 'population' in location_data:
+                location_data['population'] = extract_int(location_data['population'])
             
             # Ensure basic fields exist
             location_data['name'] = location_data.get('name', 'Unnamed Location')
@@ -444,15 +404,10 @@ REGION-SPECIFIC GUIDANCE:
                         location_data['terrain_type'] = 'other'
             
             return location_data
-            
-        except json.JSONDecodeError as e:
-            # If JSON parsing fails, create a fallback location
-            print(f"JSON parsing failed: {e}")
-            print(f"Full response: {response}")
-            return LocationGenerator._create_fallback_location(location_type)
         
         except Exception as e:
             print(f"Location generation failed: {e}")
+            ai_metrics.record_fallback('location', 'provider_error')
             return LocationGenerator._create_fallback_location(location_type)
     
     @staticmethod
@@ -1,16 +1,12 @@
-import json
 from typing import Dict, Any, Optional
 from ..service import ai_manager
+from ..json_parser import parse_json_object, extract_int, is_json_object
+from ..hedging import HedgePolicy
+from ..metrics import ai_metrics
+from ..prompts import PromptTemplate, RenderedPrompt, prompt_registry, constraints_section, context_section
 
 
-class NPCGenerator:
-    """NPC generation using AI services"""
-    
-    @staticmethod
-    def _build_npc_prompt(campaign_context: Optional[Dict] = None, locked_fields: Optional[Dict] = None) -> str:
-        """Build a comprehensive NPC generation prompt"""
-        
-        base_prompt = """You are a creative dungeon master creating a new NPC for a tabletop RPG campaign. Generate a detailed, interesting NPC with the following information. Return the response as valid JSON with exactly these fields:
+NPC_INSTRUCTIONS = """You are a creative dungeon master creating a new NPC for a tabletop RPG campaign. Generate a detailed, interesting NPC with the following information. Return the response as valid JSON with exactly these fields:
 
 {
     "name": "full character name",
@@ -48,33 +44,7 @@ Create a unique, memorable character that would fit well in a fantasy setting. M
 
 CRITICAL: Ensure your response is complete and ends with a closing brace }."""
 
-        # Add locked field constraints
-        if locked_fields and any(locked_fields.values()):
-            constraints_info = "\n\nIMPORTANT CONSTRAINTS - Use these EXACT values for the specified fields:\n"
-            for field, value in locked_fields.items():
-                if value:  # Only add non-empty constraints
-                    constraints_info += f"- {field}: {value}\n"
-            constraints_info += "\nGenerate the remaining fields to work well with these locked values. Make sure the character is cohesive and the unlocked fields complement the locked ones."
-            base_prompt += constraints_info
-
-        # Add campaign context if provided
-        if campaign_context:
-            context_info = f"\n\nCampaign Context:\n"
-            if campaign_context.get('world_name'):
-                context_info += f"- World: {campaign_context['world_name']}\n"
-            if campaign_context.get('existing_locations'):
-                context_info += f"- Known Locations: {', '.join(campaign_context['existing_locations'])}\n"
-            if campaign_context.get('theme'):
-                context_info += f"- Campaign Theme: {campaign_context['theme']}\n"
-            
-            base_prompt += context_info + "\nConsider this context when creating the NPC, but don't feel restricted by it."
-        
-        base_prompt += "\n\nIMPORTANT: Return ONLY valid JSON, no additional text or formatting."
-        
-        # Add race-appropriate height guidance
-        base_prompt += """
-
-HEIGHT GUIDANCE BY RACE:
+NPC_HEIGHT_GUIDANCE = """HEIGHT GUIDANCE BY RACE:
 - Dwarves: typically three to four feet tall
 - Halflings: typically three to four feet tall  
 - Gnomes: typically three to four feet tall
@@ -90,11 +60,35 @@ HEIGHT GUIDANCE BY RACE:
 - Half-Elves: typically five to six feet tall
 
 Choose an appropriate height for the character's race."""
-        
-        return base_prompt
+
+
+def _npc_suffix(campaign_context: Optional[Dict] = None, locked_fields: Optional[Dict] = None):
+    return [
+        constraints_section(locked_fields, "character"),
+        context_section(campaign_context, "NPC")
+    ]
+
+
+# Height guidance used to follow the per-request context; it is static, so it
+# now belongs to the shared prefix
+NPC_PROMPT = prompt_registry.register(PromptTemplate('npc', [NPC_INSTRUCTIONS, NPC_HEIGHT_GUIDANCE], _npc_suffix))
+
+
+class NPCGenerator:
+    """NPC generation using AI services"""
     
     @staticmethod
-    async def generate_npc(campaign_context: Optional[Dict] = None, locked_fields: Optional[Dict] = None) -> Dict[str, Any]:
+    def _build_npc_prompt(campaign_context: Optional[Dict] = None, locked_fields: Optional[Dict] = None) -> RenderedPrompt:
+        """Render the NPC prompt: the compiled static prefix plus a per-request suffix"""
+        return NPC_PROMPT.render(campaign_context=campaign_context, locked_fields=locked_fields)
+    
+    @staticmethod
+    async def generate_npc(
+        campaign_context: Optional[Dict] = None,
+        locked_fields: Optional[Dict] = None,
+        seed: Optional[int] = None,
+        hedge: Optional[HedgePolicy] = None
+    ) -> Dict[str, Any]:
         """Generate a complete NPC using AI"""
         
         try:
@@ -102,51 +96,24 @@ Choose an appropriate height for the character's race."""
             
             # Generate the NPC using AI
             response = await ai_manager.generate_text(
-                prompt,
+                prompt.suffix,
+                prefix=prompt.prefix,  # Static part, reused by providers across requests
                 temperature=0.8,  # Higher creativity
-                max_tokens=1500   # Increased to ensure complete responses
+                max_tokens=1500,  # Increased to ensure complete responses
+                seed=seed,        # Seeded requests are reproducible and cacheable
+                hedge=hedge,
+                validate=is_json_object
             )
             
             # Parse JSON response
             try:
                 print(f"Raw AI response: {response}")  # Show full response
                 
-                # Try to parse the raw response directly
-                try:
-                    # Clean up common JSON issues
-                    cleaned_response = response.strip()
-                    
-                    import re
-                    
-                    # Fix age field - extract only the numeric value
-                    cleaned_response = re.sub(r'"age":\s*"([^"]*?(\d+)[^"]*?)"', r'"age": \2', cleaned_response)
-                    
-                    # Check if JSON ends with closing brace
-                    if not cleaned_response.endswith('}'):
-                        print(f"FIXING: Response doesn't end with }}. Adding closing brace.")
-                        cleaned_response = cleaned_response.rstrip() + '}'
-                    else:
-                        print("✓ Response already ends with closing brace")
-                    
-                    # Count braces to ensure we have a complete JSON object
-                    open_braces = cleaned_response.count('{')
-                    close_braces = cleaned_response.count('}')
-                    print(f"Braces count: {{ = {open_braces}, }} = {close_braces}")
-                    
-                    if open_braces > close_braces:
-                        missing_braces = open_braces - close_braces
-                        print(f"FIXING: Missing {missing_braces} closing braces. Adding them.")
-                        cleaned_response += '}' * missing_braces
-                    else:
-                        print("✓ Brace count is balanced")
-                    
-                    print(f"Final cleaned response length: {len(cleaned_response)}")
-                    print(f"Final ends with: ...{cleaned_response[-50:]}")
-                    npc_data = json.loads(cleaned_response)
-                except json.JSONDecodeError as e:
-                    print(f"JSON parsing failed: {e}")
-                    print(f"Full response: {response}")
-                    raise e
+                # Recover the object even from truncated or malformed output
+                npc_data = parse_json_object(response)
+                
+                # Keep only the numeric part of the age, e.g. "about 40 years"
+                npc_data['age'] = extract_int(npc_data.get('age'))
                 
                 # Validate required fields and provide defaults if missing
                 required_fields = {
@@ -191,14 +158,17 @@ Choose an appropriate height for the character's race."""
                 
                 return npc_data
                 
-            except json.JSONDecodeError as e:
-                # If JSON parsing fails, create a fallback NPC
+            except ValueError as e:
+                # If no JSON could be recovered, create a fallback NPC
                 print(f"JSON parsing failed: {e}")
                 print(f"Full response: {response}")
+                ai_metrics.record_parse_failure('npc')
+                ai_metrics.record_fallback('npc', 'parse_failure')
                 return NPCGenerator._create_fallback_npc()
             
         except Exception as e:
             print(f"NPC generation failed: {e}")
+            ai_metrics.record_fallback('npc', 'provider_error')
             return NPCGenerator._create_fallback_npc()
     
     @staticmethod
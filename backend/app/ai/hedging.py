@@ -0,0 +1,161 @@
+"""
+Hedged generation across AI providers.
+
+Without hedging, AIManager tries providers strictly one after another, so a
+hung provider costs its full timeout before the next one is tried. With a
+hedge policy the first provider gets a head start equal to its observed p95
+latency; if it hasn't produced a valid response by then, the next provider
+is started alongside it. The first response that passes validation wins and
+the other requests are cancelled.
+
+Hedging is off by default and enabled per endpoint. Each policy has a cost
+ceiling: a backup provider is only started while the estimated cost of all
+requests launched so far stays under it, so a paid API is never raced
+without limit.
+
+Configuration:
+    AI_HEDGE_ENDPOINTS=npc,location     endpoints that hedge (npc, location, batch, jobs)
+    AI_HEDGE_MAX_COST=0.01              estimated USD ceiling per hedged generation
+    AI_HEDGE_MAX_COST_NPC=0.02          per-endpoint override of the ceiling
+"""
+
+import asyncio
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Estimated USD per 1K tokens (prompt and completion blended) by provider
+PROVIDER_COST_PER_1K_TOKENS = {
+    'local': 0.0,
+    'openai': 0.002,
+    'anthropic': 0.002,
+    'stub': 0.0
+}
+
+# Latency samples needed before a provider's p95 is trusted
+MIN_LATENCY_SAMPLES = 5
+
+DEFAULT_MAX_COST = float(os.getenv("AI_HEDGE_MAX_COST", "0.01"))
+HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "1.0"))
+HEDGE_MAX_DELAY = float(os.getenv("AI_HEDGE_MAX_DELAY", "15.0"))
+
+HEDGED_ENDPOINTS = {
+    endpoint.strip()
+    for endpoint in os.getenv("AI_HEDGE_ENDPOINTS", "").split(",")
+    if endpoint.strip()
+}
+
+
+class HedgePolicy:
+    """When to start a backup provider and how much a generation may cost"""
+
+    def __init__(
+        self,
+        max_cost: float = DEFAULT_MAX_COST,
+        percentile: float = 0.95,
+        min_delay: float = HEDGE_MIN_DELAY,
+        max_delay: float = HEDGE_MAX_DELAY
+    ):
+        self.max_cost = max_cost
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+
+    def delay_for(self, latencies: List[float]) -> float:
+        """Head start for a provider, from its observed latency percentile"""
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return self.max_delay
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile))
+        return min(self.max_delay, max(self.min_delay, ordered[index]))
+
+
+def hedge_policy(endpoint: str) -> Optional[HedgePolicy]:
+    """Get the hedge policy for an endpoint, or None if it doesn't hedge"""
+    if endpoint not in HEDGED_ENDPOINTS:
+        return None
+    max_cost = os.getenv(f"AI_HEDGE_MAX_COST_{endpoint.upper()}")
+    return HedgePolicy(max_cost=float(max_cost) if max_cost else DEFAULT_MAX_COST)
+
+
+def estimate_cost(provider: str, prompt: str, **kwargs) -> float:
+    """Rough USD cost of one request, from prompt length and the completion limit"""
+    prompt_tokens = (len(prompt) + len(kwargs.get("prefix") or "")) / 4
+    tokens = prompt_tokens + kwargs.get("max_tokens", 1000)
+    return tokens / 1000 * PROVIDER_COST_PER_1K_TOKENS.get(provider, 0.0)
+
+
+async def run_hedged(
+    candidates: List[Tuple[str, Callable[[], Any], List[float]]],
+    policy: HedgePolicy,
+    validate: Optional[Callable[[str], bool]],
+    costs: List[float]
+) -> str:
+    """
+    Race providers in order, starting each backup once the previous ones have
+    had their head start. `candidates` holds (name, start coroutine factory,
+    observed latencies) per provider; returns the first valid response.
+    """
+    running: Dict[asyncio.Task, str] = {}
+    spent = 0.0
+    # Candidates not started yet, in order; ones skipped for cost stay here as fallbacks
+    pending = list(range(len(candidates)))
+    skipped = set()
+    errors = []
+
+    def launch() -> Optional[float]:
+        """Start the next affordable provider, returning its head start"""
+        nonlocal spent
+        for index in pending:
+            name, start, latencies = candidates[index]
+            cost = costs[index]
+            # Running two providers at once must fit under the ceiling; plain
+            # fallback after a failure is always allowed, as without hedging
+            if running and spent + cost > policy.max_cost:
+                if index not in skipped:
+                    skipped.add(index)
+                    print(f"Hedge skipped {name}: estimated cost over {policy.max_cost}")
+                continue
+            pending.remove(index)
+            spent += cost
+            running[asyncio.create_task(start())] = name
+            return policy.delay_for(latencies)
+        return None
+
+    delay = launch()
+    try:
+        while running:
+            done, _ = await asyncio.wait(
+                running.keys(),
+                timeout=delay,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done:
+                # Head start used up: bring in a backup if there is one
+                delay = launch()
+                continue
+
+            failed = False
+            for task in done:
+                name = running.pop(task)
+                try:
+                    response = task.result()
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+                    failed = True
+                    continue
+                if validate is None or validate(response):
+                    return response
+                errors.append(f"{name}: response failed validation")
+                failed = True
+
+            # A failed provider is replaced right away instead of after its head start
+            if failed:
+                new_delay = launch()
+                if new_delay is not None:
+                    delay = new_delay
+    finally:
+        for task in running:
+            task.cancel()
+
+    raise Exception(f"All hedged providers failed: {'; '.join(errors) or 'none available'}")
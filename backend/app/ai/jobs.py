@@ -0,0 +1,248 @@
+"""
+Persistent queue for AI generation jobs.
+
+Submitting a job stores it in the ai_jobs table and returns immediately; a
+pool of in-process workers picks queued jobs up and runs the generators. Job
+state and results live in the database, so clients can poll for them, and
+jobs that were queued or running when the server stopped are picked up again
+on the next start.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Any, Optional, Set
+from app.database import SessionLocal
+from app.models import AIJob, Campaign
+from .generators import NPCGenerator, LocationGenerator
+from .context import context_builder
+from .hedging import hedge_policy
+from .metrics import mark_queued
+from .limits import set_current_user
+
+# Number of jobs run concurrently by the worker pool
+JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", "2"))
+
+JOB_KINDS = ('npc', 'location')
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class JobQueue:
+    """In-process worker pool for persisted AI generation jobs"""
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks = []
+        self._running: Dict[int, asyncio.Task] = {}
+        self._waiters: Dict[int, Set[asyncio.Event]] = {}
+        self._stopping = False
+
+    def submit(self, campaign_id: int, user_id: int, kind: str, params: Dict[str, Any]) -> AIJob:
+        """Persist a new job and queue it for the workers"""
+        db = SessionLocal()
+        try:
+            job = AIJob(
+                campaign_id=campaign_id,
+                user_id=user_id,
+                kind=kind,
+                params=params,
+                status="queued"
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+        finally:
+            db.close()
+
+        if self._queue is not None:
+            self._queue.put_nowait(job.id)
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued or running job, returning False if it already finished"""
+        db = SessionLocal()
+        try:
+            job = db.query(AIJob).filter(AIJob.id == job_id).first()
+            if not job or job.status in FINISHED_STATUSES:
+                return False
+            job.status = "cancelled"
+            job.completed_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        self._notify(job_id)
+        return True
+
+    async def wait(self, job_id: int, timeout: float):
+        """Wait until a job finishes or the timeout expires"""
+        event = asyncio.Event()
+        waiters = self._waiters.setdefault(job_id, set())
+        waiters.add(event)
+        try:
+            # Registered first, so a job finishing from here on notifies us;
+            # one that finished before is caught by this check
+            if self._finished(job_id):
+                return
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters.discard(event)
+            if not waiters and self._waiters.get(job_id) is waiters:
+                del self._waiters[job_id]
+
+    def _finished(self, job_id: int) -> bool:
+        db = SessionLocal()
+        try:
+            job_status = db.query(AIJob.status).filter(AIJob.id == job_id).scalar()
+        finally:
+            db.close()
+        return job_status is None or job_status in FINISHED_STATUSES
+
+    def _notify(self, job_id: int):
+        for event in self._waiters.pop(job_id, ()):
+            event.set()
+
+    def _recover(self):
+        """Requeue jobs left queued or running by a previous process"""
+        db = SessionLocal()
+        try:
+            interrupted = db.query(AIJob).filter(AIJob.status == "running").all()
+            for job in interrupted:
+                job.status = "queued"
+                job.started_at = None
+            db.commit()
+
+            pending = db.query(AIJob.id).filter(AIJob.status == "queued").order_by(AIJob.id).all()
+            for (job_id,) in pending:
+                self._queue.put_nowait(job_id)
+        finally:
+            db.close()
+
+    async def _execute(self, kind: str, params: Dict[str, Any], campaign_context: Dict[str, Any]) -> Dict[str, Any]:
+        if kind == 'npc':
+            return await NPCGenerator.generate_npc(
+                campaign_context,
+                params.get('locked_fields'),
+                seed=params.get('seed'),
+                hedge=hedge_policy('jobs')
+            )
+        return await LocationGenerator.generate_location(
+            params.get('location_type') or 'settlement',
+            campaign_context,
+            params.get('locked_fields'),
+            seed=params.get('seed'),
+            hedge=hedge_policy('jobs')
+        )
+
+    async def _run_job(self, job_id: int):
+        db = SessionLocal()
+        try:
+            job = db.query(AIJob).filter(AIJob.id == job_id).first()
+            # Cancelled or already handled while it sat in the queue
+            if not job or job.status != "queued":
+                return
+
+            campaign = db.query(Campaign).filter(Campaign.id == job.campaign_id).first()
+            if not campaign:
+                job.status = "failed"
+                job.error = "Campaign not found"
+                job.completed_at = datetime.utcnow()
+                db.commit()
+                return
+
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            db.commit()
+            if job.created_at:
+                mark_queued((job.started_at - job.created_at).total_seconds())
+            set_current_user(job.user_id)
+
+            campaign_context = {
+                'world_name': campaign.world_name,
+                'campaign_name': campaign.name,
+                'description': campaign.description
+            }
+            kind, params = job.kind, job.params or {}
+            campaign_context.update(context_builder.build(
+                db, campaign.id, kind,
+                location_type=params.get('location_type'),
+                locked_fields=params.get('locked_fields')
+            ))
+        finally:
+            db.close()
+
+        try:
+            result = await self._execute(kind, params, campaign_context)
+            outcome = {"status": "completed", "result": result, "error": None}
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            print(f"AI job {job_id} failed: {e}")
+            outcome = {"status": "failed", "result": None, "error": str(e)}
+
+        db = SessionLocal()
+        try:
+            job = db.query(AIJob).filter(AIJob.id == job_id).first()
+            # Don't overwrite a cancellation that raced with completion
+            if job and job.status == "running":
+                job.status = outcome["status"]
+                job.result = outcome["result"]
+                job.error = outcome["error"]
+                job.completed_at = datetime.utcnow()
+                db.commit()
+        finally:
+            db.close()
+
+    async def _worker(self):
+        # Checked every loop: a job that swallows the shutdown cancellation
+        # lets the worker resume instead of raising
+        while not self._stopping:
+            job_id = await self._queue.get()
+            task = asyncio.create_task(self._run_job(job_id))
+            self._running[job_id] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                # A cancelled job doesn't stop the worker, shutdown does
+                if self._stopping:
+                    raise
+            except Exception as e:
+                print(f"AI job worker error on job {job_id}: {e}")
+            finally:
+                self._running.pop(job_id, None)
+                self._notify(job_id)
+                self._queue.task_done()
+
+    def start(self):
+        """Start the worker pool and pick up unfinished jobs"""
+        if self._queue is not None or self.workers <= 0:
+            return
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self._recover()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; running jobs are requeued on the next start"""
+        self._stopping = True
+        for task in self._worker_tasks + list(self._running.values()):
+            task.cancel()
+        for task in self._worker_tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._worker_tasks = []
+        self._running.clear()
+        self._queue = None
+
+
+# Global job queue instance
+job_queue = JobQueue()
@@ -0,0 +1,284 @@
+"""
+Tolerant JSON extraction for LLM output.
+
+Models rarely return clean JSON: responses come wrapped in prose or code
+fences, get cut off at the token limit, or contain trailing commas, stray
+quotes and raw newlines inside strings. This module recovers as much of the
+object as it can instead of failing the whole generation:
+
+- prose and ``` fences around the JSON are skipped
+- truncated strings, arrays and objects are closed at the end of input
+- a field whose value cannot be parsed is dropped and parsing resumes at the
+  next field, so one bad value doesn't lose the rest of the object
+
+Well-formed JSON takes the fast path through the standard library decoder.
+
+Usage:
+    from app.ai.json_parser import parse_json_object
+
+    data = parse_json_object(response)  # raises ValueError if nothing was recoverable
+"""
+
+import json
+import re
+from typing import Any, Dict, Optional, Tuple
+
+_MISSING = object()
+_NUMBER = re.compile(r'-?\d+(\.\d+)?([eE][+-]?\d+)?$')
+_INTEGER = re.compile(r'-?\d[\d,]*')
+_FENCE = re.compile(r'```[a-zA-Z]*\s*\n?(.*?)(```|$)', re.DOTALL)
+_BARE_KEY = re.compile(r'[A-Za-z_][\w\-]*\s*:')
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '/': '/', '\\': '\\', '"': '"', "'": "'"}
+_LITERALS = {'true': True, 'false': False, 'null': None, 'True': True, 'False': False, 'None': None}
+
+
+class _TolerantParser:
+    """Recursive descent JSON parser that recovers from common LLM mistakes"""
+
+    def __init__(self, text: str, start: int = 0):
+        self.text = text
+        self.pos = start
+        self.length = len(text)
+
+    def _skip_whitespace(self):
+        while self.pos < self.length and self.text[self.pos] in ' \t\r\n':
+            self.pos += 1
+
+    def _at_end(self) -> bool:
+        return self.pos >= self.length
+
+    def parse_value(self) -> Any:
+        self._skip_whitespace()
+        if self._at_end():
+            return _MISSING
+
+        char = self.text[self.pos]
+        if char == '{':
+            return self._parse_object()
+        if char == '[':
+            return self._parse_array()
+        if char in '"\'':
+            return self._parse_string(char)
+        if char in ',:}]':
+            return _MISSING
+        return self._parse_bare()
+
+    def _parse_object(self) -> Dict[str, Any]:
+        self.pos += 1
+        result: Dict[str, Any] = {}
+
+        while True:
+            self._skip_whitespace()
+            if self._at_end():
+                return result
+
+            char = self.text[self.pos]
+            if char == '}':
+                self.pos += 1
+                return result
+            if char in ',]':
+                # Stray separators and mismatched brackets carry no data
+                self.pos += 1
+                continue
+
+            key = self._parse_key()
+            if key is None:
+                self._skip_to_delimiter('}')
+                continue
+
+            self._skip_whitespace()
+            if self._at_end():
+                return result
+            if self.text[self.pos] == ':':
+                self.pos += 1
+
+            value = self.parse_value()
+            if value is not _MISSING:
+                result[key] = value
+            self._skip_to_delimiter('}')
+
+    def _parse_array(self) -> list:
+        self.pos += 1
+        result = []
+
+        while True:
+            self._skip_whitespace()
+            if self._at_end():
+                return result
+
+            char = self.text[self.pos]
+            if char == ']':
+                self.pos += 1
+                return result
+            if char == ',':
+                self.pos += 1
+                continue
+            if char == '}':
+                # Array closed with the wrong bracket. If more fields follow,
+                # the brace stands in for ']'; otherwise it closes the parent
+                after = self.pos + 1
+                while after < self.length and self.text[after] in ' \t\r\n':
+                    after += 1
+                if after < self.length and self.text[after] == ',':
+                    self.pos += 1
+                return result
+
+            value = self.parse_value()
+            if value is not _MISSING:
+                result.append(value)
+            self._skip_to_delimiter(']')
+
+    def _parse_key(self) -> Optional[str]:
+        char = self.text[self.pos]
+        if char in '"\'':
+            return self._parse_string(char, is_key=True)
+
+        # Unquoted key
+        match = re.match(r'[A-Za-z_][\w\- ]*', self.text[self.pos:self.pos + 200])
+        if not match:
+            return None
+        self.pos += match.end()
+        return match.group(0).strip()
+
+    def _is_string_end(self, quote_pos: int, is_key: bool) -> bool:
+        """Decide whether a quote closes the string or is an unescaped quote inside it"""
+        after = quote_pos + 1
+        while after < self.length and self.text[after] in ' \t':
+            after += 1
+        if after >= self.length:
+            return True
+        next_char = self.text[after]
+        if is_key:
+            return next_char in ':,}'
+        if next_char in '}]\r\n':
+            return True
+        if next_char == ',':
+            # Only a structural comma ends the string: one followed by another
+            # value or key (quoted or not), not by more prose
+            after += 1
+            while after < self.length and self.text[after] in ' \t\r\n':
+                after += 1
+            if after >= self.length or self.text[after] in '"\'{[]}-0123456789':
+                return True
+            return _BARE_KEY.match(self.text, after) is not None
+        return False
+
+    def _parse_string(self, quote: str, is_key: bool = False) -> str:
+        self.pos += 1
+        chars = []
+
+        while self.pos < self.length:
+            char = self.text[self.pos]
+            if char == '\\' and self.pos + 1 < self.length:
+                escape = self.text[self.pos + 1]
+                if escape == 'u' and re.match(r'[0-9a-fA-F]{4}', self.text[self.pos + 2:self.pos + 6]):
+                    chars.append(chr(int(self.text[self.pos + 2:self.pos + 6], 16)))
+                    self.pos += 6
+                    continue
+                chars.append(_ESCAPES.get(escape, escape))
+                self.pos += 2
+                continue
+            if char == quote and self._is_string_end(self.pos, is_key):
+                self.pos += 1
+                return ''.join(chars)
+            chars.append(char)
+            self.pos += 1
+
+        # Truncated string: close it at the end of input
+        return ''.join(chars).rstrip()
+
+    def _parse_bare(self) -> Any:
+        start = self.pos
+        while self.pos < self.length and self.text[self.pos] not in ',}]\n':
+            self.pos += 1
+        token = self.text[start:self.pos].strip()
+        if not token:
+            return _MISSING
+        if token in _LITERALS:
+            return _LITERALS[token]
+        if _NUMBER.match(token):
+            number = float(token)
+            return int(number) if number.is_integer() and '.' not in token and 'e' not in token.lower() else number
+        return token
+
+    def _skip_to_delimiter(self, closer: str):
+        """Skip anything between a value and the next comma or closing bracket"""
+        self._skip_whitespace()
+        while not self._at_end():
+            char = self.text[self.pos]
+            if char in ',' + closer:
+                return
+            if closer == '}' and char in '"\'':
+                # Missing comma before the next key
+                return
+            if char in ']}':
+                return
+            self.pos += 1
+
+
+def _candidate_starts(text: str):
+    """Yield positions where a JSON object might begin, code fences first"""
+    for match in _FENCE.finditer(text):
+        fenced_start = text.find('{', match.start(1), match.end(1) if match.group(2) else len(text))
+        if fenced_start >= 0:
+            yield fenced_start
+    start = text.find('{')
+    if start >= 0:
+        yield start
+
+
+def extract_json(text: str) -> Tuple[Optional[Any], bool]:
+    """
+    Extract the first JSON object from LLM output.
+
+    Returns (value, clean) where clean is False if any repair was needed, or
+    (None, False) if no object could be found.
+    """
+    if not text:
+        return None, False
+
+    starts = list(dict.fromkeys(_candidate_starts(text)))
+    decoder = json.JSONDecoder()
+    for start in starts:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            return value, True
+        except json.JSONDecodeError:
+            continue
+
+    for start in starts:
+        value = _TolerantParser(text, start).parse_value()
+        if isinstance(value, dict) and value:
+            return value, False
+
+    return None, False
+
+
+def parse_json_object(text: str) -> Dict[str, Any]:
+    """Parse a JSON object out of LLM output, repairing it where possible"""
+    value, _ = extract_json(text)
+    if not isinstance(value, dict):
+        raise ValueError("No JSON object found in AI response")
+    return value
+
+
+def is_json_object(text: str) -> bool:
+    """Check whether a JSON object can be recovered from LLM output"""
+    value, _ = extract_json(text)
+    return isinstance(value, dict)
+
+
+def extract_int(value: Any) -> Optional[int]:
+    """Pull an integer out of values like 42, "42", "about 1,200 people" or "35 years" """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str):
+        match = _INTEGER.search(value)
+        if match:
+            return int(match.group(0).replace(',', ''))
+    return None
+
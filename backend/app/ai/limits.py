@@ -0,0 +1,163 @@
+"""
+Fair use of the shared AI providers.
+
+Three mechanisms sit in front of AIManager:
+
+- SingleFlight: identical concurrent requests (a double click, a client
+  retry) share one generation instead of starting another
+- RateLimiter: a token bucket per user; requests beyond the budget are
+  rejected with 429 and a Retry-After hint
+- FairScheduler: caps how many generations run at once and hands free slots
+  to waiting users in turn, so one user's batch can't starve everybody else
+
+The user a generation runs for is tracked in a context variable set by the
+endpoints and the job queue, so it follows the request into batch tasks.
+
+Configuration:
+    AI_RATE_LIMIT_PER_MINUTE=30   sustained generations per user (0 disables)
+    AI_RATE_LIMIT_BURST=10        generations a user may start back to back
+    AI_MAX_CONCURRENT=4           generations running at once across all users
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+RATE_LIMIT_PER_MINUTE = float(os.getenv("AI_RATE_LIMIT_PER_MINUTE", "30"))
+RATE_LIMIT_BURST = float(os.getenv("AI_RATE_LIMIT_BURST", "10"))
+MAX_CONCURRENT = int(os.getenv("AI_MAX_CONCURRENT", "4"))
+
+# User the current generation runs for; None for background work like the warm pool
+_current_user: ContextVar[Optional[int]] = ContextVar("ai_current_user", default=None)
+
+
+def set_current_user(user_id: Optional[int]):
+    """Attribute generations started from the current task to a user"""
+    _current_user.set(user_id)
+
+
+def current_user() -> Optional[int]:
+    return _current_user.get()
+
+
+class SingleFlight:
+    """Share one in-flight result between identical concurrent requests"""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    def active(self, key: Hashable) -> bool:
+        """Check whether a request with this key is already running"""
+        return key in self._flights
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._flights.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(factory())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._land(key, done))
+        else:
+            self.coalesced += 1
+        # One caller going away must not cancel the result the others wait for
+        return await asyncio.shield(task)
+
+    def _land(self, key: Hashable, task: asyncio.Task):
+        # A newer flight may already have taken the key
+        if self._flights.get(key) is task:
+            del self._flights[key]
+
+
+class RateLimiter:
+    """Per-user token buckets"""
+
+    def __init__(self, per_minute: float = RATE_LIMIT_PER_MINUTE, burst: float = RATE_LIMIT_BURST):
+        self.rate = per_minute / 60.0
+        self.burst = max(burst, 1.0)
+        self._buckets: Dict[int, Tuple[float, float]] = {}
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, user_id: int, cost: float = 1.0) -> float:
+        """Take `cost` tokens from a user's bucket; returns 0 on success, otherwise seconds until it would succeed"""
+        if not self.enabled:
+            return 0.0
+
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        # A request larger than the bucket can never fit; let it through on a full bucket
+        cost = min(cost, self.burst)
+        if tokens >= cost:
+            self._buckets[user_id] = (tokens - cost, now)
+            return 0.0
+
+        self._buckets[user_id] = (tokens, now)
+        self.rejected += 1
+        return (cost - tokens) / self.rate
+
+    def retry_after(self, wait: float) -> str:
+        """Retry-After header value for a wait in seconds"""
+        return str(max(1, math.ceil(wait)))
+
+
+class FairScheduler:
+    """Concurrency limit with round-robin hand-off of free slots between users"""
+
+    def __init__(self, limit: int = MAX_CONCURRENT):
+        self.limit = limit
+        self.active = 0
+        self._waiting: "OrderedDict[Optional[int], Deque[asyncio.Future]]" = OrderedDict()
+
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._waiting.values())
+
+    async def acquire(self, user_id: Optional[int]):
+        if self.limit <= 0 or (self.active < self.limit and not self._waiting):
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """Give the slot to the next waiting user in turn, or free it"""
+        while self._waiting:
+            user_id, queue = self._waiting.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                # Users with more waiting requests go to the back of the line
+                self._waiting[user_id] = queue
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "limit": self.limit,
+            "waiting": self.waiting(),
+            "waiting_users": len(self._waiting)
+        }
+
+
+# Global instances
+single_flight = SingleFlight()
+rate_limiter = RateLimiter()
+fair_scheduler = FairScheduler()
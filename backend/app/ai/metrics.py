@@ -0,0 +1,265 @@
+"""
+Metrics for AI generation.
+
+Every provider call records its provider, model, queue wait, time to first
+token, total latency, prompt and completion tokens and throughput. The
+generators record parse failures and fallbacks to the built-in NPC and
+location. Values are aggregated in process into counters and fixed-bucket
+histograms, served as JSON from /ai/metrics and in the Prometheus text format
+from /ai/metrics?format=prometheus.
+
+Usage:
+    from app.ai.metrics import ai_metrics
+
+    ai_metrics.observe_call('local', 'llama3.2', latency=2.1, ttft=0.4, prompt_tokens=700, completion_tokens=350)
+    ai_metrics.record_fallback('npc', 'parse_failure')
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple, List
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 40, 80, 160, 320)
+
+# When the current generation was queued, for measuring queue wait
+_queued_since: ContextVar[Optional[float]] = ContextVar("ai_queued_since", default=None)
+
+# Details reported by the provider during the current call (ttft, tokens)
+_call_usage: ContextVar[Optional[Dict[str, Any]]] = ContextVar("ai_call_usage", default=None)
+
+
+def mark_queued(waited: float = 0.0):
+    """Mark the current task as queued, optionally `waited` seconds ago"""
+    _queued_since.set(time.perf_counter() - waited)
+
+
+def take_queue_wait() -> Optional[float]:
+    """Seconds since the current task was marked as queued, clearing the mark"""
+    queued_since = _queued_since.get()
+    if queued_since is None:
+        return None
+    _queued_since.set(None)
+    return time.perf_counter() - queued_since
+
+
+def begin_call():
+    """Start collecting provider-reported details for the current call"""
+    return _call_usage.set({})
+
+
+def end_call(token) -> Dict[str, Any]:
+    """Stop collecting and return what the provider reported"""
+    usage = _call_usage.get() or {}
+    _call_usage.reset(token)
+    return usage
+
+
+def report_usage(**details):
+    """Called by providers with timing and token details of the current call"""
+    usage = _call_usage.get()
+    if usage is not None:
+        usage.update(details)
+
+
+class Histogram:
+    """Cumulative fixed-bucket histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket it falls in"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts[:-1]):
+            seen += count
+            if seen >= target:
+                return min(self.buckets[index], self.max)
+        # Beyond the last bucket the largest observed value is the best bound
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0, "avg": None, "p50": None, "p95": None}
+        return {
+            "count": self.count,
+            "avg": round(self.sum / self.count, 3),
+            "p50": round(self.quantile(0.5), 3),
+            "p95": round(self.quantile(0.95), 3)
+        }
+
+
+class AIMetrics:
+    """In-process counters and histograms for AI generation"""
+
+    # name -> (help text, buckets)
+    HISTOGRAMS = {
+        "ai_request_duration_seconds": ("Total provider request latency", LATENCY_BUCKETS),
+        "ai_time_to_first_token_seconds": ("Time until the provider produced its first token", LATENCY_BUCKETS),
+        "ai_queue_wait_seconds": ("Time a generation waited before reaching a provider", LATENCY_BUCKETS),
+        "ai_prompt_tokens": ("Prompt tokens per request", TOKEN_BUCKETS),
+        "ai_completion_tokens": ("Completion tokens per request", TOKEN_BUCKETS),
+        "ai_tokens_per_second": ("Completion tokens per second of generation", THROUGHPUT_BUCKETS)
+    }
+
+    COUNTERS = {
+        "ai_requests_total": "Provider requests by outcome",
+        "ai_tokens_total": "Tokens processed by direction",
+        "ai_parse_failures_total": "Responses no JSON object could be recovered from",
+        "ai_fallbacks_total": "Generations answered with the built-in fallback content"
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms: Dict[str, Dict[tuple, Histogram]] = {name: {} for name in self.HISTOGRAMS}
+            self._counters: Dict[str, Dict[tuple, float]] = {name: {} for name in self.COUNTERS}
+
+    def _observe(self, name: str, labels: tuple, value: Optional[float]):
+        if value is None:
+            return
+        series = self._histograms[name]
+        if labels not in series:
+            series[labels] = Histogram(self.HISTOGRAMS[name][1])
+        series[labels].observe(value)
+
+    def _inc(self, name: str, labels: tuple, amount: float = 1):
+        series = self._counters[name]
+        series[labels] = series.get(labels, 0) + amount
+
+    def observe_call(
+        self,
+        provider: str,
+        model: str,
+        latency: float,
+        ttft: Optional[float] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        generation_seconds: Optional[float] = None,
+        **_
+    ):
+        """Record a successful provider request"""
+        labels = (("provider", provider), ("model", model))
+        with self._lock:
+            self._inc("ai_requests_total", labels + (("outcome", "success"),))
+            self._observe("ai_request_duration_seconds", labels, latency)
+            self._observe("ai_time_to_first_token_seconds", labels, ttft)
+            self._observe("ai_prompt_tokens", labels, prompt_tokens)
+            self._observe("ai_completion_tokens", labels, completion_tokens)
+            if prompt_tokens:
+                self._inc("ai_tokens_total", labels + (("direction", "prompt"),), prompt_tokens)
+            if completion_tokens:
+                self._inc("ai_tokens_total", labels + (("direction", "completion"),), completion_tokens)
+                # Throughput over the generation phase when the provider reports it,
+                # otherwise over everything after the first token
+                seconds = generation_seconds or (latency - (ttft or 0))
+                if seconds > 0:
+                    self._observe("ai_tokens_per_second", labels, completion_tokens / seconds)
+
+    def observe_outcome(self, provider: str, model: str, outcome: str):
+        """Count a provider request that did not produce a response (error, cache_hit, cancelled)"""
+        with self._lock:
+            self._inc("ai_requests_total", (("provider", provider), ("model", model), ("outcome", outcome)))
+
+    def observe_queue_wait(self, seconds: float):
+        with self._lock:
+            self._observe("ai_queue_wait_seconds", (), seconds)
+
+    def record_parse_failure(self, kind: str):
+        with self._lock:
+            self._inc("ai_parse_failures_total", (("kind", kind),))
+
+    def record_fallback(self, kind: str, reason: str):
+        with self._lock:
+            self._inc("ai_fallbacks_total", (("kind", kind), ("reason", reason)))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Metrics grouped by provider and model, for the JSON endpoint"""
+        with self._lock:
+            providers: Dict[str, Dict[str, Any]] = {}
+            for name, series in self._histograms.items():
+                for labels, histogram in series.items():
+                    if not labels:
+                        continue
+                    key = "/".join(value for _, value in labels)
+                    providers.setdefault(key, {})[name] = histogram.summary()
+            for name in ("ai_requests_total", "ai_tokens_total"):
+                for labels, value in self._counters[name].items():
+                    key = "/".join(value for label, value in labels if label in ("provider", "model"))
+                    detail = dict(labels).get("outcome") or dict(labels).get("direction")
+                    providers.setdefault(key, {}).setdefault(name, {})[detail] = value
+
+            queue = self._histograms["ai_queue_wait_seconds"].get(())
+            return {
+                "providers": providers,
+                "queue_wait_seconds": queue.summary() if queue else None,
+                "parse_failures": {dict(labels)["kind"]: value for labels, value in self._counters["ai_parse_failures_total"].items()},
+                "fallbacks": [
+                    {**dict(labels), "count": value}
+                    for labels, value in self._counters["ai_fallbacks_total"].items()
+                ]
+            }
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            for name, help_text in self.COUNTERS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+            for name, (help_text, buckets) in self.HISTOGRAMS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(list(buckets) + ["+Inf"], histogram.counts):
+                        cumulative += count
+                        bucket_labels = labels + (("le", str(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{label}="{_escape(value)}"' for label, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Global AI metrics instance
+ai_metrics = AIMetrics()
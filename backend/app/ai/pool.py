@@ -0,0 +1,208 @@
+"""
+Warm pool of pre-generated AI content.
+
+Keeps a small stock of ready-made NPCs and locations per campaign so that
+unconstrained generation requests can be answered instantly. A background
+worker tops the pools up one generation at a time, and only while no other
+generation is running, so it never competes with a DM waiting at the table.
+"""
+
+import asyncio
+import os
+from collections import deque
+from typing import Dict, Any, Optional, Tuple, Deque
+from .service import ai_manager
+from .generators import NPCGenerator, LocationGenerator
+
+# Default number of ready items kept per campaign and slot (0 disables the pool)
+POOL_SIZE = int(os.getenv("AI_POOL_SIZE", "0"))
+
+# Location types pooled by default
+POOL_LOCATION_TYPES = [
+    location_type.strip()
+    for location_type in os.getenv("AI_POOL_LOCATION_TYPES", "settlement,structure,dungeon,wilderness,region").split(",")
+    if location_type.strip()
+]
+
+# How often the worker re-checks whether the AI has gone idle
+IDLE_POLL_SECONDS = 2.0
+
+# Pause after a failed refill so an unavailable provider isn't hammered
+FAILURE_BACKOFF_SECONDS = 30.0
+
+
+class WarmPool:
+    """Per-campaign pools of pre-generated NPCs and locations"""
+
+    def __init__(self, default_size: int = POOL_SIZE, location_types: Optional[list] = None):
+        self.default_size = default_size
+        self.location_types = location_types if location_types is not None else POOL_LOCATION_TYPES
+        self._pools: Dict[Tuple[int, str], Deque[Dict[str, Any]]] = {}
+        self._targets: Dict[int, Dict[str, int]] = {}
+        self._contexts: Dict[int, Dict[str, Any]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Set once the app has started; the worker itself waits for a non-zero target
+        self._started = False
+        self.served = 0
+        self.generated = 0
+
+    @staticmethod
+    def slot(kind: str, location_type: Optional[str] = None) -> str:
+        """Name of the pool slot for a content kind"""
+        return 'npc' if kind == 'npc' else f"location:{location_type}"
+
+    def _default_targets(self) -> Dict[str, int]:
+        targets = {'npc': self.default_size}
+        for location_type in self.location_types:
+            targets[self.slot('location', location_type)] = self.default_size
+        return targets
+
+    def register(self, campaign_id: int, campaign_context: Dict[str, Any]):
+        """Record a campaign's generation context so its pools can be refilled"""
+        self._contexts[campaign_id] = dict(campaign_context)
+        if campaign_id not in self._targets:
+            self._targets[campaign_id] = self._default_targets()
+        self._wake()
+
+    def configure(self, campaign_id: int, targets: Dict[str, int]):
+        """Override pool sizes for a campaign, e.g. {"npc": 5, "location:dungeon": 2}"""
+        current = self._targets.setdefault(campaign_id, self._default_targets())
+        for slot, size in targets.items():
+            current[slot] = max(0, int(size))
+            pool = self._pools.get((campaign_id, slot))
+            while pool and len(pool) > current[slot]:
+                pool.pop()
+        self._start_worker()
+        self._wake()
+
+    def take(self, campaign_id: int, slot: str) -> Optional[Dict[str, Any]]:
+        """Take a ready item from a pool, or None if it is empty"""
+        pool = self._pools.get((campaign_id, slot))
+        if not pool:
+            return None
+        self.served += 1
+        self._wake()
+        return pool.popleft()
+
+    def discard(self, campaign_id: int):
+        """Forget everything pooled for a campaign"""
+        self._targets.pop(campaign_id, None)
+        self._contexts.pop(campaign_id, None)
+        for key in [key for key in self._pools if key[0] == campaign_id]:
+            del self._pools[key]
+
+    def status(self, campaign_id: int) -> Dict[str, Any]:
+        """Get ready counts and targets for a campaign's pools"""
+        targets = self._targets.get(campaign_id, self._default_targets())
+        return {
+            "enabled": self._task is not None,
+            "slots": {
+                slot: {"ready": len(self._pools.get((campaign_id, slot), ())), "target": target}
+                for slot, target in targets.items()
+            }
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Get global pool statistics"""
+        return {
+            "campaigns": len(self._contexts),
+            "ready": sum(len(pool) for pool in self._pools.values()),
+            "served": self.served,
+            "generated": self.generated
+        }
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _next_deficit(self) -> Optional[Tuple[int, str]]:
+        """Find the emptiest pool that is below its target"""
+        best = None
+        best_fill = None
+        for campaign_id, targets in self._targets.items():
+            if campaign_id not in self._contexts:
+                continue
+            for slot, target in targets.items():
+                if target <= 0:
+                    continue
+                ready = len(self._pools.get((campaign_id, slot), ()))
+                if ready < target and (best_fill is None or ready / target < best_fill):
+                    best = (campaign_id, slot)
+                    best_fill = ready / target
+        return best
+
+    async def _fill_one(self, campaign_id: int, slot: str) -> bool:
+        """Generate one item for a pool, returning False if generation fell back"""
+        context = self._contexts.get(campaign_id)
+        if context is None:
+            return True
+
+        if slot == 'npc':
+            data = await NPCGenerator.generate_npc(context)
+            failed = data == NPCGenerator._create_fallback_npc()
+        else:
+            location_type = slot.split(':', 1)[1]
+            data = await LocationGenerator.generate_location(location_type, context)
+            failed = data == LocationGenerator._create_fallback_location(location_type)
+
+        # The campaign may have been discarded while we were generating
+        if failed or campaign_id not in self._targets:
+            return not failed
+
+        self._pools.setdefault((campaign_id, slot), deque()).append(data)
+        self.generated += 1
+        return True
+
+    async def _run(self):
+        """Refill pools whenever the AI is idle"""
+        while True:
+            deficit = self._next_deficit()
+            if deficit is None or not ai_manager.has_services():
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            if ai_manager.in_flight > 0:
+                await asyncio.sleep(IDLE_POLL_SECONDS)
+                continue
+
+            try:
+                succeeded = await self._fill_one(*deficit)
+            except Exception as e:
+                print(f"Warm pool refill failed: {e}")
+                succeeded = False
+
+            if not succeeded:
+                await asyncio.sleep(FAILURE_BACKOFF_SECONDS)
+
+    def _start_worker(self):
+        """Start the refill worker once the app runs and some pool has a target"""
+        if not self._started or self._task is not None:
+            return
+        if self.default_size <= 0 and not any(size > 0 for targets in self._targets.values() for size in targets.values()):
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def start(self):
+        """Start the background refill worker, now or when a campaign is given a pool size"""
+        self._started = True
+        self._start_worker()
+
+    async def stop(self):
+        """Stop the background refill worker"""
+        self._started = False
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+
+# Global warm pool instance
+warm_pool = WarmPool()
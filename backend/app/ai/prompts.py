@@ -0,0 +1,118 @@
+"""
+Compiled prompt templates for the AI generators.
+
+Each template is split into a static prefix and a dynamic suffix. The prefix
+holds everything that never changes between requests (instructions, the JSON
+schema, race and location guidance) and is built once when the template is
+registered. Only the short suffix (locked fields, campaign context) is
+rendered per request.
+
+Keeping the prefix byte-identical across requests lets providers reuse it:
+Ollama keeps the evaluated prefix in its KV cache while the model stays
+loaded, OpenAI caches long identical prefixes automatically, and Anthropic
+caches the prefix when it is marked with cache_control.
+
+Usage:
+    from app.ai.prompts import prompt_registry
+
+    prompt = prompt_registry.get('npc').render(campaign_context=context, locked_fields=locked)
+    response = await ai_manager.generate_text(prompt.suffix, prefix=prompt.prefix)
+"""
+
+import hashlib
+from typing import Dict, Any, Optional, Callable, List, NamedTuple
+
+# Closing line of every prompt, kept last so it is the final instruction the model reads
+RETURN_JSON_ONLY = "IMPORTANT: Return ONLY valid JSON, no additional text or formatting."
+
+
+class RenderedPrompt(NamedTuple):
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        return f"{self.prefix}\n\n{self.suffix}"
+
+
+class PromptTemplate:
+    """A prompt compiled into a fixed prefix and a per-request suffix builder"""
+
+    def __init__(self, name: str, sections: List[str], suffix_builder: Callable[..., List[str]]):
+        self.name = name
+        self.prefix = "\n\n".join(section.strip() for section in sections)
+        self.prefix_hash = hashlib.sha256(self.prefix.encode("utf-8")).hexdigest()[:12]
+        self._suffix_builder = suffix_builder
+
+    def render(self, **kwargs) -> RenderedPrompt:
+        """Build the dynamic suffix for one request"""
+        sections = [section for section in self._suffix_builder(**kwargs) if section]
+        sections.append(RETURN_JSON_ONLY)
+        return RenderedPrompt(self.prefix, "\n\n".join(sections))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "prefix_hash": self.prefix_hash,
+            "prefix_chars": len(self.prefix)
+        }
+
+
+class PromptRegistry:
+    """Registry of compiled prompt templates by name"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        self._templates[template.name] = template
+        return template
+
+    def get(self, name: str) -> Optional[PromptTemplate]:
+        return self._templates.get(name)
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Summarize every registered template"""
+        return [template.describe() for template in self._templates.values()]
+
+
+def constraints_section(locked_fields: Optional[Dict], subject: str) -> str:
+    """Instructions for fields the user has locked"""
+    if not locked_fields or not any(locked_fields.values()):
+        return ""
+    lines = ["IMPORTANT CONSTRAINTS - Use these EXACT values for the specified fields:"]
+    lines.extend(f"- {field}: {value}" for field, value in locked_fields.items() if value)
+    lines.append("")
+    lines.append(
+        f"Generate the remaining fields to work well with these locked values. "
+        f"Make sure the {subject} is cohesive and the unlocked fields complement the locked ones."
+    )
+    return "\n".join(lines)
+
+
+def context_section(campaign_context: Optional[Dict], subject: str, include_campaign: bool = False) -> str:
+    """Campaign details the model should take into account"""
+    if not campaign_context:
+        return ""
+    lines = ["Campaign Context:"]
+    if campaign_context.get('world_name'):
+        lines.append(f"- World: {campaign_context['world_name']}")
+    if include_campaign and campaign_context.get('campaign_name'):
+        lines.append(f"- Campaign: {campaign_context['campaign_name']}")
+    if campaign_context.get('existing_locations'):
+        lines.append(f"- Known Locations: {', '.join(campaign_context['existing_locations'])}")
+    if campaign_context.get('existing_npcs'):
+        lines.append(f"- Known NPCs: {', '.join(campaign_context['existing_npcs'])}")
+    if campaign_context.get('existing_organizations'):
+        lines.append(f"- Known Organizations: {', '.join(campaign_context['existing_organizations'])}")
+    if campaign_context.get('theme'):
+        lines.append(f"- Campaign Theme: {campaign_context['theme']}")
+    if campaign_context.get('avoid_names'):
+        lines.append(f"- Names already taken (choose a different name): {', '.join(campaign_context['avoid_names'])}")
+    lines.append("")
+    lines.append(f"Consider this context when creating the {subject}, but don't feel restricted by it.")
+    return "\n".join(lines)
+
+
+# Global prompt registry instance
+prompt_registry = PromptRegistry()
@@ -1,22 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from sqlalchemy.orm import Session
-from typing import Dict, Any, Optional
-from pydantic import BaseModel
-from app.database import get_db
-from app.models import Campaign, User
+from typing import Dict, Any, Optional, List
+from pydantic import BaseModel, Field
+import json
+from app.database import get_db, SessionLocal
+from app.models import Campaign, User, NPC, Location, AIJob
+from app.schemas import AIJobCreate, AIJob as AIJobSchema
 from app.auth.router import get_current_user
+from app.campaigns.duplicates import duplicate_index
 from .generators import NPCGenerator, LocationGenerator
 from .service import ai_manager
+from .cache import generation_cache
+from .prompts import prompt_registry
+from .context import context_builder
+from .hedging import hedge_policy
+from .metrics import ai_metrics
+from .limits import single_flight, rate_limiter, fair_scheduler, set_current_user
+from .batch import generate_batch, persist_generated
+from .pool import warm_pool
+from .jobs import job_queue, JOB_KINDS, FINISHED_STATUSES
 
 class GenerateNPCRequest(BaseModel):
     locked_fields: Optional[Dict[str, Any]] = {}
+    seed: Optional[int] = None
 
 class GenerateLocationRequest(BaseModel):
     location_type: str
     locked_fields: Optional[Dict[str, Any]] = {}
+    seed: Optional[int] = None
+
+class GenerateBatchRequest(BaseModel):
+    kind: str = Field(..., pattern="^(npc|location)$")
+    count: int = Field(5, ge=1, le=25)
+    location_type: Optional[str] = None
+    locked_fields: Optional[Dict[str, Any]] = {}
+    concurrency: Optional[int] = Field(None, ge=1, le=10)
+    seed: Optional[int] = None
+    persist: bool = False
+    stream: bool = False
+
+class PoolConfigRequest(BaseModel):
+    targets: Dict[str, int]
 
 router = APIRouter()
 
+def _enforce_rate_limit(user_id: int, cost: float = 1.0):
+    """Charge a user's generation budget, raising 429 when it is used up"""
+    wait = rate_limiter.acquire(user_id, cost)
+    if wait > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="AI generation rate limit exceeded, please wait before generating more",
+            headers={"Retry-After": rate_limiter.retry_after(wait)}
+        )
+
+def _is_unconstrained(locked_fields: Optional[Dict[str, Any]], seed: Optional[int]) -> bool:
+    """Whether a generation request can be answered with any pre-generated result"""
+    return seed is None and not (locked_fields and any(locked_fields.values()))
+
 @router.get("/status")
 async def get_ai_status():
     """Get the status of available AI providers"""
@@ -33,6 +75,60 @@ async def get_ai_status():
             "error": str(e)
         }
 
+@router.get("/cache")
+async def get_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get generation cache hit rate and saved latency"""
+    return generation_cache.stats()
+
+@router.get("/metrics")
+async def get_metrics(
+    format: str = Query("json", pattern="^(json|prometheus)$")
+):
+    """Get AI latency, token, failure and fallback metrics, as JSON or for a Prometheus scrape
+
+    Public on purpose, so Prometheus can scrape it without a login: it only
+    holds counters and histograms labelled by provider, model and outcome,
+    never prompts, users or campaign content.
+    """
+    if format == "prometheus":
+        return PlainTextResponse(ai_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+    return ai_metrics.snapshot()
+
+@router.get("/limits")
+async def get_limit_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get generation scheduler load and rate limiting counters"""
+    return {
+        "scheduler": fair_scheduler.stats(),
+        "coalesced_requests": single_flight.coalesced,
+        "rate_limited_requests": rate_limiter.rejected,
+        "rate_limit": {
+            "per_minute": rate_limiter.rate * 60,
+            "burst": rate_limiter.burst
+        }
+    }
+
+@router.get("/prompts")
+async def get_prompt_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get the compiled prompt templates and recent time-to-first-token per provider"""
+    return {
+        "templates": prompt_registry.describe(),
+        "timings": ai_manager.timing_stats()
+    }
+
+@router.delete("/cache")
+async def clear_cache(
+    current_user: User = Depends(get_current_user)
+):
+    """Clear all cached generation results"""
+    generation_cache.clear()
+    return {"message": "Generation cache cleared"}
+
 @router.post("/generate/npc/{campaign_id}")
 async def generate_npc(
     campaign_id: int,
@@ -54,6 +150,13 @@ async def generate_npc(
             detail="Campaign not found"
         )
     
+    # Identical concurrent requests (double clicks, retries) share one generation
+    # and are only charged once
+    flight_key = (current_user.id, 'npc', campaign_id, json.dumps(request.dict(), sort_keys=True, default=str))
+    if not single_flight.active(flight_key):
+        _enforce_rate_limit(current_user.id)
+    set_current_user(current_user.id)
+    
     try:
         # Build campaign context for AI generation
         campaign_context = {
@@ -62,17 +165,35 @@ async def generate_npc(
             'description': campaign.description
         }
         
-        # TODO: In the future, add existing locations, NPCs, etc. for campaign awareness
-        # existing_locations = db.query(Location).filter(Location.campaign_id == campaign_id).all()
-        # campaign_context['existing_locations'] = [loc.name for loc in existing_locations]
+        # Most relevant existing locations, NPCs and organizations, within the token budget
+        campaign_context.update(context_builder.build(db, campaign_id, 'npc', locked_fields=request.locked_fields))
+        
+        # Unconstrained requests can be served from the warm pool
+        warm_pool.register(campaign_id, campaign_context)
+        if _is_unconstrained(request.locked_fields, request.seed):
+            pooled_npc = warm_pool.take(campaign_id, warm_pool.slot('npc'))
+            if pooled_npc:
+                return {
+                    "success": True,
+                    "npc": pooled_npc,
+                    "message": "NPC generated successfully",
+                    "source": "pool",
+                    "possible_duplicates": duplicate_index.find(db, campaign_id, 'npcs', pooled_npc)
+                }
         
         # Generate the NPC with locked field constraints
-        npc_data = await NPCGenerator.generate_npc(campaign_context, request.locked_fields)
+        npc_data = await single_flight.run(flight_key, lambda: NPCGenerator.generate_npc(
+            campaign_context,
+            request.locked_fields,
+            seed=request.seed,
+            hedge=hedge_policy('npc')
+        ))
         
         return {
             "success": True,
             "npc": npc_data,
-            "message": "NPC generated successfully"
+            "message": "NPC generated successfully",
+            "possible_duplicates": duplicate_index.find(db, campaign_id, 'npcs', npc_data)
         }
         
     except Exception as e:
@@ -86,7 +207,8 @@ async def generate_npc(
             "success": True,
             "npc": fallback_npc,
             "message": "NPC generated using fallback (AI service unavailable)",
-            "warning": "AI generation failed, using predefined template"
+            "warning": "AI generation failed, using predefined template",
+            "possible_duplicates": duplicate_index.find(db, campaign_id, 'npcs', fallback_npc)
         }
 
 @router.post("/generate/location/{campaign_id}")
@@ -110,6 +232,13 @@ async def generate_location(
             detail="Campaign not found"
         )
     
+    # Identical concurrent requests (double clicks, retries) share one generation
+    # and are only charged once
+    flight_key = (current_user.id, 'location', campaign_id, json.dumps(request.dict(), sort_keys=True, default=str))
+    if not single_flight.active(flight_key):
+        _enforce_rate_limit(current_user.id)
+    set_current_user(current_user.id)
+    
     try:
         # Build campaign context for AI generation
         campaign_context = {
@@ -118,21 +247,40 @@ async def generate_location(
             'description': campaign.description
         }
         
-        # TODO: In the future, add existing locations, NPCs, etc. for campaign awareness
-        # existing_locations = db.query(Location).filter(Location.campaign_id == campaign_id).all()
-        # campaign_context['existing_locations'] = [loc.name for loc in existing_locations]
+        # Most relevant existing locations, NPCs and organizations, within the token budget
+        campaign_context.update(context_builder.build(
+            db, campaign_id, 'location',
+            location_type=request.location_type,
+            locked_fields=request.locked_fields
+        ))
+        
+        # Unconstrained requests can be served from the warm pool
+        warm_pool.register(campaign_id, campaign_context)
+        if _is_unconstrained(request.locked_fields, request.seed):
+            pooled_location = warm_pool.take(campaign_id, warm_pool.slot('location', request.location_type))
+            if pooled_location:
+                return {
+                    "success": True,
+                    "location": pooled_location,
+                    "message": "Location generated successfully",
+                    "source": "pool",
+                    "possible_duplicates": duplicate_index.find(db, campaign_id, 'locations', pooled_location)
+                }
         
         # Generate the location with locked field constraints
-        location_data = await LocationGenerator.generate_location(
+        location_data = await single_flight.run(flight_key, lambda: LocationGenerator.generate_location(
             request.location_type,
-            campaign_context, 
-            request.locked_fields
-        )
+            campaign_context,
+            request.locked_fields,
+            seed=request.seed,
+            hedge=hedge_policy('location')
+        ))
         
         return {
             "success": True,
             "location": location_data,
-            "message": "Location generated successfully"
+            "message": "Location generated successfully",
+            "possible_duplicates": duplicate_index.find(db, campaign_id, 'locations', location_data)
         }
         
     except Exception as e:
@@ -146,9 +294,290 @@ async def generate_location(
             "success": True,
             "location": fallback_location,
             "message": "Location generated using fallback (AI service unavailable)",
-            "warning": "AI generation failed, using predefined template"
+            "warning": "AI generation failed, using predefined template",
+            "possible_duplicates": duplicate_index.find(db, campaign_id, 'locations', fallback_location)
         }
 
+@router.post("/generate/batch/{campaign_id}")
+async def generate_batch_content(
+    campaign_id: int,
+    request: GenerateBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Generate several NPCs or locations concurrently for a specific campaign"""
+    
+    # Verify campaign ownership
+    campaign = db.query(Campaign).filter(
+        Campaign.id == campaign_id,
+        Campaign.user_id == current_user.id
+    ).first()
+    
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    
+    if request.kind == 'location' and not request.location_type:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="location_type is required for location batches"
+        )
+    
+    _enforce_rate_limit(current_user.id, request.count)
+    set_current_user(current_user.id)
+    
+    campaign_context = {
+        'world_name': campaign.world_name,
+        'campaign_name': campaign.name,
+        'description': campaign.description
+    }
+    campaign_context.update(context_builder.build(
+        db, campaign_id, request.kind,
+        location_type=request.location_type,
+        locked_fields=request.locked_fields
+    ))
+    
+    # Names already used in the campaign count as taken for the batch
+    model = NPC if request.kind == 'npc' else Location
+    taken_names = {
+        name for (name,) in db.query(model.name).filter(model.campaign_id == campaign_id).all()
+    }
+    
+    batch = generate_batch(
+        request.kind,
+        request.count,
+        campaign_context,
+        request.locked_fields,
+        location_type=request.location_type,
+        concurrency=request.concurrency,
+        taken_names=taken_names,
+        seed=request.seed
+    )
+    
+    if request.stream:
+        async def stream_results():
+            generated = []
+            async for result in batch:
+                generated.append(result["data"])
+                yield json.dumps({"event": "generated", **result}) + "\n"
+            
+            if request.persist:
+                # The request session may already be closed while streaming
+                stream_db = SessionLocal()
+                try:
+                    ids = persist_generated(stream_db, campaign_id, request.kind, generated)
+                    yield json.dumps({"event": "persisted", "ids": ids}) + "\n"
+                except Exception as e:
+                    yield json.dumps({"event": "error", "detail": f"Failed to save batch: {str(e)}"}) + "\n"
+                finally:
+                    stream_db.close()
+            
+            yield json.dumps({"event": "done", "count": len(generated)}) + "\n"
+        
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+    
+    results = [result async for result in batch]
+    results.sort(key=lambda result: result["index"])
+    
+    response = {
+        "success": True,
+        "kind": request.kind,
+        "results": results,
+        "message": f"Generated {len(results)} {request.kind}s"
+    }
+    
+    if request.persist:
+        try:
+            response["persisted_ids"] = persist_generated(db, campaign_id, request.kind, [r["data"] for r in results])
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Failed to save batch: {str(e)}"
+            )
+    
+    return response
+
+@router.get("/pool")
+async def get_pool_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get warm pool statistics across all campaigns"""
+    return warm_pool.stats()
+
+@router.get("/pool/{campaign_id}")
+async def get_campaign_pool(
+    campaign_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get ready counts and targets of a campaign's warm pool"""
+    
+    # Verify campaign ownership
+    campaign = db.query(Campaign).filter(
+        Campaign.id == campaign_id,
+        Campaign.user_id == current_user.id
+    ).first()
+    
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    
+    return warm_pool.status(campaign_id)
+
+@router.put("/pool/{campaign_id}")
+async def configure_campaign_pool(
+    campaign_id: int,
+    request: PoolConfigRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Set how many ready items to keep per slot ("npc" or "location:<type>")"""
+    
+    # Verify campaign ownership
+    campaign = db.query(Campaign).filter(
+        Campaign.id == campaign_id,
+        Campaign.user_id == current_user.id
+    ).first()
+    
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    
+    for slot in request.targets:
+        if slot != 'npc' and not slot.startswith('location:'):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown pool slot: {slot}"
+            )
+    
+    warm_pool.register(campaign_id, {
+        'world_name': campaign.world_name,
+        'campaign_name': campaign.name,
+        'description': campaign.description
+    })
+    warm_pool.configure(campaign_id, request.targets)
+    
+    return warm_pool.status(campaign_id)
+
+@router.post("/jobs/{campaign_id}", response_model=AIJobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    campaign_id: int,
+    request: AIJobCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Queue an NPC or location generation to run in the background"""
+    
+    # Verify campaign ownership
+    campaign = db.query(Campaign).filter(
+        Campaign.id == campaign_id,
+        Campaign.user_id == current_user.id
+    ).first()
+    
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    
+    if request.kind not in JOB_KINDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job kind: {request.kind}"
+        )
+    
+    if request.kind == 'location' and not request.location_type:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="location_type is required for location jobs"
+        )
+    
+    _enforce_rate_limit(current_user.id)
+    
+    params = {
+        'location_type': request.location_type,
+        'locked_fields': request.locked_fields or {},
+        'seed': request.seed
+    }
+    return job_queue.submit(campaign_id, current_user.id, request.kind, params)
+
+@router.get("/jobs", response_model=List[AIJobSchema])
+async def list_jobs(
+    campaign_id: Optional[int] = Query(None),
+    job_status: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """List the current user's most recent AI jobs"""
+    query = db.query(AIJob).filter(AIJob.user_id == current_user.id)
+    
+    if campaign_id is not None:
+        query = query.filter(AIJob.campaign_id == campaign_id)
+    
+    if job_status:
+        query = query.filter(AIJob.status == job_status)
+    
+    return query.order_by(AIJob.id.desc()).limit(limit).all()
+
+@router.get("/jobs/{job_id}", response_model=AIJobSchema)
+async def get_job(
+    job_id: int,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the job to finish"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get a job's status and result, optionally long-polling until it finishes"""
+    job = db.query(AIJob).filter(
+        AIJob.id == job_id,
+        AIJob.user_id == current_user.id
+    ).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    if wait and job.status not in FINISHED_STATUSES:
+        await job_queue.wait(job_id, wait)
+        db.refresh(job)
+    
+    return job
+
+@router.delete("/jobs/{job_id}", response_model=AIJobSchema)
+async def cancel_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cancel a queued or running job"""
+    job = db.query(AIJob).filter(
+        AIJob.id == job_id,
+        AIJob.user_id == current_user.id
+    ).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    if not job_queue.cancel(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job already {job.status}"
+        )
+    
+    db.refresh(job)
+    return job
+
 @router.post("/update-keys")
 async def update_ai_keys(
     keys: Dict[str, str],
@@ -1,14 +1,28 @@
 from abc import ABC, abstractmethod
+from collections import deque
 from typing import Dict, Any, Optional
+import asyncio
 import json
 import httpx
 import os
+import time
 from enum import Enum
+from .cache import generation_cache, DEFAULT_SEED
+from .hedging import run_hedged, estimate_cost
+from .metrics import ai_metrics, begin_call, end_call, report_usage, take_queue_wait
+from .limits import fair_scheduler, current_user
+
+# How long Ollama keeps the model (and the evaluated prompt prefix) loaded after a request
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Number of recent requests kept per service for prompt timing stats
+TIMING_SAMPLES = 200
 
 class AIProvider(Enum):
     LOCAL = "local"
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
+    STUB = "stub"
 
 class AIService(ABC):
     """Abstract base class for AI services"""
@@ -20,6 +34,13 @@ class AIService(ABC):
     @abstractmethod
     def is_available(self) -> bool:
         pass
+    
+    def record_timing(self, **sample):
+        """Keep timing details of a request (ttft, prompt and cached prefix tokens)"""
+        if not hasattr(self, "timings"):
+            self.timings = deque(maxlen=TIMING_SAMPLES)
+        self.timings.append(sample)
+        report_usage(**sample)
 
 class LocalAIService(AIService):
     """Local AI service using Ollama or similar local model"""
@@ -32,23 +53,60 @@ class LocalAIService(AIService):
     async def generate_text(self, prompt: str, **kwargs) -> str:
         try:
             print(f"Attempting to generate with model: {self.model}")
-            response = await self.client.post(
+            options = {
+                "temperature": kwargs.get("temperature", 0.7),
+                "top_p": kwargs.get("top_p", 0.9),
+                "max_tokens": kwargs.get("max_tokens", 4000)
+            }
+            if kwargs.get("seed") is not None:
+                options["seed"] = kwargs["seed"]
+            
+            # The static prefix goes first and unchanged, so Ollama can reuse
+            # its cached evaluation while keep_alive holds the model loaded
+            if kwargs.get("prefix"):
+                prompt = f"{kwargs['prefix']}\n\n{prompt}"
+            
+            # Stream so the time to the first token can be measured
+            started = time.perf_counter()
+            ttft = None
+            chunks = []
+            final = {}
+            async with self.client.stream(
+                "POST",
                 f"{self.base_url}/api/generate",
                 json={
                     "model": self.model,
                     "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": kwargs.get("temperature", 0.7),
-                        "top_p": kwargs.get("top_p", 0.9),
-                        "max_tokens": kwargs.get("max_tokens", 4000)
-                    }
+                    "stream": True,
+                    "keep_alive": OLLAMA_KEEP_ALIVE,
+                    "options": options
                 }
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        if ttft is None:
+                            ttft = time.perf_counter() - started
+                        chunks.append(chunk["response"])
+                    if chunk.get("done"):
+                        final = chunk
+            
+            text = "".join(chunks)
+            self.record_timing(
+                ttft=ttft,
+                latency=time.perf_counter() - started,
+                prompt_tokens=final.get("prompt_eval_count"),
+                completion_tokens=final.get("eval_count"),
+                generation_seconds=final.get("eval_duration", 0) / 1e9 or None,
+                # Ollama only evaluates the part of the prompt it has not cached
+                prompt_eval_seconds=final.get("prompt_eval_duration", 0) / 1e9,
+                load_seconds=final.get("load_duration", 0) / 1e9
             )
-            response.raise_for_status()
-            result = response.json()
-            print(f"Generation successful, response length: {len(result.get('response', ''))}")
-            return result.get("response", "")
+            print(f"Generation successful, response length: {len(text)}")
+            return text
         except Exception as e:
             print(f"Local AI generation failed: {str(e)}")
             raise Exception(f"Local AI generation failed: {str(e)}")
@@ -75,21 +133,38 @@ class OpenAIService(AIService):
     
     async def generate_text(self, prompt: str, **kwargs) -> str:
         try:
+            messages = [{"role": "user", "content": prompt}]
+            if kwargs.get("prefix"):
+                # OpenAI caches long identical prompt prefixes automatically
+                messages.insert(0, {"role": "system", "content": kwargs["prefix"]})
+            
+            payload = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": kwargs.get("temperature", 0.7),
+                "max_tokens": kwargs.get("max_tokens", 1000)
+            }
+            if kwargs.get("seed") is not None:
+                payload["seed"] = kwargs["seed"]
+            
+            started = time.perf_counter()
             response = await self.client.post(
                 "https://api.openai.com/v1/chat/completions",
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
                     "Content-Type": "application/json"
                 },
-                json={
-                    "model": self.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": kwargs.get("temperature", 0.7),
-                    "max_tokens": kwargs.get("max_tokens", 1000)
-                }
+                json=payload
             )
             response.raise_for_status()
             result = response.json()
+            usage = result.get("usage", {})
+            self.record_timing(
+                latency=time.perf_counter() - started,
+                prompt_tokens=usage.get("prompt_tokens"),
+                completion_tokens=usage.get("completion_tokens"),
+                cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+            )
             return result["choices"][0]["message"]["content"]
         except Exception as e:
             raise Exception(f"OpenAI generation failed: {str(e)}")
@@ -107,6 +182,22 @@ class AnthropicService(AIService):
     
     async def generate_text(self, prompt: str, **kwargs) -> str:
         try:
+            payload = {
+                "model": self.model,
+                "max_tokens": kwargs.get("max_tokens", 1000),
+                "temperature": kwargs.get("temperature", 0.7),
+                "messages": [{"role": "user", "content": prompt}]
+            }
+            if kwargs.get("prefix"):
+                # Mark the static prefix as cacheable; prefixes below the model's
+                # minimum cacheable length are simply sent uncached
+                payload["system"] = [{
+                    "type": "text",
+                    "text": kwargs["prefix"],
+                    "cache_control": {"type": "ephemeral"}
+                }]
+            
+            started = time.perf_counter()
             response = await self.client.post(
                 "https://api.anthropic.com/v1/messages",
                 headers={
@@ -114,15 +205,17 @@ class AnthropicService(AIService):
                     "Content-Type": "application/json",
                     "anthropic-version": "2023-06-01"
                 },
-                json={
-                    "model": self.model,
-                    "max_tokens": kwargs.get("max_tokens", 1000),
-                    "temperature": kwargs.get("temperature", 0.7),
-                    "messages": [{"role": "user", "content": prompt}]
-                }
+                json=payload
             )
             response.raise_for_status()
             result = response.json()
+            usage = result.get("usage", {})
+            self.record_timing(
+                latency=time.perf_counter() - started,
+                prompt_tokens=usage.get("input_tokens", 0) + usage.get("cache_read_input_tokens", 0) + usage.get("cache_creation_input_tokens", 0),
+                completion_tokens=usage.get("output_tokens"),
+                cached_tokens=usage.get("cache_read_input_tokens", 0)
+            )
             return result["content"][0]["text"]
         except Exception as e:
             raise Exception(f"Anthropic generation failed: {str(e)}")
@@ -139,11 +232,19 @@ class AIManager:
             AIProvider.OPENAI: None,
             AIProvider.ANTHROPIC: None
         }
+        # Number of generate_text calls currently running, used to detect idle time
+        self.in_flight = 0
         self._initialize_services()
     
     def _initialize_services(self):
         """Initialize available AI services based on configuration"""
         
+        # Offline load testing: the stub stands in for every real provider
+        from .stub import STUB_ENABLED, StubAIService
+        if STUB_ENABLED:
+            self.services = {AIProvider.STUB: StubAIService.from_env()}
+            return
+        
         # Initialize local service
         try:
             local_service = LocalAIService()
@@ -165,10 +266,39 @@ class AIManager:
     async def generate_text(self, prompt: str, preferred_provider: Optional[AIProvider] = None, **kwargs) -> str:
         """Generate text using available AI services with fallback"""
         
+        self.in_flight += 1
+        try:
+            # Wait for a slot, taking turns with other users' generations
+            queued_at = time.perf_counter()
+            await fair_scheduler.acquire(current_user())
+            try:
+                # A batch or job mark already covers the scheduler wait
+                queue_wait = take_queue_wait()
+                if queue_wait is None:
+                    queue_wait = time.perf_counter() - queued_at
+                ai_metrics.observe_queue_wait(queue_wait)
+                return await self._generate_text(prompt, preferred_provider, **kwargs)
+            finally:
+                fair_scheduler.release()
+        finally:
+            self.in_flight -= 1
+    
+    async def _generate_text(self, prompt: str, preferred_provider: Optional[AIProvider] = None, **kwargs) -> str:
+        """Try the preferred provider first, then every available one in order"""
+        
+        # Deterministic mode: a global seed applies when the caller didn't pick one
+        if kwargs.get("seed") is None and DEFAULT_SEED is not None:
+            kwargs["seed"] = DEFAULT_SEED
+        
+        hedge = kwargs.pop("hedge", None)
+        validate = kwargs.pop("validate", None)
+        if hedge is not None:
+            return await self._generate_hedged(prompt, preferred_provider, hedge, validate, **kwargs)
+        
         # Try preferred provider first
         if preferred_provider and self.services.get(preferred_provider):
             try:
-                return await self.services[preferred_provider].generate_text(prompt, **kwargs)
+                return await self._generate_with(preferred_provider, self.services[preferred_provider], prompt, **kwargs)
             except Exception as e:
                 print(f"Preferred provider {preferred_provider} failed: {e}")
         
@@ -176,13 +306,96 @@ class AIManager:
         for provider, service in self.services.items():
             if service and service.is_available():
                 try:
-                    return await service.generate_text(prompt, **kwargs)
+                    return await self._generate_with(provider, service, prompt, **kwargs)
                 except Exception as e:
                     print(f"Provider {provider} failed: {e}")
                     continue
         
         raise Exception("No AI services available")
     
+    async def _generate_hedged(self, prompt: str, preferred_provider: Optional[AIProvider], hedge, validate, **kwargs) -> str:
+        """Race providers in preference order, starting backups after each one's p95 latency"""
+        
+        # No health checks here: a dead provider fails fast and is replaced
+        order = [preferred_provider] if preferred_provider and self.services.get(preferred_provider) else []
+        order += [provider for provider, service in self.services.items() if service and provider not in order]
+        if not order:
+            raise Exception("No AI services available")
+        
+        candidates = []
+        costs = []
+        for provider in order:
+            service = self.services[provider]
+            candidates.append((
+                provider.value,
+                lambda provider=provider, service=service: self._generate_with(provider, service, prompt, **kwargs),
+                [sample["latency"] for sample in getattr(service, "timings", ())]
+            ))
+            costs.append(estimate_cost(provider.value, prompt, **kwargs))
+        
+        return await run_hedged(candidates, hedge, validate, costs)
+    
+    async def _generate_with(self, provider: AIProvider, service: AIService, prompt: str, **kwargs) -> str:
+        """Generate with a single service, going through the cache for seeded requests"""
+        
+        model = getattr(service, "model", "")
+        
+        # Unseeded sampling is meant to vary between calls, so only seeded
+        # requests are worth caching
+        cache_key = None
+        if kwargs.get("seed") is not None:
+            cache_key = generation_cache.make_key(provider.value, model, prompt, kwargs)
+            cached = generation_cache.get(cache_key)
+            if cached is not None:
+                ai_metrics.observe_outcome(provider.value, model, "cache_hit")
+                return cached
+        
+        token = begin_call()
+        started = time.perf_counter()
+        try:
+            response = await service.generate_text(prompt, **kwargs)
+        except asyncio.CancelledError:
+            ai_metrics.observe_outcome(provider.value, model, "cancelled")
+            raise
+        except Exception:
+            ai_metrics.observe_outcome(provider.value, model, "error")
+            raise
+        finally:
+            usage = end_call(token)
+        latency = time.perf_counter() - started
+        
+        usage.pop("latency", None)
+        ai_metrics.observe_call(provider.value, model, latency=latency, **usage)
+        
+        if cache_key is not None:
+            generation_cache.put(cache_key, response, latency)
+        return response
+    
+    def timing_stats(self) -> Dict[str, Any]:
+        """Summarize recent request timings per provider"""
+        stats = {}
+        for provider, service in self.services.items():
+            samples = list(getattr(service, "timings", ()))
+            if not samples:
+                continue
+            ttfts = sorted(sample["ttft"] for sample in samples if sample.get("ttft") is not None)
+            # Only providers that report cached prefix tokens count towards the share
+            reported = [sample for sample in samples if "cached_tokens" in sample]
+            prompt_tokens = sum(sample.get("prompt_tokens") or 0 for sample in reported)
+            cached_tokens = sum(sample["cached_tokens"] or 0 for sample in reported)
+            stats[provider.value] = {
+                "requests": len(samples),
+                "avg_latency": round(sum(sample["latency"] for sample in samples) / len(samples), 3),
+                "avg_ttft": round(sum(ttfts) / len(ttfts), 3) if ttfts else None,
+                "p50_ttft": round(ttfts[len(ttfts) // 2], 3) if ttfts else None,
+                "cached_prompt_share": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else None
+            }
+        return stats
+    
+    def has_services(self) -> bool:
+        """Check whether any AI service is configured, without a health check"""
+        return any(self.services.values())
+    
     def get_available_providers(self) -> list[AIProvider]:
         """Get list of available AI providers"""
         return [
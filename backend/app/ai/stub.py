@@ -0,0 +1,245 @@
+"""
+Deterministic stub AI provider for load testing and benchmarks.
+
+With AI_STUB=1 the stub replaces every real provider, so the /ai endpoints,
+the batch and job queues and the JSON parser can be exercised offline. The
+stub answers with JSON that follows the schema in the prompt: the first JSON
+object in the prompt is used as the template, its strings are filled with
+deterministic filler, arrays keep their length and locked fields keep their
+locked values. The same prompt, seed and call order always produce the same
+output.
+
+Responses are streamed internally in chunks, so time to first token and
+throughput behave like a real model and show up in /ai/metrics. A share of
+calls can fail, hang or return malformed JSON to test fallbacks, hedging and
+parser recovery.
+
+Latency distributions are written as `fixed:S`, `uniform:LOW,HIGH`,
+`normal:MEAN,STDDEV` or `lognormal:MEDIAN,SIGMA`, in seconds.
+
+Configuration:
+    AI_STUB=1                         use the stub instead of the real providers
+    AI_STUB_SEED=0                    base seed for unseeded requests
+    AI_STUB_TTFT=lognormal:0.3,0.4    time to the first chunk
+    AI_STUB_TOKENS_PER_SECOND=60      streaming rate after the first chunk (0 for instant)
+    AI_STUB_CHUNK_TOKENS=4            tokens per streamed chunk
+    AI_STUB_FAILURE_RATE=0            share of calls that raise an error
+    AI_STUB_HANG_RATE=0               share of calls that hang for AI_STUB_HANG_SECONDS, then fail
+    AI_STUB_HANG_SECONDS=30
+    AI_STUB_MALFORMED_RATE=0          share of responses that are broken JSON
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from .json_parser import extract_json
+from .service import AIService
+
+STUB_ENABLED = os.getenv("AI_STUB", "").lower() in ("1", "true", "yes")
+
+# Rough characters per token, for chunking and token counts
+CHARS_PER_TOKEN = 4
+
+FILLER_WORDS = (
+    "amber", "ancient", "ash", "bitter", "bright", "broken", "cinder", "copper", "crooked", "dusk",
+    "ember", "fallen", "frost", "gilded", "glass", "grey", "hollow", "iron", "ivory", "lantern",
+    "marsh", "moss", "night", "oak", "pale", "quiet", "raven", "river", "salt", "shadow",
+    "silver", "stone", "storm", "thorn", "tide", "velvet", "willow", "winter", "wolf", "wyrm"
+)
+
+NAME_SYLLABLES = ("al", "bar", "cor", "dra", "el", "fen", "gor", "hal", "is", "jor", "kal", "lor",
+                  "mor", "nar", "or", "pel", "quin", "ros", "sar", "tor", "ul", "vel", "wyn", "zan")
+
+MALFORMATIONS = ("truncated", "fenced", "trailing_comma", "single_quotes", "prose")
+
+# Used when the prompt has no JSON template
+FALLBACK_TEMPLATE = {"name": "", "description": "", "notes": ""}
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """Build a sampler from a latency spec like `lognormal:0.3,0.4`"""
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value.strip()]
+    kind = kind.strip().lower()
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        # Parameterized by the median, which is easier to reason about than mu
+        return lambda rng: values[0] * rng.lognormvariate(0.0, values[1])
+    raise ValueError(f"Invalid latency distribution: {spec}")
+
+
+class StubAIService(AIService):
+    """AI service that fakes a streaming model with deterministic output"""
+
+    model = "stub"
+
+    def __init__(
+        self,
+        seed: int = 0,
+        ttft: str = "lognormal:0.3,0.4",
+        tokens_per_second: float = 60.0,
+        chunk_tokens: int = 4,
+        failure_rate: float = 0.0,
+        hang_rate: float = 0.0,
+        hang_seconds: float = 30.0,
+        malformed_rate: float = 0.0
+    ):
+        self.seed = seed
+        self.ttft = parse_distribution(ttft)
+        self.tokens_per_second = tokens_per_second
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.malformed_rate = malformed_rate
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls) -> "StubAIService":
+        return cls(
+            seed=int(os.getenv("AI_STUB_SEED", "0")),
+            ttft=os.getenv("AI_STUB_TTFT", "lognormal:0.3,0.4"),
+            tokens_per_second=float(os.getenv("AI_STUB_TOKENS_PER_SECOND", "60")),
+            chunk_tokens=int(os.getenv("AI_STUB_CHUNK_TOKENS", "4")),
+            failure_rate=float(os.getenv("AI_STUB_FAILURE_RATE", "0")),
+            hang_rate=float(os.getenv("AI_STUB_HANG_RATE", "0")),
+            hang_seconds=float(os.getenv("AI_STUB_HANG_SECONDS", "30")),
+            malformed_rate=float(os.getenv("AI_STUB_MALFORMED_RATE", "0"))
+        )
+
+    def _rng(self, prompt: str, kwargs: Dict[str, Any]) -> random.Random:
+        # Seeded requests depend only on the prompt and seed; unseeded ones
+        # also on the call number, so repeated prompts still vary
+        self.calls += 1
+        seed = kwargs.get("seed")
+        variant = f"seed:{seed}" if seed is not None else f"call:{self.calls}"
+        digest = hashlib.sha256(f"{self.seed}|{variant}|{kwargs.get('prefix') or ''}|{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    async def generate_text(self, prompt: str, **kwargs) -> str:
+        rng = self._rng(prompt, kwargs)
+        full_prompt = f"{kwargs.get('prefix') or ''}\n\n{prompt}"
+
+        # Decide every injected fault up front so the outcome depends only on the seed
+        roll = rng.random()
+        if roll < self.failure_rate:
+            await asyncio.sleep(self.ttft(rng))
+            raise Exception("Stub AI generation failed: injected failure")
+        if roll < self.failure_rate + self.hang_rate:
+            await asyncio.sleep(self.hang_seconds)
+            raise Exception("Stub AI generation failed: injected timeout")
+        malformed = rng.random() < self.malformed_rate
+
+        text = self.render_response(full_prompt, rng)
+        if malformed:
+            text = self.malform(text, rng)
+
+        started = time.perf_counter()
+        ttft = None
+        chunks = []
+        async for chunk in self.stream(text, rng):
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            chunks.append(chunk)
+        latency = time.perf_counter() - started
+
+        completion_tokens = max(1, len(text) // CHARS_PER_TOKEN)
+        self.record_timing(
+            ttft=ttft,
+            latency=latency,
+            prompt_tokens=max(1, len(full_prompt) // CHARS_PER_TOKEN),
+            completion_tokens=completion_tokens,
+            generation_seconds=(latency - ttft) if ttft is not None and latency > ttft else None
+        )
+        return "".join(chunks)
+
+    async def stream(self, text: str, rng: random.Random) -> AsyncIterator[str]:
+        """Yield the response in chunks at the configured rate"""
+        await asyncio.sleep(self.ttft(rng))
+        size = self.chunk_tokens * CHARS_PER_TOKEN
+        delay = self.chunk_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for start in range(0, len(text), size):
+            if start and delay:
+                await asyncio.sleep(delay)
+            yield text[start:start + size]
+
+    def render_response(self, prompt: str, rng: random.Random) -> str:
+        """Fill the JSON template found in the prompt"""
+        template, _ = extract_json(prompt)
+        if not isinstance(template, dict):
+            template = FALLBACK_TEMPLATE
+        locked = _locked_fields(prompt)
+        data = {}
+        for field, example in template.items():
+            if field in locked:
+                data[field] = locked[field]
+            else:
+                data[field] = self._fill(field, example, rng)
+        return json.dumps(data, indent=2)
+
+    def _fill(self, field: str, example: Any, rng: random.Random) -> Any:
+        if isinstance(example, list):
+            return [self._phrase(rng, 2) for _ in range(len(example) or 2)]
+        if isinstance(example, dict):
+            return {key: self._fill(key, value, rng) for key, value in example.items()}
+        if isinstance(example, (int, float)) and not isinstance(example, bool):
+            return rng.randint(1, 100)
+        if field == "name":
+            return f"{self._name(rng)} {self._name(rng)}"
+        if field in ("age", "population") or "number" in str(example):
+            return str(rng.randint(18, 90) if field == "age" else rng.randint(50, 50000))
+        # Pick from the options the template lists, like Male/Female/Non-binary
+        options = [option.strip() for option in str(example).split("/")]
+        if len(options) > 1 and all(options) and all(len(option) < 20 for option in options):
+            return rng.choice(options)
+        return self._phrase(rng, rng.randint(6, 14)).capitalize() + "."
+
+    def _name(self, rng: random.Random) -> str:
+        return "".join(rng.choice(NAME_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+    def _phrase(self, rng: random.Random, words: int) -> str:
+        return " ".join(rng.choice(FILLER_WORDS) for _ in range(words))
+
+    def malform(self, text: str, rng: random.Random) -> str:
+        """Break a JSON response the way real models do"""
+        kind = rng.choice(MALFORMATIONS)
+        if kind == "truncated":
+            return text[:rng.randint(len(text) // 3, len(text) - 2)]
+        if kind == "fenced":
+            return f"Here is the requested JSON:\n```json\n{text}\n```\nLet me know if you want changes."
+        if kind == "trailing_comma":
+            return re.sub(r"\n}\s*$", ",\n}", text)
+        if kind == "single_quotes":
+            return text.replace('"', "'")
+        return "I'm sorry, I can't produce that in JSON right now."
+
+    def is_available(self) -> bool:
+        return True
+
+
+def _locked_fields(prompt: str) -> Dict[str, str]:
+    """Field values listed under the constraints section of a prompt"""
+    locked = {}
+    in_constraints = False
+    for line in prompt.splitlines():
+        if line.startswith("IMPORTANT CONSTRAINTS"):
+            in_constraints = True
+            continue
+        if in_constraints:
+            if not line.startswith("- "):
+                break
+            field, _, value = line[2:].partition(": ")
+            locked[field.strip()] = value.strip()
+    return locked
@@ -0,0 +1,171 @@
+"""
+Entity detail bundles: an entity together with the entities it refers to and
+the entities that refer to it.
+
+A detail page needs more than the entity itself: a location shows its parent,
+sub-locations, residents and the organizations based there, an organization
+its leader, headquarters and members. A bundle loads all of that with a fixed
+number of queries, however many related entities there are:
+
+- one for the entity
+- one on entity_references for everything that refers to it (residents,
+  sub-locations, members, owned items, ...), if any such part is requested
+- one per related entity type, for the union of the ids needed from that
+  type, kept in stored order for references held by the entity and in name
+  order for references to it
+
+Each part of a bundle can be asked for with include=; parts that weren't
+requested are null.
+
+Usage:
+    from app.campaigns import bundles
+
+    parts = bundles.parse_includes('location', 'parent,npcs')
+    bundle = bundles.bundle(db, campaign_id, 'location', location_id, parts)
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models import EntityReference
+from app.campaigns.references import MODELS, REFERENCE_FIELDS, TARGET_TYPES, entry_target
+
+# Per entity type, its bundle parts:
+#   ("field", field): entities the entity refers to through one of its own fields
+#   ("backlink", type, fields): entities of a type that refer to it through some fields
+BUNDLE_PARTS = {
+    "npc": {
+        "location": ("field", "location_id"),
+        "relationships": ("field", "relationships"),
+        "organizations": ("backlink", "organization", ("leader_npc_id", "notable_members")),
+        "items": ("backlink", "item", ("current_owner_id",)),
+        "plot_hooks": ("backlink", "plot_hook", ("related_npcs",)),
+        "events": ("backlink", "event", ("participants",)),
+    },
+    "location": {
+        "parent": ("field", "parent_location_id"),
+        "children": ("backlink", "location", ("parent_location_id",)),
+        "npcs": ("backlink", "npc", ("location_id",)),
+        "organizations": ("backlink", "organization", ("headquarters_location_id",)),
+        "items": ("backlink", "item", ("current_location_id",)),
+        "events": ("backlink", "event", ("location_id",)),
+        "plot_hooks": ("backlink", "plot_hook", ("related_locations",)),
+    },
+    "organization": {
+        "leader": ("field", "leader_npc_id"),
+        "headquarters": ("field", "headquarters_location_id"),
+        "members": ("field", "notable_members"),
+        "allies": ("field", "allies"),
+        "enemies": ("field", "enemies"),
+        "plot_hooks": ("backlink", "plot_hook", ("related_organizations",)),
+        "events": ("backlink", "event", ("participants",)),
+    },
+    "plot_hook": {
+        "npcs": ("field", "related_npcs"),
+        "locations": ("field", "related_locations"),
+        "organizations": ("field", "related_organizations"),
+    },
+    "event": {
+        "location": ("field", "location_id"),
+        "participants": ("field", "participants"),
+    },
+    "item": {
+        "owner": ("field", "current_owner_id"),
+        "location": ("field", "current_location_id"),
+    },
+}
+
+# (entity type, field) -> (reference kind, target type)
+_FIELDS = {
+    (spec[0], field): (kind, target_type)
+    for spec in REFERENCE_FIELDS.values()
+    for field, kind, target_type in spec[2]
+}
+
+
+def parse_includes(entity_type: str, include: Optional[str]) -> List[str]:
+    """Bundle parts named in a comma-separated include=, all of them if it's empty"""
+    parts = BUNDLE_PARTS[entity_type]
+    if not include:
+        return list(parts)
+    requested = [part.strip() for part in include.split(",") if part.strip()]
+    unknown = [part for part in requested if part not in parts]
+    if unknown:
+        raise ValueError(f"Unknown include: {', '.join(unknown)}. Choose from {', '.join(parts)}")
+    return list(dict.fromkeys(requested))
+
+
+def _targets(entity_type: str, field: str, value) -> List[Tuple[Optional[str], Optional[int], Any]]:
+    """(type, id, stored entry) of each reference held in a field, in stored order"""
+    kind, target_type = _FIELDS[(entity_type, field)]
+    if kind == "id":
+        return [(target_type, value, None)] if value is not None else []
+    targets = []
+    for entry in value if isinstance(value, list) else []:
+        target = entry_target(kind, entry, target_type)
+        if target is None:
+            continue
+        # Entries pointing at anything but an NPC, location or organization stay unresolved
+        targets.append((*target, entry) if target[0] in TARGET_TYPES else (None, None, entry))
+    return targets
+
+
+def bundle(db, campaign_id: int, entity_type: str, entity_id: int, parts: List[str]) -> Optional[Dict[str, Any]]:
+    """An entity with the requested parts of its bundle, or None if it doesn't exist"""
+    model = MODELS[entity_type]
+    entity = db.query(model).filter(model.id == entity_id, model.campaign_id == campaign_id).first()
+    if entity is None:
+        return None
+    specs = {part: BUNDLE_PARTS[entity_type][part] for part in parts}
+
+    # Ids wanted per entity type, and each part's (type, id, entry) in order
+    wanted: Dict[str, set] = {}
+    found: Dict[str, List[Tuple[Optional[str], Optional[int], Any]]] = {}
+    for part, spec in specs.items():
+        if spec[0] == "field":
+            found[part] = _targets(entity_type, spec[1], getattr(entity, spec[1]))
+
+    backlinks = {part: spec for part, spec in specs.items() if spec[0] == "backlink"}
+    if backlinks:
+        rows = db.query(EntityReference.source_type, EntityReference.source_id, EntityReference.field).filter(
+            EntityReference.campaign_id == campaign_id,
+            EntityReference.target_type == entity_type,
+            EntityReference.target_id == entity_id,
+            EntityReference.source_type.in_({spec[1] for spec in backlinks.values()})
+        ).order_by(EntityReference.source_name, EntityReference.source_id).all()
+        for part, (_, source_type, fields) in backlinks.items():
+            ids = [
+                source_id for row_type, source_id, field in rows
+                if row_type == source_type and field in fields and (row_type, source_id) != (entity_type, entity_id)
+            ]
+            found[part] = [(source_type, source_id, None) for source_id in dict.fromkeys(ids)]
+
+    for targets in found.values():
+        for target_type, target_id, _ in targets:
+            if target_type is not None and target_id is not None:
+                wanted.setdefault(target_type, set()).add(target_id)
+
+    loaded: Dict[Tuple[str, int], Any] = {}
+    for target_type, ids in wanted.items():
+        target_model = MODELS[target_type]
+        for obj in db.query(target_model).filter(target_model.id.in_(ids), target_model.campaign_id == campaign_id):
+            loaded[(target_type, obj.id)] = obj
+
+    result: Dict[str, Any] = {entity_type: entity}
+    for part, spec in specs.items():
+        targets = found[part]
+        kind = _FIELDS[(entity_type, spec[1])][0] if spec[0] == "field" else "ids"
+        if kind == "id":
+            result[part] = loaded.get(targets[0][:2]) if targets else None
+        elif kind in ("relationships", "participants"):
+            # Stored entries, each with the entity it resolves to under its type
+            result[part] = []
+            for target_type, target_id, entry in targets:
+                resolved = {"entry": entry}
+                if (target_type, target_id) in loaded:
+                    resolved[target_type] = loaded[(target_type, target_id)]
+                result[part].append(resolved)
+        else:
+            # Missing and duplicate ids are left out
+            keys = dict.fromkeys(target[:2] for target in targets)
+            result[part] = [loaded[key] for key in keys if key in loaded]
+    return result
@@ -0,0 +1,181 @@
+"""
+Delete-impact reports and reference-safe deletes.
+
+NPCs, locations and organizations are referred to from foreign keys and JSON
+id lists all over a campaign (see references). The entity_references index
+answers "what refers to this" with one indexed query, so the impact of a
+delete is known before anything is removed, and deletes can handle inbound
+references in one of three modes:
+
+- block: refuse while anything else refers to the entity
+- nullify: clear foreign keys and drop the JSON entries that point at it
+- cascade: like nullify, but contained entities (a location's sub-locations)
+  are deleted along with it instead of becoming top-level
+
+Deletes run as set-based statements: one UPDATE per referencing field, one
+DELETE per table. They bypass the ORM flush, so the derived tables (location
+closure, travel routes, entity references) are updated here directly, and
+the changed rows are queued on the campaign change feed for the caches.
+
+Usage:
+    from app.campaigns import deletion
+
+    report = deletion.impact(db, campaign_id, 'npc', npc_id)
+    deletion.delete_entity(db, campaign_id, 'npc', npc_id, mode='nullify')
+    db.commit()
+"""
+
+from typing import Any, Dict, List, Set, Tuple
+
+from sqlalchemy import and_, bindparam, delete, or_, update
+from sqlalchemy.orm import Session
+
+from app.models import EntityReference
+from app.campaigns import references
+from app.campaigns.references import MODELS, REFERENCE_FIELDS, references_table
+from app.campaigns.versioning import Change, record_changes
+from app.locations import hierarchy, travel
+
+DELETE_MODES = ("block", "nullify", "cascade")
+
+_TYPE_LABELS = {
+    "npc": "NPC", "location": "location", "organization": "organization",
+    "plot_hook": "plot hook", "event": "event", "item": "item"
+}
+
+# (model, field) -> reference kind
+_FIELD_KINDS = {
+    (model, field): kind
+    for model, (_, _, fields) in REFERENCE_FIELDS.items()
+    for field, kind, _ in fields
+}
+
+
+def _contained(db: Session, entity_type: str, entity_id: int) -> List[Tuple[int, str]]:
+    """(id, name) of the entities a cascade deletes along with an entity"""
+    if entity_type != "location":
+        return []
+    model = MODELS["location"]
+    return db.query(model.id, model.name).filter(
+        model.id.in_(hierarchy.subtree_ids(entity_id, include_self=False))
+    ).order_by(model.name, model.id).all()
+
+
+def _inbound(db: Session, campaign_id: int, entity_type: str, entity_ids: Set[int]):
+    """References to some entities from anything outside that set"""
+    rows = db.query(
+        EntityReference.target_id, EntityReference.source_type, EntityReference.source_id,
+        EntityReference.source_name, EntityReference.field
+    ).filter(
+        EntityReference.campaign_id == campaign_id,
+        EntityReference.target_type == entity_type,
+        EntityReference.target_id.in_(entity_ids)
+    ).order_by(EntityReference.source_type, EntityReference.source_name, EntityReference.source_id).all()
+    return [row for row in rows if not (row.source_type == entity_type and row.source_id in entity_ids)]
+
+
+def _sources(rows) -> List[Dict[str, Any]]:
+    sources: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    for row in rows:
+        entry = sources.setdefault((row.source_type, row.source_id), {
+            "type": row.source_type, "id": row.source_id, "name": row.source_name, "fields": []
+        })
+        if row.field not in entry["fields"]:
+            entry["fields"].append(row.field)
+    return list(sources.values())
+
+
+def impact(db: Session, campaign_id: int, entity_type: str, entity_id: int) -> Dict[str, Any]:
+    """What deleting an entity would affect, in at most two queries"""
+    contained = _contained(db, entity_type, entity_id)
+    doomed = {entity_id} | {contained_id for contained_id, _ in contained}
+    rows = _inbound(db, campaign_id, entity_type, doomed)
+
+    direct = _sources([row for row in rows if row.target_id == entity_id])
+    by_type: Dict[str, int] = {}
+    for source in direct:
+        by_type[source["type"]] = by_type.get(source["type"], 0) + 1
+
+    return {
+        "type": entity_type,
+        "id": entity_id,
+        # mode=block refuses while anything refers to the entity, sub-locations included
+        "blocked": bool(direct or contained),
+        "references": {"total": len(direct), "by_type": by_type, "sources": direct},
+        # Deleted too with mode=cascade
+        "contained": [{"type": entity_type, "id": contained_id, "name": name} for contained_id, name in contained],
+        "contained_references": _sources([row for row in rows if row.target_id != entity_id])
+    }
+
+
+def blocked_detail(label: str, report: Dict[str, Any]) -> str:
+    """Error message for a delete refused by mode=block"""
+    counts = [
+        f"{count} {_TYPE_LABELS.get(source_type, source_type)}{'s' if count != 1 else ''}"
+        for source_type, count in report["references"]["by_type"].items()
+    ]
+    contained = len(report["contained"])
+    if contained:
+        counts.append(f"{contained} sub-location{'s' if contained != 1 else ''}")
+    return f"Cannot delete {label} referenced by {', '.join(counts)}; delete with mode=nullify or mode=cascade to clear the references"
+
+
+def delete_entity(db: Session, campaign_id: int, entity_type: str, entity_id: int, mode: str = "nullify") -> Dict[str, Any]:
+    """Delete an entity, clearing (or with cascade, also deleting) what refers to it
+
+    Blocking is left to the caller, who checks impact() first. The caller commits.
+    """
+    model = MODELS[entity_type]
+    doomed = {entity_id}
+    if mode == "cascade":
+        doomed |= {contained_id for contained_id, _ in _contained(db, entity_type, entity_id)}
+    ids = sorted(doomed)
+
+    fields: Dict[Tuple[str, str], Set[int]] = {}
+    for row in _inbound(db, campaign_id, entity_type, doomed):
+        fields.setdefault((row.source_type, row.field), set()).add(row.source_id)
+
+    connection = db.connection()
+    changes: List[Change] = []
+    for (source_type, field), source_ids in fields.items():
+        source = MODELS[source_type]
+        table = source.__table__
+        kind = _FIELD_KINDS[(source, field)]
+        if kind == "id":
+            connection.execute(
+                update(table).where(table.c.id.in_(source_ids), table.c[field].in_(ids)).values({field: None})
+            )
+        else:
+            # JSON is rewritten in Python, then saved with one executemany UPDATE
+            values = db.query(source.id, getattr(source, field)).filter(source.id.in_(source_ids)).all()
+            connection.execute(
+                update(table).where(table.c.id == bindparam("source_id")).values(
+                    {field: bindparam("value", type_=table.c[field].type)}
+                ),
+                [
+                    {"source_id": source_id, "value": references.without_targets(kind, value, entity_type, doomed)}
+                    for source_id, value in values
+                ]
+            )
+        changes.extend(Change(table.name, source_id, False) for source_id in source_ids)
+
+    # The derived rows of the deleted entities, and of the references just removed
+    connection.execute(delete(references_table).where(
+        references_table.c.campaign_id == campaign_id,
+        or_(
+            and_(references_table.c.target_type == entity_type, references_table.c.target_id.in_(ids)),
+            and_(references_table.c.source_type == entity_type, references_table.c.source_id.in_(ids))
+        )
+    ))
+    if entity_type == "location":
+        hierarchy.remove(connection, ids)
+        travel.remove(connection, ids)
+
+    connection.execute(delete(model.__table__).where(model.id.in_(ids), model.campaign_id == campaign_id))
+    changes.extend(Change(model.__tablename__, deleted_id, True) for deleted_id in ids)
+    record_changes(db, campaign_id, changes)
+
+    return {
+        "deleted": [{"type": entity_type, "id": deleted_id} for deleted_id in ids],
+        "updated": len({(change.table, change.id) for change in changes if not change.deleted})
+    }
@@ -0,0 +1,281 @@
+"""
+Near-duplicate detection for NPCs, locations and ideas.
+
+Each entity's text is reduced to a MinHash signature: for every one of
+NUM_PERM hash functions, the smallest hash over the text's word shingles.
+Two signatures agree in a position with probability equal to the Jaccard
+similarity of the shingle sets, so comparing signatures estimates how much
+two texts overlap.
+
+Signatures are split into LSH bands; texts that agree on all rows of any
+band land in the same bucket. Only entities sharing a bucket are compared,
+so checking a new NPC or idea is a few dictionary lookups, and the cluster
+report never compares every pair.
+
+Like the AI context builder, the index is loaded once per campaign and then
+kept current from the campaign change feed.
+
+Usage:
+    from app.campaigns.duplicates import duplicate_index
+
+    matches = duplicate_index.find(db, campaign_id, 'npcs', {'name': 'Mysterious Stranger', ...})
+    clusters = duplicate_index.clusters(db, campaign_id)
+"""
+
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import NPC, Location, Idea
+from app.campaigns.versioning import campaign_versions, Change
+
+# Estimated Jaccard similarity from which two texts count as duplicates
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.5"))
+
+# 32 bands of 4 rows: pairs around 0.4 similarity and above become candidates
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+# Mersenne prime modulus of the universal hash family (a * x + b) % p; it must
+# be well below a * x so the hashes wrap around and actually permute
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+# Fields compared per table, with the field used as the display name
+DUPLICATE_FIELDS = {
+    'npcs': (NPC, 'name', ('name', 'race', 'occupation', 'background')),
+    'locations': (Location, 'name', ('name', 'type', 'description')),
+    'ideas_inbox': (Idea, 'content', ('content',))
+}
+
+
+def _field(source, field: str):
+    if isinstance(source, dict):
+        return source.get(field)
+    return getattr(source, field, None)
+
+
+def duplicate_text(table: str, source) -> str:
+    """Text compared for an entity, from a model row or a generated dict"""
+    return " ".join(str(_field(source, field)) for field in DUPLICATE_FIELDS[table][2] if _field(source, field))
+
+
+def _shingles(text: str) -> Set[int]:
+    words = _WORD.findall(text.lower())
+    # Word pairs capture phrasing; short texts fall back to single words
+    grams = [f"{first} {second}" for first, second in zip(words, words[1:])] if len(words) > 2 else words
+    return {zlib.crc32(gram.encode("utf-8")) for gram in grams}
+
+
+def signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature of a text, or None if it has no words"""
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles)) % _PRIME
+    # Both factors are below 2**31, so the products can't overflow uint64
+    hashed = (np.outer(_A, values) + _B[:, None]) % _PRIME
+    return hashed.min(axis=1)
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(first == second)) / NUM_PERM
+
+
+def _bands(sig: np.ndarray) -> List[bytes]:
+    return [sig[band * ROWS:(band + 1) * ROWS].tobytes() for band in range(BANDS)]
+
+
+class _CampaignIndex:
+    """Signatures and LSH buckets of one campaign"""
+
+    def __init__(self):
+        self.signatures: Dict[Tuple[str, int], np.ndarray] = {}
+        self.names: Dict[Tuple[str, int], str] = {}
+        self.buckets: Dict[Tuple[str, int, bytes], Set[int]] = {}
+
+    def add(self, table: str, row):
+        self.remove(table, row.id)
+        sig = signature(duplicate_text(table, row))
+        if sig is None:
+            return
+        key = (table, row.id)
+        self.signatures[key] = sig
+        self.names[key] = str(_field(row, DUPLICATE_FIELDS[table][1]) or "")
+        for band, value in enumerate(_bands(sig)):
+            self.buckets.setdefault((table, band, value), set()).add(row.id)
+
+    def remove(self, table: str, entity_id: int):
+        key = (table, entity_id)
+        sig = self.signatures.pop(key, None)
+        self.names.pop(key, None)
+        if sig is None:
+            return
+        for band, value in enumerate(_bands(sig)):
+            bucket = self.buckets.get((table, band, value))
+            if bucket is not None:
+                bucket.discard(entity_id)
+                if not bucket:
+                    del self.buckets[(table, band, value)]
+
+    def candidates(self, table: str, sig: np.ndarray) -> Set[int]:
+        found = set()
+        for band, value in enumerate(_bands(sig)):
+            found.update(self.buckets.get((table, band, value), ()))
+        return found
+
+
+class DuplicateIndex:
+    """MinHash/LSH near-duplicate index per campaign"""
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._campaigns: Dict[int, _CampaignIndex] = {}
+        self._dirty: Dict[int, Set[Change]] = {}
+        self._lock = threading.RLock()
+        campaign_versions.subscribe(self._on_change)
+
+    def _on_change(self, campaign_id: int, changes: List[Change]):
+        relevant = {change for change in changes if change.table in DUPLICATE_FIELDS or change.table == 'campaigns'}
+        if not relevant:
+            return
+        with self._lock:
+            if any(change.table == 'campaigns' and change.deleted for change in relevant):
+                self.discard(campaign_id)
+            elif campaign_id in self._campaigns:
+                self._dirty.setdefault(campaign_id, set()).update(relevant)
+
+    def discard(self, campaign_id: int):
+        """Forget everything indexed for a campaign"""
+        with self._lock:
+            self._campaigns.pop(campaign_id, None)
+            self._dirty.pop(campaign_id, None)
+
+    def _index(self, db: Session, campaign_id: int) -> _CampaignIndex:
+        """Get a campaign's index, loading it or applying pending changes"""
+        with self._lock:
+            index = self._campaigns.get(campaign_id)
+            if index is None:
+                index = _CampaignIndex()
+                for table, (model, _, _) in DUPLICATE_FIELDS.items():
+                    for row in db.query(model).filter(model.campaign_id == campaign_id):
+                        index.add(table, row)
+                self._campaigns[campaign_id] = index
+                self._dirty.pop(campaign_id, None)
+                return index
+
+            changes = self._dirty.pop(campaign_id, set())
+            updated: Dict[str, Set[int]] = {}
+            for change in changes:
+                if change.table not in DUPLICATE_FIELDS:
+                    continue
+                if change.deleted:
+                    index.remove(change.table, change.id)
+                else:
+                    updated.setdefault(change.table, set()).add(change.id)
+            for table, ids in updated.items():
+                model = DUPLICATE_FIELDS[table][0]
+                found = set()
+                for row in db.query(model).filter(model.id.in_(ids)):
+                    index.add(table, row)
+                    found.add(row.id)
+                for missing in ids - found:
+                    index.remove(table, missing)
+            return index
+
+    def find(
+        self,
+        db: Session,
+        campaign_id: int,
+        table: str,
+        source,
+        exclude_id: Optional[int] = None,
+        limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Existing entities that are near-duplicates of a row or generated dict"""
+        sig = signature(duplicate_text(table, source))
+        if sig is None:
+            return []
+        index = self._index(db, campaign_id)
+        candidates = [entity_id for entity_id in index.candidates(table, sig) if entity_id != exclude_id]
+        if not candidates:
+            return []
+        signatures = np.stack([index.signatures[(table, entity_id)] for entity_id in candidates])
+        scores = np.count_nonzero(signatures == sig, axis=1) / NUM_PERM
+        matches = [
+            {"id": entity_id, "name": index.names[(table, entity_id)], "similarity": round(float(score), 3)}
+            for entity_id, score in zip(candidates, scores)
+            if score >= self.threshold
+        ]
+        matches.sort(key=lambda match: -match["similarity"])
+        return matches[:limit]
+
+    def clusters(
+        self,
+        db: Session,
+        campaign_id: int,
+        tables: Optional[List[str]] = None,
+        threshold: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Groups of near-duplicate entities, largest first"""
+        threshold = self.threshold if threshold is None else threshold
+        index = self._index(db, campaign_id)
+        parent: Dict[Tuple[str, int], Tuple[str, int]] = {}
+
+        def root(key):
+            while parent.get(key, key) != key:
+                parent[key] = parent.get(parent[key], parent[key])
+                key = parent[key]
+            return key
+
+        scores: Dict[Tuple[str, int], List[float]] = {}
+        for (table, _, _), members in list(index.buckets.items()):
+            if len(members) < 2 or (tables and table not in tables):
+                continue
+            # Each member is compared with one representative per group already
+            # in the bucket, so a bucket of identical texts costs linear time
+            representatives: List[Tuple[str, int]] = []
+            for member in sorted(members):
+                key = (table, member)
+                for representative in representatives:
+                    if root(representative) == root(key):
+                        continue
+                    score = similarity(index.signatures[representative], index.signatures[key])
+                    if score >= threshold:
+                        parent[root(key)] = root(representative)
+                        scores.setdefault(key, []).append(score)
+                if not any(root(representative) == root(key) for representative in representatives):
+                    representatives.append(key)
+
+        groups: Dict[Tuple[str, int], List[Tuple[str, int]]] = {}
+        for key in parent:
+            groups.setdefault(root(key), []).append(key)
+
+        clusters = []
+        for group_root, members in groups.items():
+            members = sorted(set(members) | {group_root})
+            if len(members) < 2:
+                continue
+            linked = [score for member in members for score in scores.get(member, [])]
+            clusters.append({
+                "table": members[0][0],
+                "members": [{"id": entity_id, "name": index.names[(table, entity_id)]} for table, entity_id in members],
+                "min_similarity": round(min(linked), 3) if linked else None
+            })
+        clusters.sort(key=lambda cluster: -len(cluster["members"]))
+        return clusters
+
+
+# Global duplicate index instance
+duplicate_index = DuplicateIndex()
@@ -0,0 +1,231 @@
+"""
+Whole-campaign relationship graph.
+
+Nodes are the campaign's NPCs, locations and organizations. Edges come from
+everything that links them:
+
+- NPC relationships (friend, rival, lives_in, ...), as stored on the NPC
+- an NPC's current location (located_in)
+- a location's parent location (part_of)
+- an organization's leader (leads), headquarters (headquartered_at),
+  notable members (member_of), allies (ally) and enemies (enemy)
+
+The graph is built with one query per node type and cached per campaign as
+an adjacency structure. The cache is dropped when an NPC, location or
+organization of the campaign changes, so repeated requests and the graph
+analytics share one build.
+
+Usage:
+    from app.campaigns.graph import campaign_graphs
+
+    graph = campaign_graphs.get(db, campaign_id)
+    payload = graph.encode(edge_types={'friend', 'enemy'}, player_only=True)
+"""
+
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import NPC, Location, Organization
+from app.campaigns.versioning import campaign_versions, Change
+
+# Tables whose rows are graph nodes or hold graph edges
+GRAPH_TABLES = {'npcs', 'locations', 'organizations'}
+
+NODE_FIELDS = ["type", "id", "name", "subtype", "visibility"]
+EDGE_FIELDS = ["source", "target", "type", "strength", "public"]
+
+
+class Node(NamedTuple):
+    type: str
+    id: int
+    name: str
+    subtype: Optional[str]
+    visibility: Optional[str]
+
+
+class Edge(NamedTuple):
+    source: int  # Node index
+    target: int  # Node index
+    type: str
+    strength: Optional[str]
+    public: bool
+
+
+def _ids(value) -> List[int]:
+    """Entity ids from a JSON id list, tolerating {id: ...} objects"""
+    ids = []
+    for item in value or []:
+        if isinstance(item, dict):
+            item = item.get('id') or item.get('npc_id') or item.get('organization_id')
+        if isinstance(item, int) or (isinstance(item, str) and item.isdigit()):
+            ids.append(int(item))
+    return ids
+
+
+class CampaignGraph:
+    """Nodes, edges and adjacency lists of one campaign"""
+
+    def __init__(self, campaign_id: int, version: int):
+        self.campaign_id = campaign_id
+        self.version = version
+        self.nodes: List[Node] = []
+        self.index: Dict[Tuple[str, int], int] = {}
+        self.edges: List[Edge] = []
+        # Edge indices leaving and entering each node
+        self.outgoing: List[List[int]] = []
+        self.incoming: List[List[int]] = []
+        # Analytics computed from this graph, see graph_analytics
+        self.memo: Dict[Any, Any] = {}
+
+    def add_node(self, node: Node):
+        self.index[(node.type, node.id)] = len(self.nodes)
+        self.nodes.append(node)
+        self.outgoing.append([])
+        self.incoming.append([])
+
+    def add_edge(self, source: Tuple[str, Any], target: Tuple[str, Any], edge_type: str,
+                 strength: Optional[str] = None, public: bool = True):
+        # References to deleted or foreign entities are skipped
+        source_index = self.index.get(source)
+        target_index = self.index.get(target)
+        if source_index is None or target_index is None or source_index == target_index:
+            return
+        self.outgoing[source_index].append(len(self.edges))
+        self.incoming[target_index].append(len(self.edges))
+        self.edges.append(Edge(source_index, target_index, edge_type or 'other', strength, bool(public)))
+
+    def node_visible(self, index: int, player_only: bool) -> bool:
+        return not player_only or self.nodes[index].visibility not in (None, 'dm_only')
+
+    def encode(
+        self,
+        edge_types: Optional[Set[str]] = None,
+        node_types: Optional[Set[str]] = None,
+        player_only: bool = False
+    ) -> Dict[str, Any]:
+        """Compact wire format: rows of values, edges pointing at node positions"""
+        positions: Dict[int, int] = {}
+        nodes = []
+        for index, node in enumerate(self.nodes):
+            if node_types and node.type not in node_types:
+                continue
+            if not self.node_visible(index, player_only):
+                continue
+            positions[index] = len(nodes)
+            nodes.append(list(node))
+
+        edges = []
+        for edge in self.edges:
+            if edge.source not in positions or edge.target not in positions:
+                continue
+            if edge_types and edge.type not in edge_types:
+                continue
+            if player_only and not edge.public:
+                continue
+            edges.append([positions[edge.source], positions[edge.target], edge.type, edge.strength, int(edge.public)])
+
+        return {
+            "version": self.version,
+            "node_fields": NODE_FIELDS,
+            "nodes": nodes,
+            "edge_fields": EDGE_FIELDS,
+            "edges": edges
+        }
+
+
+def build_graph(db: Session, campaign_id: int, version: int = 0) -> CampaignGraph:
+    """Build a campaign's graph with one query per node type"""
+    graph = CampaignGraph(campaign_id, version)
+
+    npcs = db.query(
+        NPC.id, NPC.name, NPC.occupation, NPC.visibility, NPC.location_id, NPC.relationships
+    ).filter(NPC.campaign_id == campaign_id).all()
+    locations = db.query(
+        Location.id, Location.name, Location.type, Location.visibility, Location.parent_location_id
+    ).filter(Location.campaign_id == campaign_id).all()
+    organizations = db.query(
+        Organization.id, Organization.name, Organization.type, Organization.visibility,
+        Organization.leader_npc_id, Organization.headquarters_location_id,
+        Organization.notable_members, Organization.allies, Organization.enemies
+    ).filter(Organization.campaign_id == campaign_id).all()
+
+    for npc in npcs:
+        graph.add_node(Node('npc', npc.id, npc.name, npc.occupation, npc.visibility))
+    for location in locations:
+        graph.add_node(Node('location', location.id, location.name, location.type, location.visibility))
+    for organization in organizations:
+        graph.add_node(Node('organization', organization.id, organization.name, organization.type, organization.visibility))
+
+    for npc in npcs:
+        for rel in npc.relationships or []:
+            if not isinstance(rel, dict):
+                continue
+            graph.add_edge(
+                ('npc', npc.id),
+                (rel.get('target_type') or 'npc', rel.get('target_id')),
+                rel.get('relationship_type'),
+                rel.get('strength'),
+                rel.get('public_knowledge', False)
+            )
+        if npc.location_id:
+            graph.add_edge(('npc', npc.id), ('location', npc.location_id), 'located_in')
+
+    for location in locations:
+        if location.parent_location_id:
+            graph.add_edge(('location', location.id), ('location', location.parent_location_id), 'part_of')
+
+    for organization in organizations:
+        node = ('organization', organization.id)
+        if organization.leader_npc_id:
+            graph.add_edge(('npc', organization.leader_npc_id), node, 'leads')
+        if organization.headquarters_location_id:
+            graph.add_edge(node, ('location', organization.headquarters_location_id), 'headquartered_at')
+        for member_id in _ids(organization.notable_members):
+            graph.add_edge(('npc', member_id), node, 'member_of')
+        for ally_id in _ids(organization.allies):
+            graph.add_edge(node, ('organization', ally_id), 'ally')
+        for enemy_id in _ids(organization.enemies):
+            graph.add_edge(node, ('organization', enemy_id), 'enemy')
+
+    return graph
+
+
+class CampaignGraphCache:
+    """Built graphs per campaign, dropped when graph content changes"""
+
+    def __init__(self):
+        self._graphs: Dict[int, CampaignGraph] = {}
+        # Bumped on every relevant change, so a build that raced a write isn't kept
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        campaign_versions.subscribe(self._on_change)
+
+    def _on_change(self, campaign_id: int, changes: List[Change]):
+        if any(change.table in GRAPH_TABLES or change.table == 'campaigns' for change in changes):
+            self.discard(campaign_id)
+
+    def discard(self, campaign_id: int):
+        with self._lock:
+            self._graphs.pop(campaign_id, None)
+            self._generations[campaign_id] = self._generations.get(campaign_id, 0) + 1
+
+    def get(self, db: Session, campaign_id: int) -> CampaignGraph:
+        """Get a campaign's graph, building it if needed"""
+        with self._lock:
+            graph = self._graphs.get(campaign_id)
+            if graph is not None:
+                return graph
+            generation = self._generations.get(campaign_id, 0)
+
+        graph = build_graph(db, campaign_id, campaign_versions.get(campaign_id))
+
+        with self._lock:
+            if self._generations.get(campaign_id, 0) == generation:
+                self._graphs[campaign_id] = graph
+        return graph
+
+
+# Global campaign graph cache
+campaign_graphs = CampaignGraphCache()
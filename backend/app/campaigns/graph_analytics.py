@@ -0,0 +1,245 @@
+"""
+Analytics over the campaign graph: shortest paths, connected components and
+degree/betweenness centrality.
+
+The graph is treated as undirected and simple (a friendship recorded on both
+NPCs is one link). It is packed into CSR arrays: `indptr[i]:indptr[i + 1]`
+slices the neighbours of node i out of `indices`. Results are stored on the
+CampaignGraph they were computed from, and that graph is replaced whenever
+the campaign's NPCs, locations or organizations change, so results are
+cached per campaign version.
+
+Betweenness uses Brandes' algorithm with each breadth-first search run one
+level at a time, gathering the whole frontier's neighbours from the CSR
+arrays at once. On graphs with more than
+BETWEENNESS_SAMPLES nodes it is estimated from that many source nodes.
+
+Usage:
+    from app.campaigns.graph_analytics import shortest_path, components, centrality
+
+    graph = campaign_graphs.get(db, campaign_id)
+    path = shortest_path(graph, ('npc', 1), ('npc', 42))
+"""
+
+import os
+from collections import deque
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.campaigns.graph import CampaignGraph
+
+# Source nodes used for betweenness; graphs up to this size get exact values
+BETWEENNESS_SAMPLES = int(os.getenv("GRAPH_BETWEENNESS_SAMPLES", "500"))
+
+
+class Adjacency(NamedTuple):
+    indptr: np.ndarray
+    indices: np.ndarray
+    # Both directions of every link
+    src: np.ndarray
+    dst: np.ndarray
+
+
+def _memo(graph: CampaignGraph, key, compute):
+    result = graph.memo.get(key)
+    if result is None:
+        result = graph.memo[key] = compute()
+    return result
+
+
+def adjacency(graph: CampaignGraph, edge_types: Optional[FrozenSet[str]] = None) -> Adjacency:
+    """Undirected simple adjacency of the graph, optionally over some edge types"""
+
+    def compute():
+        n = len(graph.nodes)
+        pairs = np.array(
+            [(edge.source, edge.target) for edge in graph.edges if not edge_types or edge.type in edge_types],
+            dtype=np.int64
+        ).reshape(-1, 2)
+        both = np.concatenate([pairs, pairs[:, ::-1]])
+        # One key per ordered pair removes duplicate links
+        keys = np.unique(both[:, 0] * n + both[:, 1]) if len(both) else np.zeros(0, dtype=np.int64)
+        src = (keys // n).astype(np.int32) if n else keys.astype(np.int32)
+        dst = (keys % n).astype(np.int32) if n else keys.astype(np.int32)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return Adjacency(indptr, dst, src, dst)
+
+    return _memo(graph, ('adjacency', edge_types), compute)
+
+
+def _node_info(graph: CampaignGraph, index: int) -> Dict[str, Any]:
+    node = graph.nodes[index]
+    return {"type": node.type, "id": node.id, "name": node.name}
+
+
+def _link_type(graph: CampaignGraph, first: int, second: int, edge_types: Optional[FrozenSet[str]]) -> Optional[str]:
+    for edge_index in graph.outgoing[first] + graph.incoming[first]:
+        edge = graph.edges[edge_index]
+        if {edge.source, edge.target} == {first, second} and (not edge_types or edge.type in edge_types):
+            return edge.type
+    return None
+
+
+def shortest_path(
+    graph: CampaignGraph,
+    source: Tuple[str, int],
+    target: Tuple[str, int],
+    edge_types: Optional[FrozenSet[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """Fewest-hop path between two entities, or None if they aren't connected"""
+    start = graph.index[source]
+    goal = graph.index[target]
+    adj = adjacency(graph, edge_types)
+
+    previous = {start: start}
+    queue = deque([start])
+    while queue and goal not in previous:
+        node = queue.popleft()
+        for neighbour in adj.indices[adj.indptr[node]:adj.indptr[node + 1]].tolist():
+            if neighbour not in previous:
+                previous[neighbour] = node
+                queue.append(neighbour)
+    if goal not in previous:
+        return None
+
+    path = [goal]
+    while path[-1] != start:
+        path.append(previous[path[-1]])
+    path.reverse()
+    return {
+        "degrees": len(path) - 1,
+        "nodes": [_node_info(graph, index) for index in path],
+        "links": [_link_type(graph, first, second, edge_types) for first, second in zip(path, path[1:])]
+    }
+
+
+def component_labels(graph: CampaignGraph, edge_types: Optional[FrozenSet[str]] = None) -> np.ndarray:
+    """Connected component number of every node"""
+
+    def compute():
+        adj = adjacency(graph, edge_types)
+        # Label propagation: every node takes the smallest label among its
+        # neighbours until nothing changes (at most diameter rounds)
+        labels = np.arange(len(graph.nodes), dtype=np.int32)
+        while True:
+            updated = labels.copy()
+            np.minimum.at(updated, adj.src, labels[adj.dst])
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                return labels
+            labels = updated
+
+    return _memo(graph, ('components', edge_types), compute)
+
+
+def components(
+    graph: CampaignGraph,
+    edge_types: Optional[FrozenSet[str]] = None,
+    min_size: int = 2
+) -> Dict[str, Any]:
+    """Connected groups of entities, largest first"""
+    labels = component_labels(graph, edge_types)
+    groups: Dict[int, List[int]] = {}
+    for index, label in enumerate(labels.tolist()):
+        groups.setdefault(label, []).append(index)
+    ordered = sorted(groups.values(), key=lambda members: (-len(members), members[0]))
+    return {
+        "total_components": len(ordered),
+        "isolated": sum(1 for members in ordered if len(members) == 1),
+        "components": [
+            {"size": len(members), "nodes": [_node_info(graph, index) for index in members]}
+            for members in ordered if len(members) >= min_size
+        ]
+    }
+
+
+def _edges_from(adj: Adjacency, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """All (node, neighbour) pairs of some nodes, gathered from their CSR slices"""
+    starts = adj.indptr[nodes]
+    counts = adj.indptr[nodes + 1] - starts
+    ends = np.cumsum(counts)
+    positions = np.repeat(starts - ends + counts, counts) + np.arange(ends[-1] if len(ends) else 0)
+    return np.repeat(nodes, counts), adj.indices[positions]
+
+
+def _betweenness(adj: Adjacency, n: int) -> Tuple[np.ndarray, bool]:
+    """Brandes betweenness, exact or estimated from sampled sources"""
+    scores = np.zeros(n, dtype=np.float64)
+    if n < 3 or not len(adj.src):
+        return scores, True
+
+    sources = np.arange(n)
+    exact = n <= BETWEENNESS_SAMPLES
+    if not exact:
+        sources = np.random.RandomState(0).choice(n, BETWEENNESS_SAMPLES, replace=False)
+
+    for source in sources:
+        distance = np.full(n, -1, dtype=np.int32)
+        distance[source] = 0
+        paths = np.zeros(n, dtype=np.float64)
+        paths[source] = 1.0
+        levels = []
+        frontier = np.array([source], dtype=np.int64)
+        depth = 0
+        while len(frontier):
+            step_src, step_dst = _edges_from(adj, frontier)
+            fresh = step_dst[distance[step_dst] == -1]
+            distance[fresh] = depth + 1
+            # Shortest-path edges from this level into the next one
+            step = distance[step_dst] == depth + 1
+            step_src, step_dst = step_src[step], step_dst[step]
+            paths += np.bincount(step_dst, weights=paths[step_src], minlength=n)
+            levels.append((step_src, step_dst))
+            frontier = np.unique(fresh)
+            depth += 1
+
+        dependency = np.zeros(n, dtype=np.float64)
+        for step_src, step_dst in reversed(levels):
+            weights = paths[step_src] / paths[step_dst] * (1.0 + dependency[step_dst])
+            dependency += np.bincount(step_src, weights=weights, minlength=n)
+        dependency[source] = 0.0
+        scores += dependency
+
+    # Each pair is counted from both ends; samples are scaled to all sources
+    scores /= 2.0
+    if not exact:
+        scores *= n / len(sources)
+    return scores, exact
+
+
+def centrality(
+    graph: CampaignGraph,
+    metric: str = "degree",
+    edge_types: Optional[FrozenSet[str]] = None,
+    node_type: Optional[str] = None,
+    limit: int = 20
+) -> Dict[str, Any]:
+    """Most central entities by degree or betweenness, normalized to 0-1"""
+    n = len(graph.nodes)
+    adj = adjacency(graph, edge_types)
+    degree = np.diff(adj.indptr)
+
+    if metric == "betweenness":
+        scores, exact = _memo(graph, ('betweenness', edge_types), lambda: _betweenness(adj, n))
+        scale = (n - 1) * (n - 2) / 2.0
+    else:
+        scores, exact = degree.astype(np.float64), True
+        scale = float(n - 1)
+    normalized = scores / scale if scale > 0 else scores
+
+    candidates = np.arange(n)
+    if node_type:
+        candidates = np.array([index for index, node in enumerate(graph.nodes) if node.type == node_type], dtype=np.int64)
+    ranked = candidates[np.argsort(-normalized[candidates], kind="stable")][:limit] if len(candidates) else candidates
+
+    return {
+        "metric": metric,
+        "exact": exact,
+        "total_nodes": n,
+        "results": [
+            {**_node_info(graph, index), "score": round(float(normalized[index]), 6), "degree": int(degree[index])}
+            for index in ranked.tolist()
+        ]
+    }
@@ -0,0 +1,79 @@
+"""
+Fetching several entities by id in one round trip.
+
+Entity lists accept ?ids=3,1,2 and return those entities in that order, and
+/campaigns/{id}/resolve takes mixed references such as npc:3,location:1 for
+pages that show entities of several types. Either way there is one query
+per entity type, however many ids are asked for.
+
+Usage:
+    from app.campaigns import multiget
+
+    ids = multiget.parse_ids('3,1,2')
+    npcs = multiget.in_order(db.query(NPC).filter(NPC.id.in_(ids)).all(), ids)
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.campaigns.references import MODELS
+
+# Ids (or references) accepted per request
+MAX_IDS = 500
+
+
+def parse_ids(value: str) -> List[int]:
+    """Ids from a comma-separated list, duplicates dropped and order kept"""
+    parts = [part.strip() for part in value.split(",") if part.strip()]
+    invalid = [part for part in parts if not part.isdigit()]
+    if invalid:
+        raise ValueError(f"Invalid id: {invalid[0]}")
+    ids = list(dict.fromkeys(int(part) for part in parts))
+    if len(ids) > MAX_IDS:
+        raise ValueError(f"At most {MAX_IDS} ids can be fetched at once")
+    return ids
+
+
+def parse_refs(value: str) -> List[Tuple[str, int]]:
+    """(type, id) pairs from a comma-separated list such as 'npc:3,location:1'"""
+    refs = []
+    for part in (part.strip() for part in value.split(",")):
+        if not part:
+            continue
+        entity_type, _, entity_id = part.partition(":")
+        if entity_type not in MODELS or not entity_id.isdigit():
+            raise ValueError(f"Invalid reference '{part}': use type:id with a type of {', '.join(MODELS)}")
+        refs.append((entity_type, int(entity_id)))
+    refs = list(dict.fromkeys(refs))
+    if len(refs) > MAX_IDS:
+        raise ValueError(f"At most {MAX_IDS} references can be resolved at once")
+    return refs
+
+
+def in_order(rows, ids: List[int]) -> List[Any]:
+    """Rows in the order their ids were asked for, missing ones left out"""
+    by_id = {row.id: row for row in rows}
+    return [by_id[row_id] for row_id in ids if row_id in by_id]
+
+
+def resolve(db: Session, campaign_id: int, refs: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    """Entities for mixed references, one query per type, in the order asked for"""
+    ids_by_type: Dict[str, List[int]] = {}
+    for entity_type, entity_id in refs:
+        ids_by_type.setdefault(entity_type, []).append(entity_id)
+
+    loaded: Dict[Tuple[str, int], Any] = {}
+    for entity_type, ids in ids_by_type.items():
+        model = MODELS[entity_type]
+        for obj in db.query(model).filter(model.id.in_(ids), model.campaign_id == campaign_id):
+            loaded[(entity_type, obj.id)] = obj
+
+    results = []
+    for entity_type, entity_id in refs:
+        entity = loaded.get((entity_type, entity_id))
+        result = {"type": entity_type, "id": entity_id, "found": entity is not None}
+        if entity is not None:
+            result[entity_type] = entity
+        results.append(result)
+    return results
@@ -0,0 +1,214 @@
+"""
+Reverse-reference index for entity backlinks.
+
+Entities point at each other through foreign keys and JSON id lists:
+plot hooks through related_npcs/locations/organizations, organizations
+through leader, headquarters, members, allies and enemies, events through
+their location and participants, NPC relationships, items' owners, and so
+on. entity_references stores one row per such reference, so "what refers
+to this NPC" is one indexed query on (target_type, target_id) instead of a
+scan over every row's JSON.
+
+Rows are rewritten from session flush events whenever an entity is created,
+updated or deleted, like the location closure table, so every write path
+keeps the index current. References to entities that no longer exist are
+kept, mirroring the stored JSON.
+
+Usage:
+    from app.campaigns import references
+
+    links = references.backlinks(db, campaign_id, 'npc', npc_id)
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, insert, or_, true
+from sqlalchemy.orm import Session
+
+from app.models import NPC, Location, Organization, PlotHook, Event, Item, EntityReference
+
+references_table = EntityReference.__table__
+
+# Per model: entity type, name column, and (field, kind, target type) of each reference.
+# Kinds: "id" is a foreign key, "ids" a JSON id list, and the others JSON object lists.
+REFERENCE_FIELDS = {
+    NPC: ("npc", "name", [
+        ("location_id", "id", "location"),
+        ("relationships", "relationships", None),
+    ]),
+    Location: ("location", "name", [
+        ("parent_location_id", "id", "location"),
+        ("connected_locations", "routes", "location"),
+    ]),
+    Organization: ("organization", "name", [
+        ("leader_npc_id", "id", "npc"),
+        ("headquarters_location_id", "id", "location"),
+        ("notable_members", "ids", "npc"),
+        ("allies", "ids", "organization"),
+        ("enemies", "ids", "organization"),
+    ]),
+    PlotHook: ("plot_hook", "title", [
+        ("related_npcs", "ids", "npc"),
+        ("related_locations", "ids", "location"),
+        ("related_organizations", "ids", "organization"),
+    ]),
+    Event: ("event", "title", [
+        ("location_id", "id", "location"),
+        ("participants", "participants", None),
+    ]),
+    Item: ("item", "name", [
+        ("current_owner_id", "id", "npc"),
+        ("current_location_id", "id", "location"),
+    ]),
+}
+
+TARGET_TYPES = {"npc", "location", "organization"}
+
+# Entity type -> model
+MODELS = {spec[0]: model for model, spec in REFERENCE_FIELDS.items()}
+
+
+def _as_id(value) -> Optional[int]:
+    if isinstance(value, dict):
+        value = value.get("id")
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def entry_target(kind: str, entry, target_type: Optional[str] = None) -> Optional[Tuple[Optional[str], Optional[int]]]:
+    """(type, id) an entry of a JSON reference field points at"""
+    if kind == "ids":
+        return target_type, _as_id(entry)
+    if not isinstance(entry, dict):
+        return None
+    if kind == "routes":
+        return "location", _as_id(entry.get("location_id"))
+    if kind == "relationships":
+        return entry.get("target_type") or "npc", _as_id(entry.get("target_id"))
+    if kind == "participants":
+        return entry.get("type"), _as_id(entry.get("id"))
+    return None
+
+
+def references(obj) -> List[Tuple[str, str, int]]:
+    """(field, target type, target id) of every reference an entity holds"""
+    found = []
+    for field, kind, target_type in REFERENCE_FIELDS[type(obj)][2]:
+        value = getattr(obj, field, None)
+        if value is None:
+            continue
+        if kind == "id":
+            found.append((field, target_type, value))
+            continue
+        for entry in value if isinstance(value, list) else []:
+            target = entry_target(kind, entry, target_type)
+            if target is not None:
+                found.append((field, *target))
+    # One row per distinct reference
+    return sorted({ref for ref in found if ref[1] in TARGET_TYPES and ref[2] is not None})
+
+
+def without_targets(kind: str, value, target_type: str, target_ids) -> Any:
+    """A JSON reference field's value with the entries pointing at some entities removed"""
+    if not isinstance(value, list):
+        return value
+    removed = {(target_type, target_id) for target_id in target_ids}
+    return [entry for entry in value if entry_target(kind, entry, target_type) not in removed]
+
+
+def _rows(obj) -> List[Dict[str, Any]]:
+    source_type, name_field, _ = REFERENCE_FIELDS[type(obj)]
+    name = getattr(obj, name_field, None)
+    return [
+        {
+            "campaign_id": obj.campaign_id,
+            "source_type": source_type,
+            "source_id": obj.id,
+            "source_name": name[:300] if name else None,
+            "field": field,
+            "target_type": target_type,
+            "target_id": target_id
+        }
+        for field, target_type, target_id in references(obj)
+    ]
+
+
+def _forget_sources(connection, objects):
+    if not objects:
+        return
+    sources = {}
+    for obj in objects:
+        sources.setdefault(REFERENCE_FIELDS[type(obj)][0], set()).add(obj.id)
+    connection.execute(delete(references_table).where(or_(*(
+        and_(references_table.c.source_type == source_type, references_table.c.source_id.in_(ids))
+        for source_type, ids in sources.items()
+    ))))
+
+
+def rebuild(db: Session, campaign_id: Optional[int] = None):
+    """Recompute references from the entities, for one campaign or all"""
+    rows = []
+    for model in REFERENCE_FIELDS:
+        query = db.query(model)
+        if campaign_id is not None:
+            query = query.filter(model.campaign_id == campaign_id)
+        for obj in query:
+            rows.extend(_rows(obj))
+    condition = references_table.c.campaign_id == campaign_id if campaign_id is not None else true()
+    db.execute(delete(references_table).where(condition))
+    if rows:
+        db.execute(insert(references_table), rows)
+
+
+def backfill(db: Session):
+    """Build the index for databases created before it existed"""
+    if db.query(EntityReference.id).first() is not None:
+        return
+    rebuild(db)
+    db.commit()
+
+
+def backlinks(db: Session, campaign_id: int, target_type: str, target_id: int) -> Dict[str, Any]:
+    """Entities referring to an entity, one entry per source with the fields involved"""
+    rows = db.query(
+        EntityReference.source_type, EntityReference.source_id, EntityReference.source_name, EntityReference.field
+    ).filter(
+        EntityReference.campaign_id == campaign_id,
+        EntityReference.target_type == target_type,
+        EntityReference.target_id == target_id
+    ).order_by(EntityReference.source_type, EntityReference.source_name, EntityReference.source_id).all()
+
+    sources: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    for source_type, source_id, source_name, field in rows:
+        # An NPC's relationship with itself, a location's route to itself, ...
+        if (source_type, source_id) == (target_type, target_id):
+            continue
+        entry = sources.setdefault((source_type, source_id), {
+            "type": source_type, "id": source_id, "name": source_name, "fields": []
+        })
+        entry["fields"].append(field)
+    return {"total": len(sources), "backlinks": list(sources.values())}
+
+
+@event.listens_for(Session, "before_flush")
+def _forget_deleted_sources(session, flush_context, instances):
+    deleted = [obj for obj in session.deleted if type(obj) in REFERENCE_FIELDS and obj.id is not None]
+    if deleted:
+        _forget_sources(session.connection(), deleted)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_references(session, flush_context):
+    changed = [obj for obj in list(session.new) + list(session.dirty) if type(obj) in REFERENCE_FIELDS]
+    if not changed:
+        return
+    connection = session.connection()
+    _forget_sources(connection, [obj for obj in changed if obj not in session.new])
+    rows = [row for obj in changed for row in _rows(obj)]
+    if rows:
+        connection.execute(insert(references_table), rows)
@@ -6,9 +6,15 @@ from app.database import get_db
 from app.models import Campaign, User, NPC, Location, Organization, PlotHook, Event, Item, SessionNote, Idea
 from app.schemas import (
     CampaignCreate, CampaignUpdate, Campaign as CampaignSchema, 
-    CampaignWithStats
+    CampaignWithStats, ResolvedEntities
 )
 from app.auth.router import get_current_user
+from app.ai.pool import warm_pool
+from app.ai.embeddings import semantic_index
+from app.campaigns.duplicates import duplicate_index
+from app.campaigns.graph import campaign_graphs
+from app.campaigns.graph_analytics import shortest_path, components, centrality
+from app.campaigns import multiget
 
 router = APIRouter()
 
@@ -117,13 +123,137 @@ async def delete_campaign(
     
     db.delete(campaign)
     db.commit()
+    warm_pool.discard(campaign_id)
     return {"message": "Campaign deleted successfully"}
 
+# Search result formatting, shared by text and semantic search
+def _npc_result(npc, campaign_id: int, q: str) -> Dict[str, Any]:
+    return {
+        'id': npc.id,
+        'name': npc.name,
+        'type': 'npc',
+        'description': npc.occupation or 'NPC',
+        'url': f'/campaigns/{campaign_id}/npcs/{npc.id}',
+        'match_field': 'name' if q.lower() in (npc.name or '').lower() else 'occupation'
+    }
+
+def _location_result(loc, campaign_id: int, q: str) -> Dict[str, Any]:
+    return {
+        'id': loc.id,
+        'name': loc.name,
+        'type': 'location',
+        'description': (loc.type or 'Location').replace('_', ' ').title(),
+        'url': f'/campaigns/{campaign_id}/locations/{loc.id}',
+        'match_field': 'name' if q.lower() in (loc.name or '').lower() else 'description'
+    }
+
+def _organization_result(org, campaign_id: int, q: str) -> Dict[str, Any]:
+    return {
+        'id': org.id,
+        'name': org.name,
+        'type': 'organization',
+        'description': (org.type or 'Organization').replace('_', ' ').title(),
+        'url': f'/campaigns/{campaign_id}/organizations/{org.id}',
+        'match_field': 'name' if q.lower() in (org.name or '').lower() else 'type'
+    }
+
+def _plot_hook_result(hook, campaign_id: int, q: str) -> Dict[str, Any]:
+    return {
+        'id': hook.id,
+        'name': hook.title,
+        'type': 'plot_hook',
+        'description': f"Plot Hook - {hook.status or 'Draft'}".title(),
+        'url': f'/campaigns/{campaign_id}/plot-hooks/{hook.id}',
+        'match_field': 'title' if q.lower() in (hook.title or '').lower() else 'description'
+    }
+
+def _item_result(item, campaign_id: int, q: str) -> Dict[str, Any]:
+    return {
+        'id': item.id,
+        'name': item.name,
+        'type': 'item',
+        'description': f"{(item.type or 'Item').replace('_', ' ').title()} - {item.rarity or 'Common'}".title(),
+        'url': f'/campaigns/{campaign_id}/items/{item.id}',
+        'match_field': 'name' if q.lower() in (item.name or '').lower() else 'description'
+    }
+
+def _event_result(event, campaign_id: int, q: str) -> Dict[str, Any]:
+    return {
+        'id': event.id,
+        'name': event.title,
+        'type': 'event',
+        'description': f"Event - {(event.event_type or 'Event').replace('_', ' ').title()}",
+        'url': f'/campaigns/{campaign_id}/events/{event.id}',
+        'match_field': 'title' if q.lower() in (event.title or '').lower() else 'description'
+    }
+
+def _idea_result(idea, campaign_id: int, q: str) -> Dict[str, Any]:
+    return {
+        'id': idea.id,
+        'name': idea.content[:50] + ('...' if len(idea.content) > 50 else ''),
+        'type': 'idea',
+        'description': f"Idea - {(idea.status or 'Raw Idea').replace('_', ' ').title()}",
+        'url': f'/campaigns/{campaign_id}/ideas/{idea.id}',
+        'match_field': 'content'
+    }
+
+def _session_result(session, campaign_id: int, q: str) -> Dict[str, Any]:
+    return {
+        'id': session.id,
+        'name': session.title,
+        'type': 'session',
+        'description': f"Session {session.session_number or 'Note'} - {(session.status or 'Draft').title()}",
+        'url': f'/campaigns/{campaign_id}/sessions/{session.id}',
+        'match_field': 'title' if q.lower() in (session.title or '').lower() else 'summary'
+    }
+
+# Search result categories by table: (result key, model, formatter)
+_SEARCH_CATEGORIES = {
+    'npcs': ('npcs', NPC, _npc_result),
+    'locations': ('locations', Location, _location_result),
+    'organizations': ('organizations', Organization, _organization_result),
+    'plot_hooks': ('plot_hooks', PlotHook, _plot_hook_result),
+    'items': ('items', Item, _item_result),
+    'events': ('events', Event, _event_result),
+    'ideas_inbox': ('ideas', Idea, _idea_result),
+    'session_notes': ('sessions', SessionNote, _session_result)
+}
+
+async def _semantic_search(db: Session, campaign_id: int, q: str, limit: int) -> Dict[str, Any]:
+    """Rank campaign content by embedding similarity to the query"""
+    try:
+        matches = await semantic_index.search(db, campaign_id, q, limit=limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Semantic search unavailable: {str(e)}"
+        )
+    
+    results = {key: [] for key, _, _ in _SEARCH_CATEGORIES.values()}
+    for table, scored in matches.items():
+        key, model, formatter = _SEARCH_CATEGORIES[table]
+        rows = {row.id: row for row in db.query(model).filter(model.id.in_([entity_id for entity_id, _ in scored]))}
+        for entity_id, score in scored:
+            if entity_id not in rows:
+                continue
+            result = formatter(rows[entity_id], campaign_id, q)
+            result['match_field'] = 'semantic'
+            result['score'] = score
+            results[key].append(result)
+    
+    return {
+        'query': q,
+        'mode': 'semantic',
+        'total_results': sum(len(category) for category in results.values()),
+        'results': results
+    }
+
 @router.get("/{campaign_id}/search")
 async def global_search(
     campaign_id: int,
     q: str = Query(..., min_length=1, description="Search query"),
     limit: int = Query(50, ge=1, le=100, description="Maximum results per category"),
+    mode: str = Query("text", pattern="^(text|semantic)$", description="text matches substrings, semantic matches meaning"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -140,6 +270,9 @@ async def global_search(
             detail="Campaign not found"
         )
     
+    if mode == "semantic":
+        return await _semantic_search(db, campaign_id, q, limit)
+    
     search_filter = f"%{q}%"
     results = {}
     
@@ -154,17 +287,7 @@ async def global_search(
         )
     ).limit(limit).all()
     
-    results['npcs'] = [
-        {
-            'id': npc.id,
-            'name': npc.name,
-            'type': 'npc',
-            'description': npc.occupation or 'NPC',
-            'url': f'/campaigns/{campaign_id}/npcs/{npc.id}',
-            'match_field': 'name' if q.lower() in (npc.name or '').lower() else 'occupation'
-        }
-        for npc in npc_results
-    ]
+    results['npcs'] = [_npc_result(npc, campaign_id, q) for npc in npc_results]
     
     # Search Locations
     location_results = db.query(Location).filter(
@@ -176,17 +299,7 @@ async def global_search(
         )
     ).limit(limit).all()
     
-    results['locations'] = [
-        {
-            'id': loc.id,
-            'name': loc.name,
-            'type': 'location',
-            'description': (loc.type or 'Location').replace('_', ' ').title(),
-            'url': f'/campaigns/{campaign_id}/locations/{loc.id}',
-            'match_field': 'name' if q.lower() in (loc.name or '').lower() else 'description'
-        }
-        for loc in location_results
-    ]
+    results['locations'] = [_location_result(loc, campaign_id, q) for loc in location_results]
     
     # Search Organizations
     org_results = db.query(Organization).filter(
@@ -199,17 +312,7 @@ async def global_search(
         )
     ).limit(limit).all()
     
-    results['organizations'] = [
-        {
-            'id': org.id,
-            'name': org.name,
-            'type': 'organization',
-            'description': (org.type or 'Organization').replace('_', ' ').title(),
-            'url': f'/campaigns/{campaign_id}/organizations/{org.id}',
-            'match_field': 'name' if q.lower() in (org.name or '').lower() else 'type'
-        }
-        for org in org_results
-    ]
+    results['organizations'] = [_organization_result(org, campaign_id, q) for org in org_results]
     
     # Search Plot Hooks
     plot_results = db.query(PlotHook).filter(
@@ -221,17 +324,7 @@ async def global_search(
         )
     ).limit(limit).all()
     
-    results['plot_hooks'] = [
-        {
-            'id': hook.id,
-            'name': hook.title,
-            'type': 'plot_hook',
-            'description': f"Plot Hook - {hook.status or 'Draft'}".title(),
-            'url': f'/campaigns/{campaign_id}/plot-hooks/{hook.id}',
-            'match_field': 'title' if q.lower() in (hook.title or '').lower() else 'description'
-        }
-        for hook in plot_results
-    ]
+    results['plot_hooks'] = [_plot_hook_result(hook, campaign_id, q) for hook in plot_results]
     
     # Search Items
     item_results = db.query(Item).filter(
@@ -243,17 +336,7 @@ async def global_search(
         )
     ).limit(limit).all()
     
-    results['items'] = [
-        {
-            'id': item.id,
-            'name': item.name,
-            'type': 'item',
-            'description': f"{(item.item_type or 'Item').replace('_', ' ').title()} - {item.rarity or 'Common'}".title(),
-            'url': f'/campaigns/{campaign_id}/items/{item.id}',
-            'match_field': 'name' if q.lower() in (item.name or '').lower() else 'description'
-        }
-        for item in item_results
-    ]
+    results['items'] = [_item_result(item, campaign_id, q) for item in item_results]
     
     # Search Events
     event_results = db.query(Event).filter(
@@ -265,17 +348,7 @@ async def global_search(
         )
     ).limit(limit).all()
     
-    results['events'] = [
-        {
-            'id': event.id,
-            'name': event.title,
-            'type': 'event',
-            'description': f"Event - {(event.event_type or 'Event').replace('_', ' ').title()}",
-            'url': f'/campaigns/{campaign_id}/events/{event.id}',
-            'match_field': 'title' if q.lower() in (event.title or '').lower() else 'description'
-        }
-        for event in event_results
-    ]
+    results['events'] = [_event_result(event, campaign_id, q) for event in event_results]
     
     # Search Ideas
     idea_results = db.query(Idea).filter(
@@ -286,17 +359,7 @@ async def global_search(
         )
     ).limit(limit).all()
     
-    results['ideas'] = [
-        {
-            'id': idea.id,
-            'name': idea.content[:50] + ('...' if len(idea.content) > 50 else ''),
-            'type': 'idea',
-            'description': f"Idea - {(idea.status or 'Raw Idea').replace('_', ' ').title()}",
-            'url': f'/campaigns/{campaign_id}/ideas/{idea.id}',
-            'match_field': 'content'
-        }
-        for idea in idea_results
-    ]
+    results['ideas'] = [_idea_result(idea, campaign_id, q) for idea in idea_results]
     
     # Search Session Notes
     session_results = db.query(SessionNote).filter(
@@ -309,17 +372,7 @@ async def global_search(
         )
     ).limit(limit).all()
     
-    results['sessions'] = [
-        {
-            'id': session.id,
-            'name': session.title,
-            'type': 'session',
-            'description': f"Session {session.session_number or 'Note'} - {(session.status or 'Draft').title()}",
-            'url': f'/campaigns/{campaign_id}/sessions/{session.id}',
-            'match_field': 'title' if q.lower() in (session.title or '').lower() else 'summary'
-        }
-        for session in session_results
-    ]
+    results['sessions'] = [_session_result(session, campaign_id, q) for session in session_results]
     
     # Calculate total results
     total_results = sum(len(results[category]) for category in results.keys())
@@ -330,6 +383,59 @@ async def global_search(
         'results': results
     }
 
+# Duplicate report kinds: query value -> (table, url segment)
+_DUPLICATE_KINDS = {
+    'npc': ('npcs', 'npcs'),
+    'location': ('locations', 'locations'),
+    'idea': ('ideas_inbox', 'ideas')
+}
+
+@router.get("/{campaign_id}/duplicates")
+async def get_duplicate_clusters(
+    campaign_id: int,
+    kind: Optional[str] = Query(None, pattern="^(npc|location|idea)$", description="Only report this kind of content"),
+    threshold: Optional[float] = Query(None, ge=0.1, le=1.0, description="Minimum estimated similarity"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Groups of near-duplicate NPCs, locations and ideas in a campaign"""
+    campaign = db.query(Campaign).filter(
+        Campaign.id == campaign_id,
+        Campaign.user_id == current_user.id
+    ).first()
+    
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    
+    kinds = [kind] if kind else list(_DUPLICATE_KINDS)
+    segments = {table: (name, segment) for name, (table, segment) in _DUPLICATE_KINDS.items()}
+    clusters = duplicate_index.clusters(
+        db, campaign_id,
+        tables=[_DUPLICATE_KINDS[name][0] for name in kinds],
+        threshold=threshold
+    )
+    
+    results = []
+    for cluster in clusters:
+        name, segment = segments[cluster["table"]]
+        results.append({
+            "kind": name,
+            "min_similarity": cluster["min_similarity"],
+            "members": [
+                {**member, "url": f"/campaigns/{campaign_id}/{segment}/{member['id']}"}
+                for member in cluster["members"]
+            ]
+        })
+    
+    return {
+        "total_clusters": len(results),
+        "duplicate_entries": sum(len(cluster["members"]) for cluster in results),
+        "clusters": results
+    }
+
 # Helper function to verify campaign ownership
 async def verify_campaign_access(
     campaign_id: int,
@@ -347,4 +453,142 @@ async def verify_campaign_access(
             detail="Campaign not found"
         )
     
-    return campaign
\ No newline at end of file
+    return campaign
+
+_GRAPH_NODE_LABELS = {'npc': 'NPC', 'location': 'Location', 'organization': 'Organization'}
+_GRAPH_NODE_TYPES = set(_GRAPH_NODE_LABELS)
+
+def _csv(value: Optional[str]) -> Optional[set]:
+    return {part.strip() for part in value.split(",") if part.strip()} if value else None
+
+@router.get("/{campaign_id}/graph")
+async def get_campaign_graph(
+    campaign_id: int,
+    edge_types: Optional[str] = Query(None, description="Comma-separated edge types to include, e.g. friend,enemy,member_of"),
+    node_types: Optional[str] = Query(None, description="Comma-separated node types: npc, location, organization"),
+    visibility: str = Query("all", pattern="^(all|player)$", description="'player' drops dm_only nodes and secret relationships"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """All NPCs, locations and organizations of a campaign and the edges between them.
+
+    Nodes are rows of `node_fields`; edges are rows of `edge_fields` whose
+    source and target are positions in `nodes`.
+    """
+    node_filter = _csv(node_types)
+    if node_filter and not node_filter <= _GRAPH_NODE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown node types: {', '.join(sorted(node_filter - _GRAPH_NODE_TYPES))}"
+        )
+    
+    graph = campaign_graphs.get(db, campaign_id)
+    return graph.encode(
+        edge_types=_csv(edge_types),
+        node_types=node_filter,
+        player_only=visibility == "player"
+    )
+
+def _graph_node(graph, ref: str, name: str):
+    """Parse a 'type:id' node reference such as 'npc:12'"""
+    node_type, _, node_id = ref.partition(":")
+    if node_type not in _GRAPH_NODE_TYPES or not node_id.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{name} must look like 'npc:12', 'location:3' or 'organization:7'"
+        )
+    key = (node_type, int(node_id))
+    if key not in graph.index:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"{_GRAPH_NODE_LABELS[node_type]} {node_id} not found"
+        )
+    return key
+
+def _edge_filter(edge_types: Optional[str]) -> Optional[frozenset]:
+    types = _csv(edge_types)
+    return frozenset(types) if types else None
+
+@router.get("/{campaign_id}/graph/path")
+async def get_graph_path(
+    campaign_id: int,
+    source: str = Query(..., description="Start entity, e.g. npc:12"),
+    target: str = Query(..., description="End entity, e.g. npc:40"),
+    edge_types: Optional[str] = Query(None, description="Comma-separated edge types to follow"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Shortest chain of connections between two entities"""
+    graph = campaign_graphs.get(db, campaign_id)
+    path = shortest_path(
+        graph,
+        _graph_node(graph, source, "source"),
+        _graph_node(graph, target, "target"),
+        _edge_filter(edge_types)
+    )
+    if path is None:
+        return {"connected": False, "degrees": None, "nodes": [], "links": []}
+    return {"connected": True, **path}
+
+@router.get("/{campaign_id}/graph/components")
+async def get_graph_components(
+    campaign_id: int,
+    edge_types: Optional[str] = Query(None, description="Comma-separated edge types to follow"),
+    min_size: int = Query(2, ge=1, description="Smallest group to list"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Groups of entities connected to each other, largest first"""
+    graph = campaign_graphs.get(db, campaign_id)
+    return components(graph, _edge_filter(edge_types), min_size)
+
+@router.get("/{campaign_id}/graph/centrality")
+async def get_graph_centrality(
+    campaign_id: int,
+    metric: str = Query("degree", pattern="^(degree|betweenness)$"),
+    node_type: Optional[str] = Query(None, pattern="^(npc|location|organization)$", description="Only rank this kind of entity"),
+    edge_types: Optional[str] = Query(None, description="Comma-separated edge types to follow"),
+    limit: int = Query(20, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Most connected entities (degree) or key brokers between groups (betweenness)"""
+    graph = campaign_graphs.get(db, campaign_id)
+    return centrality(graph, metric, _edge_filter(edge_types), node_type, limit)
+
+@router.get("/{campaign_id}/resolve", response_model=ResolvedEntities)
+async def resolve_entities(
+    campaign_id: int,
+    refs: str = Query(..., description="Comma-separated type:id references, e.g. npc:3,location:1,organization:7"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Entities of mixed types in one call, in the order given; unknown ones have found=false."""
+    try:
+        parsed = multiget.parse_refs(refs)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return {"results": multiget.resolve(db, campaign_id, parsed)}
+
+def requested_ids(
+    ids: Optional[str] = Query(None, description="Comma-separated ids to fetch, returned in this order")
+) -> Optional[List[int]]:
+    """Parse ?ids= for fetching several entries of a list at once"""
+    if ids is None:
+        return None
+    try:
+        return multiget.parse_ids(ids)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
@@ -0,0 +1,102 @@
+"""
+Per-campaign change tracking.
+
+Every committed insert, update or delete of a campaign content row bumps that
+campaign's version number and notifies subscribers with the rows that
+changed. Caches derived from campaign content key themselves on the version,
+or subscribe to apply the changes incrementally, instead of rebuilding on
+every request.
+
+Versions are kept in memory, so they start over when the process restarts;
+they are only meant for comparing against caches held by the same process.
+
+Usage:
+    from app.campaigns.versioning import campaign_versions
+
+    version = campaign_versions.get(campaign_id)
+    campaign_versions.subscribe(lambda campaign_id, changes: ...)
+"""
+
+import threading
+from typing import Callable, Dict, List, NamedTuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import Campaign
+
+# Tables holding campaign content. Others with a campaign_id are derived from
+# it or bookkeeping (embeddings, the reference index, travel routes, AI jobs),
+# and writing them doesn't change the campaign's version
+CONTENT_TABLES = {
+    "campaigns", "npcs", "locations", "organizations", "plot_hooks", "events", "items",
+    "ideas_inbox", "session_notes"
+}
+
+
+class Change(NamedTuple):
+    table: str
+    id: int
+    deleted: bool
+
+
+class CampaignVersions:
+    """Version counters and change notifications for campaign content"""
+
+    def __init__(self):
+        self._versions: Dict[int, int] = {}
+        self._subscribers: List[Callable[[int, List[Change]], None]] = []
+        self._lock = threading.Lock()
+
+    def get(self, campaign_id: int) -> int:
+        """Current version of a campaign's content"""
+        return self._versions.get(campaign_id, 0)
+
+    def subscribe(self, callback: Callable[[int, List[Change]], None]):
+        """Call `callback(campaign_id, changes)` after each commit that touches a campaign"""
+        self._subscribers.append(callback)
+
+    def bump(self, campaign_id: int, changes: List[Change]):
+        with self._lock:
+            self._versions[campaign_id] = self._versions.get(campaign_id, 0) + 1
+        for callback in self._subscribers:
+            try:
+                callback(campaign_id, changes)
+            except Exception as e:
+                print(f"Campaign change subscriber failed: {e}")
+
+
+def _campaign_id(obj):
+    if isinstance(obj, Campaign):
+        return obj.id
+    return getattr(obj, "campaign_id", None)
+
+
+def record_changes(session: Session, campaign_id: int, changes: List[Change]):
+    """Queue changes made with bulk statements, which flush events don't see"""
+    session.info.setdefault("campaign_changes", {}).setdefault(campaign_id, []).extend(changes)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault("campaign_changes", {})
+    for objects, deleted in ((session.new, False), (session.dirty, False), (session.deleted, True)):
+        for obj in objects:
+            campaign_id = _campaign_id(obj)
+            if campaign_id is None or getattr(obj, "__tablename__", None) not in CONTENT_TABLES:
+                continue
+            pending.setdefault(campaign_id, []).append(Change(obj.__tablename__, obj.id, deleted))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session):
+    pending = session.info.pop("campaign_changes", None)
+    for campaign_id, changes in (pending or {}).items():
+        campaign_versions.bump(campaign_id, changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("campaign_changes", None)
+
+
+# Global campaign version tracker
+campaign_versions = CampaignVersions()
@@ -3,9 +3,11 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
 from app.models import Event, Campaign, Location, NPC, User
-from app.schemas import EventCreate, EventUpdate, Event as EventSchema, PaginatedEventResponse
+from app.schemas import EventCreate, EventUpdate, Event as EventSchema, PaginatedEventResponse, EventBundle
 from app.auth.router import get_current_user
-from app.campaigns.router import verify_campaign_access
+from app.campaigns.router import verify_campaign_access, requested_ids
+from app.campaigns import bundles, multiget
+from app.locations import hierarchy
 
 router = APIRouter()
 
@@ -21,7 +23,9 @@ async def get_events(
     event_type: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     visibility: Optional[str] = Query(None),
-    location_id: Optional[int] = Query(None)
+    location_id: Optional[int] = Query(None),
+    within_location_id: Optional[int] = Query(None, description="Only include entries anywhere inside this location"),
+    ids: Optional[List[int]] = Depends(requested_ids)
 ):
     """Get events for a campaign with optional filtering."""
     query = db.query(Event).filter(Event.campaign_id == campaign_id)
@@ -47,6 +51,14 @@ async def get_events(
     if location_id is not None:
         query = query.filter(Event.location_id == location_id)
     
+    if within_location_id is not None:
+        query = query.filter(Event.location_id.in_(hierarchy.subtree_ids(within_location_id)))
+    
+    # Specific entries, in the order asked for
+    if ids is not None:
+        items = multiget.in_order(query.filter(Event.id.in_(ids)).all(), ids)
+        return {"total": len(items), "items": items}
+    
     # Get total count
     total = query.count()
     
@@ -125,6 +137,33 @@ async def get_event(
     
     return event
 
+@router.get("/{event_id}/bundle", response_model=EventBundle)
+async def get_event_bundle(
+    campaign_id: int,
+    event_id: int,
+    include: Optional[str] = Query(None, description="Comma-separated parts to embed, all by default"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get an event together with its related entities, for its detail page."""
+    try:
+        parts = bundles.parse_includes("event", include)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    result = bundles.bundle(db, campaign_id, "event", event_id, parts)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+    
+    return result
+
 @router.put("/{event_id}", response_model=EventSchema)
 async def update_event(
     campaign_id: int,
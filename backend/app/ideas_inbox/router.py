@@ -3,9 +3,11 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
 from app.models import Idea, Campaign, User
-from app.schemas import IdeaCreate, IdeaUpdate, Idea as IdeaSchema, PaginatedIdeaResponse
+from app.schemas import IdeaCreate, IdeaUpdate, Idea as IdeaSchema, IdeaCreated as IdeaCreatedSchema, PaginatedIdeaResponse
 from app.auth.router import get_current_user
-from app.campaigns.router import verify_campaign_access
+from app.campaigns.router import verify_campaign_access, requested_ids
+from app.campaigns import multiget
+from app.campaigns.duplicates import duplicate_index
 
 router = APIRouter()
 
@@ -20,7 +22,8 @@ async def get_ideas(
     search: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     idea_type: Optional[str] = Query(None),
-    priority: Optional[str] = Query(None)
+    priority: Optional[str] = Query(None),
+    ids: Optional[List[int]] = Depends(requested_ids)
 ):
     """Get ideas for a campaign with optional filtering."""
     query = db.query(Idea).filter(Idea.campaign_id == campaign_id)
@@ -42,6 +45,11 @@ async def get_ideas(
     if priority:
         query = query.filter(Idea.priority == priority)
     
+    # Specific entries, in the order asked for
+    if ids is not None:
+        items = multiget.in_order(query.filter(Idea.id.in_(ids)).all(), ids)
+        return {"total": len(items), "items": items}
+    
     # Get total count
     total = query.count()
     
@@ -66,7 +74,7 @@ async def get_ideas(
         "items": ideas
     }
 
-@router.post("/", response_model=IdeaSchema)
+@router.post("/", response_model=IdeaCreatedSchema)
 async def create_idea(
     campaign_id: int,
     idea_data: IdeaCreate,
@@ -74,7 +82,10 @@ async def create_idea(
     campaign: Campaign = Depends(verify_campaign_access),
     db: Session = Depends(get_db)
 ):
-    """Create a new idea."""
+    """Create a new idea, flagging existing ideas it nearly duplicates."""
+    # Checked before saving, so the new idea doesn't match itself
+    duplicates = duplicate_index.find(db, campaign_id, 'ideas_inbox', idea_data.dict())
+    
     db_idea = Idea(
         **idea_data.dict(),
         campaign_id=campaign_id
@@ -83,7 +94,9 @@ async def create_idea(
     db.commit()
     db.refresh(db_idea)
     
-    return db_idea
+    response = IdeaCreatedSchema.model_validate(db_idea)
+    response.possible_duplicates = duplicates
+    return response
 
 @router.get("/{idea_id}", response_model=IdeaSchema)
 async def get_idea(
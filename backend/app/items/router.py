@@ -3,9 +3,11 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
 from app.models import Item, Campaign, NPC, Location, User
-from app.schemas import ItemCreate, ItemUpdate, Item as ItemSchema, PaginatedItemResponse
+from app.schemas import ItemCreate, ItemUpdate, Item as ItemSchema, PaginatedItemResponse, ItemBundle
 from app.auth.router import get_current_user
-from app.campaigns.router import verify_campaign_access
+from app.campaigns.router import verify_campaign_access, requested_ids
+from app.campaigns import bundles, multiget
+from app.locations import hierarchy
 
 router = APIRouter()
 
@@ -24,7 +26,9 @@ async def get_items(
     visibility: Optional[str] = Query(None),
     current_owner_id: Optional[int] = Query(None),
     current_location_id: Optional[int] = Query(None),
-    attunement_required: Optional[bool] = Query(None)
+    within_location_id: Optional[int] = Query(None, description="Only include entries anywhere inside this location"),
+    attunement_required: Optional[bool] = Query(None),
+    ids: Optional[List[int]] = Depends(requested_ids)
 ):
     """Get items for a campaign with optional filtering."""
     query = db.query(Item).filter(Item.campaign_id == campaign_id)
@@ -57,9 +61,17 @@ async def get_items(
     if current_location_id is not None:
         query = query.filter(Item.current_location_id == current_location_id)
     
+    if within_location_id is not None:
+        query = query.filter(Item.current_location_id.in_(hierarchy.subtree_ids(within_location_id)))
+    
     if attunement_required is not None:
         query = query.filter(Item.attunement_required == attunement_required)
     
+    # Specific entries, in the order asked for
+    if ids is not None:
+        items = multiget.in_order(query.filter(Item.id.in_(ids)).all(), ids)
+        return {"total": len(items), "items": items}
+    
     # Get total count
     total = query.count()
     
@@ -136,6 +148,33 @@ async def get_item(
     
     return item
 
+@router.get("/{item_id}/bundle", response_model=ItemBundle)
+async def get_item_bundle(
+    campaign_id: int,
+    item_id: int,
+    include: Optional[str] = Query(None, description="Comma-separated parts to embed, all by default"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get an item together with its related entities, for its detail page."""
+    try:
+        parts = bundles.parse_includes("item", include)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    result = bundles.bundle(db, campaign_id, "item", item_id, parts)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Item not found"
+        )
+    
+    return result
+
 @router.put("/{item_id}", response_model=ItemSchema)
 async def update_item(
     campaign_id: int,
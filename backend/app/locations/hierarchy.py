@@ -0,0 +1,193 @@
+"""
+Closure table for the location hierarchy.
+
+location_closure holds one row per (ancestor, descendant) pair, including
+every location paired with itself, so "everything inside this kingdom" and
+"the breadcrumbs above this tavern" are single indexed queries instead of a
+round trip per level. Moving a location under one of its own sub-locations
+is a single lookup as well.
+
+The table is kept in step from session flush events, like campaign
+versioning, so every code path that creates, reparents or deletes a
+Location maintains it with set-based statements.
+
+Usage:
+    from app.locations import hierarchy
+
+    query = query.filter(NPC.location_id.in_(hierarchy.subtree_ids(kingdom_id)))
+    breadcrumbs = hierarchy.ancestors(db, tavern_id)
+"""
+
+from typing import List, Optional
+
+from sqlalchemy import and_, delete, event, func, insert, inspect, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Location, LocationClosure
+
+closure = LocationClosure.__table__
+
+
+def subtree_ids(location_id: int, include_self: bool = True):
+    """SELECT of the ids of a location and every location inside it"""
+    stmt = select(closure.c.descendant_id).where(closure.c.ancestor_id == location_id)
+    if not include_self:
+        stmt = stmt.where(closure.c.depth > 0)
+    return stmt
+
+
+def ancestors(db: Session, location_id: int) -> List[Location]:
+    """Locations containing a location, outermost first"""
+    return db.query(Location).join(
+        LocationClosure, LocationClosure.ancestor_id == Location.id
+    ).filter(
+        LocationClosure.descendant_id == location_id,
+        LocationClosure.depth > 0
+    ).order_by(LocationClosure.depth.desc()).all()
+
+
+def descendants(db: Session, location_id: int, max_depth: Optional[int] = None) -> List[Location]:
+    """Locations inside a location, nearest levels first"""
+    query = db.query(Location).join(
+        LocationClosure, LocationClosure.descendant_id == Location.id
+    ).filter(
+        LocationClosure.ancestor_id == location_id,
+        LocationClosure.depth > 0
+    )
+    if max_depth is not None:
+        query = query.filter(LocationClosure.depth <= max_depth)
+    return query.order_by(LocationClosure.depth, Location.name).all()
+
+
+def levels(campaign_id: int):
+    """Subquery of (location_id, level) for a campaign, top-level locations at level 0"""
+    return select(
+        closure.c.descendant_id.label("location_id"),
+        (func.count() - 1).label("level")
+    ).where(
+        closure.c.descendant_id.in_(select(Location.id).where(Location.campaign_id == campaign_id))
+    ).group_by(closure.c.descendant_id).subquery()
+
+
+def is_within(db: Session, location_id: int, ancestor_id: int) -> bool:
+    """Whether a location is ancestor_id itself or somewhere inside it"""
+    return db.query(LocationClosure).filter(
+        LocationClosure.ancestor_id == ancestor_id,
+        LocationClosure.descendant_id == location_id
+    ).first() is not None
+
+
+def rebuild(db: Session, campaign_id: int):
+    """Recompute a campaign's closure rows from parent_location_id"""
+    parents = dict(db.query(Location.id, Location.parent_location_id).filter(Location.campaign_id == campaign_id).all())
+    db.execute(delete(closure).where(
+        closure.c.descendant_id.in_(select(Location.id).where(Location.campaign_id == campaign_id))
+    ))
+    rows = []
+    for location_id in parents:
+        current, depth, seen = location_id, 0, set()
+        # Stops at the root, at parents outside the campaign and at existing cycles
+        while current in parents and current not in seen:
+            seen.add(current)
+            rows.append({"ancestor_id": current, "descendant_id": location_id, "depth": depth})
+            current, depth = parents[current], depth + 1
+    if rows:
+        db.execute(insert(closure), rows)
+
+
+def backfill(db: Session):
+    """Build closure rows for campaigns with locations that have none, e.g. after upgrading"""
+    missing = db.query(Location.campaign_id).outerjoin(
+        LocationClosure,
+        and_(LocationClosure.ancestor_id == Location.id, LocationClosure.descendant_id == Location.id)
+    ).filter(LocationClosure.ancestor_id.is_(None)).distinct().all()
+    for (campaign_id,) in missing:
+        rebuild(db, campaign_id)
+    if missing:
+        db.commit()
+        print(f"Rebuilt location hierarchy for {len(missing)} campaign(s)")
+
+
+def _insert_paths(connection, location_id: int, parent_id: Optional[int]):
+    connection.execute(insert(closure).values(ancestor_id=location_id, descendant_id=location_id, depth=0))
+    if parent_id:
+        connection.execute(insert(closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(closure.c.ancestor_id, literal(location_id), closure.c.depth + 1).where(
+                closure.c.descendant_id == parent_id
+            )
+        ))
+
+
+def _move_subtree(connection, location_id: int, parent_id: Optional[int]):
+    subtree = select(closure.c.descendant_id).where(closure.c.ancestor_id == location_id)
+    # Detach the subtree from its old ancestors, keeping its internal paths
+    connection.execute(delete(closure).where(
+        closure.c.descendant_id.in_(subtree),
+        closure.c.ancestor_id.not_in(subtree)
+    ))
+    if parent_id:
+        above = closure.alias("above")
+        below = closure.alias("below")
+        connection.execute(insert(closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(above.c.ancestor_id, below.c.descendant_id, above.c.depth + below.c.depth + 1).where(
+                above.c.descendant_id == parent_id,
+                below.c.ancestor_id == location_id
+            )
+        ))
+
+
+def remove(connection, location_ids: List[int]):
+    """Drop the closure rows of locations removed with a bulk DELETE
+
+    Sub-locations that aren't removed themselves become top-level locations,
+    so their parent_location_id must be cleared in the same transaction.
+    """
+    removed_ancestors = select(closure.c.ancestor_id).where(closure.c.descendant_id.in_(location_ids))
+    removed_descendants = select(closure.c.descendant_id).where(closure.c.ancestor_id.in_(location_ids))
+    connection.execute(delete(closure).where(
+        closure.c.ancestor_id.in_(removed_ancestors),
+        closure.c.descendant_id.in_(removed_descendants)
+    ))
+
+
+def _parent_changed(location: Location) -> bool:
+    state = inspect(location)
+    return state.attrs.parent_location_id.history.has_changes() or state.attrs.parent_location.history.has_changes()
+
+
+@event.listens_for(Session, "before_flush")
+def _forget_deleted_locations(session, flush_context, instances):
+    # Closure rows reference the locations, so they go before the DELETE
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Location) and obj.id is not None]
+    if deleted:
+        session.connection().execute(delete(closure).where(
+            or_(closure.c.ancestor_id.in_(deleted), closure.c.descendant_id.in_(deleted))
+        ))
+
+
+@event.listens_for(Session, "after_flush")
+def _record_location_paths(session, flush_context):
+    created = {obj.id: obj for obj in session.new if isinstance(obj, Location)}
+    moved = [obj for obj in session.dirty if isinstance(obj, Location) and _parent_changed(obj)]
+    if not created and not moved:
+        return
+
+    connection = session.connection()
+    inserted = set()
+
+    def insert_location(location: Location):
+        if location.id in inserted:
+            return
+        inserted.add(location.id)
+        # A parent created in the same flush needs its paths first
+        parent = created.get(location.parent_location_id)
+        if parent is not None:
+            insert_location(parent)
+        _insert_paths(connection, location.id, location.parent_location_id)
+
+    for location in created.values():
+        insert_location(location)
+    for location in moved:
+        _move_subtree(connection, location.id, location.parent_location_id)
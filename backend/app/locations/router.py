@@ -1,17 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func
 from typing import List, Optional
 from app.database import get_db
-from app.models import Location, Campaign, User
+from app.models import Location, LocationClosure, TravelRoute, Campaign, NPC, Item, User
 from app.schemas import (
     LocationCreate, LocationUpdate, Location as LocationSchema, 
-    PaginatedLocationResponse
+    PaginatedLocationResponse, LocationTree as LocationTreeSchema, LocationBundle
 )
 from app.auth.router import get_current_user
-from app.campaigns.router import verify_campaign_access
+from app.campaigns.router import verify_campaign_access, requested_ids
+from app.locations import hierarchy
+from app.campaigns import references, deletion, bundles, multiget
+from app.locations.travel import travel_planner, format_hours
 
 router = APIRouter()
 
+# Levels returned by one tree request; deeper locations are expanded lazily
+MAX_TREE_DEPTH = 64
+
 @router.get("/", response_model=PaginatedLocationResponse)
 async def get_locations(
     campaign_id: int,
@@ -24,7 +31,9 @@ async def get_locations(
     location_type: Optional[str] = Query(None),
     parent_location_id: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
-    visibility: Optional[str] = Query(None)
+    visibility: Optional[str] = Query(None),
+    within_location_id: Optional[int] = Query(None, description="Only include locations inside this location"),
+    ids: Optional[List[int]] = Depends(requested_ids)
 ):
     """Get locations for a campaign with optional filtering."""
     query = db.query(Location).filter(Location.campaign_id == campaign_id)
@@ -44,12 +53,20 @@ async def get_locations(
     if parent_location_id is not None:
         query = query.filter(Location.parent_location_id == parent_location_id)
     
+    if within_location_id is not None:
+        query = query.filter(Location.id.in_(hierarchy.subtree_ids(within_location_id, include_self=False)))
+    
     if status:
         query = query.filter(Location.status == status)
         
     if visibility:
         query = query.filter(Location.visibility == visibility)
     
+    # Specific entries, in the order asked for
+    if ids is not None:
+        items = multiget.in_order(query.filter(Location.id.in_(ids)).all(), ids)
+        return {"total": len(items), "items": items}
+    
     # Get total count
     total = query.count()
     
@@ -61,6 +78,77 @@ async def get_locations(
         "items": locations
     }
 
+@router.get("/tree", response_model=LocationTreeSchema)
+async def get_location_tree(
+    campaign_id: int,
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db),
+    root_id: Optional[int] = Query(None, description="Only return the locations inside this one"),
+    depth: int = Query(MAX_TREE_DEPTH, ge=1, le=MAX_TREE_DEPTH, description="Levels to include; deeper locations are left for lazy expansion")
+):
+    """Get the location hierarchy as a nested tree with child, NPC and item counts."""
+    if root_id is not None:
+        root = db.query(Location.id).filter(
+            Location.id == root_id,
+            Location.campaign_id == campaign_id
+        ).first()
+        if not root:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Location not found"
+            )
+    
+    # Per-location counts as grouped aggregates, joined into the one tree query
+    child_counts = db.query(
+        Location.parent_location_id.label("location_id"), func.count(Location.id).label("total")
+    ).filter(Location.campaign_id == campaign_id).group_by(Location.parent_location_id).subquery()
+    npc_counts = db.query(
+        NPC.location_id.label("location_id"), func.count(NPC.id).label("total")
+    ).filter(NPC.campaign_id == campaign_id).group_by(NPC.location_id).subquery()
+    item_counts = db.query(
+        Item.current_location_id.label("location_id"), func.count(Item.id).label("total")
+    ).filter(Item.campaign_id == campaign_id).group_by(Item.current_location_id).subquery()
+    
+    query = db.query(
+        Location.id, Location.name, Location.type, Location.status, Location.visibility,
+        Location.parent_location_id,
+        func.coalesce(child_counts.c.total, 0).label("child_count"),
+        func.coalesce(npc_counts.c.total, 0).label("npc_count"),
+        func.coalesce(item_counts.c.total, 0).label("item_count")
+    ).outerjoin(
+        child_counts, child_counts.c.location_id == Location.id
+    ).outerjoin(
+        npc_counts, npc_counts.c.location_id == Location.id
+    ).outerjoin(
+        item_counts, item_counts.c.location_id == Location.id
+    ).filter(Location.campaign_id == campaign_id)
+    
+    if root_id is not None:
+        query = query.join(LocationClosure, LocationClosure.descendant_id == Location.id).filter(
+            LocationClosure.ancestor_id == root_id,
+            LocationClosure.depth > 0,
+            LocationClosure.depth <= depth
+        )
+    else:
+        levels = hierarchy.levels(campaign_id)
+        query = query.join(levels, levels.c.location_id == Location.id).filter(levels.c.level < depth)
+    
+    # Nest in one pass; rows come sorted by name, so every children list is too
+    nodes = {row.id: {**row._asdict(), "children": []} for row in query.order_by(Location.name).all()}
+    top_level = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_location_id"])
+        if parent is not None and node["id"] != node["parent_location_id"]:
+            parent["children"].append(node)
+        else:
+            top_level.append(node)
+    
+    return {
+        "total": len(nodes),
+        "nodes": top_level
+    }
+
 @router.post("/", response_model=LocationSchema)
 async def create_location(
     campaign_id: int,
@@ -114,6 +202,33 @@ async def get_location(
     
     return location
 
+@router.get("/{location_id}/bundle", response_model=LocationBundle)
+async def get_location_bundle(
+    campaign_id: int,
+    location_id: int,
+    include: Optional[str] = Query(None, description="Comma-separated parts to embed, all by default"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get a location together with its related entities, for its detail page."""
+    try:
+        parts = bundles.parse_includes("location", include)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    result = bundles.bundle(db, campaign_id, "location", location_id, parts)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found"
+        )
+    
+    return result
+
 @router.put("/{location_id}", response_model=LocationSchema)
 async def update_location(
     campaign_id: int,
@@ -155,6 +270,13 @@ async def update_location(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Parent location not found in this campaign"
                 )
+            
+            # Can't move under one of its own sub-locations
+            if hierarchy.is_within(db, location_data.parent_location_id, location_id):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Location cannot be moved inside one of its own sub-locations"
+                )
     
     # Update only provided fields
     update_data = location_data.dict(exclude_unset=True)
@@ -166,15 +288,15 @@ async def update_location(
     
     return location
 
-@router.delete("/{location_id}")
-async def delete_location(
+@router.get("/{location_id}/ancestors", response_model=List[LocationSchema])
+async def get_location_ancestors(
     campaign_id: int,
     location_id: int,
     current_user: User = Depends(get_current_user),
     campaign: Campaign = Depends(verify_campaign_access),
     db: Session = Depends(get_db)
 ):
-    """Delete a location."""
+    """Get the locations containing a location, outermost first (breadcrumbs)."""
     location = db.query(Location).filter(
         Location.id == location_id,
         Location.campaign_id == campaign_id
@@ -186,35 +308,197 @@ async def delete_location(
             detail="Location not found"
         )
     
-    # Check if location has child locations
-    child_count = db.query(Location).filter(
-        Location.parent_location_id == location_id,
+    return hierarchy.ancestors(db, location_id)
+
+@router.get("/{location_id}/descendants", response_model=List[LocationSchema])
+async def get_location_descendants(
+    campaign_id: int,
+    location_id: int,
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db),
+    max_depth: Optional[int] = Query(None, ge=1, description="Levels below the location to include")
+):
+    """Get every location inside a location, nearest levels first."""
+    location = db.query(Location).filter(
+        Location.id == location_id,
         Location.campaign_id == campaign_id
-    ).count()
+    ).first()
     
-    if child_count > 0:
+    if not location:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot delete location that has child locations"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found"
         )
     
-    # Check if location has NPCs
-    from app.models import NPC
-    npc_count = db.query(NPC).filter(
-        NPC.location_id == location_id,
-        NPC.campaign_id == campaign_id
+    return hierarchy.descendants(db, location_id, max_depth)
+
+@router.get("/travel/plan")
+async def plan_travel_route(
+    campaign_id: int,
+    from_id: int = Query(..., description="Starting location"),
+    to_id: int = Query(..., description="Destination"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get the fastest route between two locations over their connected routes."""
+    found = db.query(Location.id).filter(
+        Location.id.in_([from_id, to_id]),
+        Location.campaign_id == campaign_id
     ).count()
     
-    if npc_count > 0:
+    if found < len({from_id, to_id}):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot delete location that has NPCs assigned to it"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found"
+        )
+    
+    return travel_planner.route(db, campaign_id, from_id, to_id)
+
+@router.get("/{location_id}/routes")
+async def get_location_routes(
+    campaign_id: int,
+    location_id: int,
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get the travel routes leading out of and into a location."""
+    location = db.query(Location).filter(
+        Location.id == location_id,
+        Location.campaign_id == campaign_id
+    ).first()
+    
+    if not location:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found"
+        )
+    
+    other = aliased(Location)
+    rows = db.query(TravelRoute, other.id, other.name).join(
+        other,
+        ((TravelRoute.from_location_id == location_id) & (other.id == TravelRoute.to_location_id)) |
+        ((TravelRoute.to_location_id == location_id) & (other.id == TravelRoute.from_location_id))
+    ).filter(
+        (TravelRoute.from_location_id == location_id) | (TravelRoute.to_location_id == location_id)
+    ).order_by(TravelRoute.travel_hours).all()
+    
+    result = {"outgoing": [], "incoming": []}
+    for route, other_id, other_name in rows:
+        result["outgoing" if route.from_location_id == location_id else "incoming"].append({
+            "id": route.id,
+            "location": {"id": other_id, "name": other_name},
+            "travel_hours": route.travel_hours,
+            "travel_time": format_hours(route.travel_hours) if route.travel_hours is not None else None,
+            "distance": route.distance,
+            "difficulty": route.difficulty,
+            "one_way": route.one_way,
+            "description": route.description
+        })
+    return result
+
+@router.get("/{location_id}/reachable")
+async def get_reachable_locations(
+    campaign_id: int,
+    location_id: int,
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db),
+    max_hours: Optional[float] = Query(None, gt=0, description="Only locations within this many hours of travel")
+):
+    """Get the locations reachable from a location, nearest first."""
+    location = db.query(Location.id).filter(
+        Location.id == location_id,
+        Location.campaign_id == campaign_id
+    ).first()
+    
+    if not location:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found"
         )
     
-    db.delete(location)
+    return travel_planner.reachable(db, campaign_id, location_id, max_hours)
+
+@router.get("/{location_id}/backlinks")
+async def get_location_backlinks(
+    campaign_id: int,
+    location_id: int,
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get the plot hooks, organizations, events and other entities that refer to this location."""
+    exists = db.query(Location.id).filter(
+        Location.id == location_id,
+        Location.campaign_id == campaign_id
+    ).first()
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found"
+        )
+    
+    return references.backlinks(db, campaign_id, "location", location_id)
+
+@router.delete("/{location_id}")
+async def delete_location(
+    campaign_id: int,
+    location_id: int,
+    mode: str = Query("block", pattern="^(block|nullify|cascade)$", description="What to do with entities that refer to this location"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Delete a location; see /delete-impact for what it affects."""
+    exists = db.query(Location.id).filter(
+        Location.id == location_id,
+        Location.campaign_id == campaign_id
+    ).first()
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found"
+        )
+    
+    if mode == "block":
+        report = deletion.impact(db, campaign_id, "location", location_id)
+        if report["blocked"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=deletion.blocked_detail("location", report)
+            )
+    
+    result = deletion.delete_entity(db, campaign_id, "location", location_id, mode)
     db.commit()
     
-    return {"message": "Location deleted successfully"}
+    return {"message": "Location deleted successfully", **result}
+
+@router.get("/{location_id}/delete-impact")
+async def get_location_delete_impact(
+    campaign_id: int,
+    location_id: int,
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get everything that refers to this location, and what a cascading delete would remove."""
+    exists = db.query(Location.id).filter(
+        Location.id == location_id,
+        Location.campaign_id == campaign_id
+    ).first()
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found"
+        )
+    
+    return deletion.impact(db, campaign_id, "location", location_id)
 
 @router.get("/templates/fields")
 async def get_location_template_fields():
@@ -0,0 +1,317 @@
+"""
+Travel routes between locations and a shortest-route planner.
+
+Locations describe their routes in `connected_locations`, e.g.
+    {"location_id": 3, "travel_time": "2 hours", "difficulty": "moderate",
+     "description": "Forest path to the old shrine"}
+Those objects are normalized into the travel_routes table on every flush,
+with the travel time parsed into hours (or derived from a `distance` in
+miles at walking pace), so routes into and out of a location are indexed
+queries.
+
+The planner loads a campaign's routes once into an adjacency list and runs
+Dijkstra from a start location over the whole map. Each run fills one row of
+the campaign's distance table (distances and previous stops to every other
+location), so later routes from the same place, and "what's within a day's
+travel" lookups, are answered from the table. Routes are two-way unless
+marked one_way. The table is dropped when a location of the campaign
+changes.
+
+Usage:
+    from app.locations.travel import travel_planner
+
+    plan = travel_planner.route(db, campaign_id, from_id, to_id)
+"""
+
+import heapq
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Location, TravelRoute
+from app.campaigns.versioning import campaign_versions, Change
+
+routes_table = TravelRoute.__table__
+
+# Walking pace used when a route only gives a distance
+WALKING_MILES_PER_HOUR = 3.0
+# Weight of routes without any travel time or distance
+UNKNOWN_ROUTE_HOURS = 1.0
+# Start locations whose distance rows are kept per campaign
+MAX_CACHED_SOURCES = 256
+
+_UNIT_HOURS = {"minute": 1 / 60, "min": 1 / 60, "hour": 1.0, "hr": 1.0, "day": 24.0, "week": 168.0}
+_AMOUNT = r"(\d+(?:\.\d+)?)(?:\s*(?:-|to)\s*(\d+(?:\.\d+)?))?"
+_DURATION = re.compile(_AMOUNT + r"\s*(minute|min|hour|hr|day|week)s?\b", re.IGNORECASE)
+_SINGLE = re.compile(r"\b(half\s+(?:a|an)|a|an|one)\s+(minute|hour|day|week)\b", re.IGNORECASE)
+
+
+def parse_travel_time(text) -> Optional[float]:
+    """Hours described by a travel time such as '2 hours', '1 day 4 hours' or '2-3 days'"""
+    if isinstance(text, (int, float)):
+        return float(text)
+    if not isinstance(text, str):
+        return None
+    hours = 0.0
+    found = False
+    for low, high, unit in _DURATION.findall(text):
+        # Ranges count as their midpoint
+        amount = (float(low) + float(high)) / 2 if high else float(low)
+        hours += amount * _UNIT_HOURS[unit.lower()]
+        found = True
+    for amount, unit in _SINGLE.findall(_DURATION.sub("", text)):
+        hours += (0.5 if amount.lower().startswith("half") else 1.0) * _UNIT_HOURS[unit.lower()]
+        found = True
+    return hours if found else None
+
+
+def format_hours(hours: float) -> str:
+    """Readable travel time, e.g. '2 days, 3 hours' or '45 minutes'"""
+    if hours < 1:
+        return f"{round(hours * 60)} minutes"
+    days, rest = divmod(round(hours * 10), 240)
+    parts = []
+    if days:
+        parts.append(f"{days} day{'s' if days != 1 else ''}")
+    if rest:
+        rest = rest // 10 if rest % 10 == 0 else rest / 10
+        parts.append(f"{rest} hour{'s' if rest != 1 else ''}")
+    return ", ".join(parts)
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def route_rows(location: Location, valid_targets) -> List[Dict[str, Any]]:
+    """travel_routes rows for a location's connected_locations"""
+    rows = []
+    for route in location.connected_locations or []:
+        if not isinstance(route, dict):
+            continue
+        target = route.get("location_id")
+        if isinstance(target, str) and target.isdigit():
+            target = int(target)
+        if target not in valid_targets or target == location.id:
+            continue
+        distance = _number(route.get("distance"))
+        hours = _number(route.get("travel_hours"))
+        if hours is None:
+            hours = parse_travel_time(route.get("travel_time"))
+        if hours is None and distance is not None:
+            hours = distance / WALKING_MILES_PER_HOUR
+        rows.append({
+            "campaign_id": location.campaign_id,
+            "from_location_id": location.id,
+            "to_location_id": target,
+            "travel_hours": hours,
+            "distance": distance,
+            "difficulty": route.get("difficulty"),
+            "one_way": bool(route.get("one_way", False)),
+            "description": route.get("description")
+        })
+    return rows
+
+
+def _write_routes(connection, locations: List[Location]):
+    """Replace the travel_routes rows of some locations"""
+    connection.execute(delete(routes_table).where(routes_table.c.from_location_id.in_([loc.id for loc in locations])))
+    targets = {
+        route.get("location_id") for loc in locations for route in (loc.connected_locations or [])
+        if isinstance(route, dict)
+    }
+    targets = {int(target) for target in targets if isinstance(target, int) or (isinstance(target, str) and target.isdigit())}
+    if not targets:
+        return
+    # Routes only count within the location's own campaign
+    campaigns = dict(connection.execute(
+        select(Location.id, Location.campaign_id).where(Location.id.in_(targets))
+    ).all())
+    rows = []
+    for loc in locations:
+        valid = {target for target, campaign_id in campaigns.items() if campaign_id == loc.campaign_id}
+        rows.extend(route_rows(loc, valid))
+    if rows:
+        connection.execute(insert(routes_table), rows)
+
+
+def rebuild(db: Session, campaign_id: Optional[int] = None):
+    """Recompute travel_routes from connected_locations, for one campaign or all"""
+    query = db.query(Location)
+    if campaign_id is not None:
+        query = query.filter(Location.campaign_id == campaign_id)
+    locations = [loc for loc in query.all() if loc.connected_locations]
+    if locations:
+        _write_routes(db.connection(), locations)
+
+
+def backfill(db: Session):
+    """Build travel_routes for databases created before the table existed"""
+    if db.query(TravelRoute.id).first() is not None:
+        return
+    rebuild(db)
+    db.commit()
+
+
+def remove(connection, location_ids: List[int]):
+    """Drop the routes into and out of some locations"""
+    connection.execute(delete(routes_table).where(
+        or_(routes_table.c.from_location_id.in_(location_ids), routes_table.c.to_location_id.in_(location_ids))
+    ))
+
+
+@event.listens_for(Session, "before_flush")
+def _forget_deleted_routes(session, flush_context, instances):
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Location) and obj.id is not None]
+    if deleted:
+        remove(session.connection(), deleted)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_routes(session, flush_context):
+    changed = [obj for obj in session.new if isinstance(obj, Location) and obj.connected_locations]
+    changed += [
+        obj for obj in session.dirty
+        if isinstance(obj, Location) and inspect(obj).attrs.connected_locations.history.has_changes()
+    ]
+    if changed:
+        _write_routes(session.connection(), changed)
+
+
+class _CampaignRoutes:
+    """Adjacency and cached distance rows of one campaign"""
+
+    def __init__(self, names: Dict[int, str], routes):
+        self.names = names
+        self.adjacency: Dict[int, List[Tuple[int, float, int]]] = {}
+        self.routes: Dict[int, Any] = {}
+        for route in routes:
+            self.routes[route.id] = route
+            hours = route.travel_hours if route.travel_hours is not None else UNKNOWN_ROUTE_HOURS
+            self.adjacency.setdefault(route.from_location_id, []).append((route.to_location_id, hours, route.id))
+            if not route.one_way:
+                self.adjacency.setdefault(route.to_location_id, []).append((route.from_location_id, hours, route.id))
+        # start -> (hours to each reachable location, (previous stop, route id) on the way)
+        self.rows: "OrderedDict[int, Tuple[Dict[int, float], Dict[int, Tuple[int, int]]]]" = OrderedDict()
+
+    def row(self, start: int):
+        row = self.rows.get(start)
+        if row is not None:
+            self.rows.move_to_end(start)
+            return row
+
+        hours = {start: 0.0}
+        previous: Dict[int, Tuple[int, int]] = {}
+        queue = [(0.0, start)]
+        while queue:
+            elapsed, node = heapq.heappop(queue)
+            if elapsed > hours.get(node, float("inf")):
+                continue
+            for neighbour, weight, route_id in self.adjacency.get(node, ()):
+                total = elapsed + weight
+                if total < hours.get(neighbour, float("inf")):
+                    hours[neighbour] = total
+                    previous[neighbour] = (node, route_id)
+                    heapq.heappush(queue, (total, neighbour))
+
+        row = self.rows[start] = (hours, previous)
+        if len(self.rows) > MAX_CACHED_SOURCES:
+            self.rows.popitem(last=False)
+        return row
+
+
+class TravelPlanner:
+    """Shortest travel routes per campaign, cached until locations change"""
+
+    def __init__(self):
+        self._campaigns: Dict[int, _CampaignRoutes] = {}
+        # Bumped on every change, so a load that raced a write isn't kept
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        campaign_versions.subscribe(self._on_change)
+
+    def _on_change(self, campaign_id: int, changes: List[Change]):
+        if any(change.table in ("locations", "campaigns") for change in changes):
+            self.discard(campaign_id)
+
+    def discard(self, campaign_id: int):
+        with self._lock:
+            self._campaigns.pop(campaign_id, None)
+            self._generations[campaign_id] = self._generations.get(campaign_id, 0) + 1
+
+    def _routes(self, db: Session, campaign_id: int) -> _CampaignRoutes:
+        with self._lock:
+            routes = self._campaigns.get(campaign_id)
+            if routes is not None:
+                return routes
+            generation = self._generations.get(campaign_id, 0)
+
+        names = dict(db.query(Location.id, Location.name).filter(Location.campaign_id == campaign_id).all())
+        rows = db.query(
+            TravelRoute.id, TravelRoute.from_location_id, TravelRoute.to_location_id, TravelRoute.travel_hours,
+            TravelRoute.distance, TravelRoute.difficulty, TravelRoute.one_way, TravelRoute.description
+        ).filter(TravelRoute.campaign_id == campaign_id).all()
+        routes = _CampaignRoutes(names, rows)
+
+        with self._lock:
+            if self._generations.get(campaign_id, 0) == generation:
+                self._campaigns[campaign_id] = routes
+        return routes
+
+    def route(self, db: Session, campaign_id: int, from_id: int, to_id: int) -> Dict[str, Any]:
+        """Fastest route between two locations, leg by leg"""
+        routes = self._routes(db, campaign_id)
+        with self._lock:
+            hours, previous = routes.row(from_id)
+        if to_id not in hours:
+            return {"reachable": False, "total_hours": None, "travel_time": None, "estimated": False, "legs": []}
+
+        legs = []
+        node = to_id
+        while node != from_id:
+            stop, route_id = previous[node]
+            route = routes.routes[route_id]
+            legs.append({
+                "from": {"id": stop, "name": routes.names.get(stop)},
+                "to": {"id": node, "name": routes.names.get(node)},
+                "route_id": route_id,
+                "hours": route.travel_hours,
+                "distance": route.distance,
+                "difficulty": route.difficulty,
+                "description": route.description
+            })
+            node = stop
+        legs.reverse()
+
+        return {
+            "reachable": True,
+            "total_hours": round(hours[to_id], 2),
+            "travel_time": format_hours(hours[to_id]),
+            # Some legs had no travel time and were counted as UNKNOWN_ROUTE_HOURS
+            "estimated": any(leg["hours"] is None for leg in legs),
+            "legs": legs
+        }
+
+    def reachable(self, db: Session, campaign_id: int, from_id: int, max_hours: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Locations reachable from a location, nearest first"""
+        routes = self._routes(db, campaign_id)
+        with self._lock:
+            hours, _ = routes.row(from_id)
+        found = [
+            {"id": location_id, "name": routes.names.get(location_id), "total_hours": round(total, 2), "travel_time": format_hours(total)}
+            for location_id, total in hours.items()
+            if location_id != from_id and (max_hours is None or total <= max_hours)
+        ]
+        found.sort(key=lambda entry: entry["total_hours"])
+        return found
+
+
+# Global travel planner instance
+travel_planner = TravelPlanner()
@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from app.database import engine, Base, SessionLocal
 from app.auth import router as auth_router
 from app.campaigns import router as campaigns_router
 from app.npcs import router as npcs_router
@@ -12,6 +12,10 @@ from app.events import router as events_router
 from app.ideas_inbox import router as ideas_router
 from app.session_notes import router as session_notes_router
 from app.ai import router as ai_router
+from app.ai.pool import warm_pool
+from app.ai.jobs import job_queue
+from app.locations import hierarchy, travel
+from app.campaigns import references
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -44,6 +48,23 @@ app.include_router(ideas_router.router, prefix="/campaigns/{campaign_id}/ideas",
 app.include_router(session_notes_router.router, prefix="/campaigns/{campaign_id}/sessions", tags=["session-notes"])
 app.include_router(ai_router.router, prefix="/ai", tags=["ai"])
 
+@app.on_event("startup")
+async def backfill_derived_tables():
+    with SessionLocal() as db:
+        hierarchy.backfill(db)
+        travel.backfill(db)
+        references.backfill(db)
+
+@app.on_event("startup")
+async def start_background_workers():
+    job_queue.start()
+    warm_pool.start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await warm_pool.stop()
+    await job_queue.stop()
+
 @app.get("/")
 async def root():
     return {"message": "DM Toolkit API"}
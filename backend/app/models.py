@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, Boolean, ForeignKey, JSON, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -39,6 +39,8 @@ class Campaign(Base):
     items = relationship("Item", back_populates="campaign", cascade="all, delete-orphan")
     ideas_inbox = relationship("Idea", back_populates="campaign", cascade="all, delete-orphan")
     session_notes = relationship("SessionNote", back_populates="campaign", cascade="all, delete-orphan")
+    ai_jobs = relationship("AIJob", back_populates="campaign", cascade="all, delete-orphan")
+    embeddings = relationship("EntityEmbedding", back_populates="campaign", cascade="all, delete-orphan")
 
 class NPC(Base):
     __tablename__ = "npcs"
@@ -104,6 +106,29 @@ class Location(Base):
     child_locations = relationship("Location")
     npcs = relationship("NPC", back_populates="location")
 
+class LocationClosure(Base):
+    __tablename__ = "location_closure"
+    
+    # One row per (ancestor, descendant) pair of the location hierarchy, including
+    # each location paired with itself at depth 0; kept by app.locations.hierarchy
+    ancestor_id = Column(Integer, ForeignKey("locations.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("locations.id"), primary_key=True, index=True)
+    depth = Column(Integer, nullable=False)  # Levels between the two locations
+
+class TravelRoute(Base):
+    __tablename__ = "travel_routes"
+    
+    # Normalized copy of Location.connected_locations, kept by app.locations.travel
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=False, index=True)
+    from_location_id = Column(Integer, ForeignKey("locations.id"), nullable=False, index=True)
+    to_location_id = Column(Integer, ForeignKey("locations.id"), nullable=False, index=True)
+    travel_hours = Column(Float)  # Parsed from travel_time, travel_hours or distance; null if unknown
+    distance = Column(Float)  # Miles, if given
+    difficulty = Column(String(50))  # easy, moderate, hard, ...
+    one_way = Column(Boolean, default=False)
+    description = Column(Text)
+
 class Organization(Base):
     __tablename__ = "organizations"
     
@@ -254,4 +279,55 @@ class SessionNote(Base):
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    campaign = relationship("Campaign", back_populates="session_notes")
\ No newline at end of file
+    campaign = relationship("Campaign", back_populates="session_notes")
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(50), nullable=False)  # npc, location
+    params = Column(JSON)  # Generation parameters (location_type, locked_fields, seed)
+    status = Column(String(50), default="queued", index=True)  # queued, running, completed, failed, cancelled
+    result = Column(JSON)  # Generated content once completed
+    error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    
+    # Relationships
+    campaign = relationship("Campaign", back_populates="ai_jobs")
+
+class EntityEmbedding(Base):
+    __tablename__ = "entity_embeddings"
+    __table_args__ = (UniqueConstraint("entity_type", "entity_id", "model"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=False, index=True)
+    entity_type = Column(String(50), nullable=False)  # Table name of the entity: npcs, locations, ...
+    entity_id = Column(Integer, nullable=False)
+    model = Column(String(100), nullable=False)  # Embedding backend that produced the vector
+    content_hash = Column(String(64), nullable=False)  # Hash of the embedded text, to skip unchanged rows
+    vector = Column(LargeBinary, nullable=False)  # float32 array
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    campaign = relationship("Campaign", back_populates="embeddings")
+
+class EntityReference(Base):
+    __tablename__ = "entity_references"
+    __table_args__ = (
+        Index("ix_entity_references_target", "campaign_id", "target_type", "target_id"),
+        Index("ix_entity_references_source", "source_type", "source_id"),
+    )
+    
+    # One row per reference from one entity to another, kept by app.campaigns.references
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=False)
+    source_type = Column(String(50), nullable=False)  # npc, location, organization, plot_hook, event, item
+    source_id = Column(Integer, nullable=False)
+    source_name = Column(String(300))  # Name or title of the source, for listing without a join
+    field = Column(String(50), nullable=False)  # Field holding the reference, e.g. related_npcs
+    target_type = Column(String(50), nullable=False)  # npc, location, organization
+    target_id = Column(Integer, nullable=False)
@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Dict
 from app.database import get_db
-from app.models import NPC, Campaign, Location, User
+from app.models import NPC, Campaign, Location, Organization, User
 from sqlalchemy.orm.attributes import flag_modified
 from app.schemas import (
     NPCCreate, NPCUpdate, NPC as NPCSchema, 
-    PaginatedNPCResponse
+    PaginatedNPCResponse, NPCBundle
 )
 from app.auth.router import get_current_user
-from app.campaigns.router import verify_campaign_access
+from app.campaigns.router import verify_campaign_access, requested_ids
+from app.locations import hierarchy
+from app.campaigns import references, deletion, bundles, multiget
 
 router = APIRouter()
 
@@ -24,7 +26,9 @@ async def get_npcs(
     search: Optional[str] = Query(None),
     location_id: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
-    visibility: Optional[str] = Query(None)
+    visibility: Optional[str] = Query(None),
+    within_location_id: Optional[int] = Query(None, description="Only include entries anywhere inside this location"),
+    ids: Optional[List[int]] = Depends(requested_ids)
 ):
     """Get NPCs for a campaign with optional filtering."""
     query = db.query(NPC).filter(NPC.campaign_id == campaign_id)
@@ -41,12 +45,20 @@ async def get_npcs(
     if location_id:
         query = query.filter(NPC.location_id == location_id)
     
+    if within_location_id is not None:
+        query = query.filter(NPC.location_id.in_(hierarchy.subtree_ids(within_location_id)))
+    
     if status:
         query = query.filter(NPC.status == status)
         
     if visibility:
         query = query.filter(NPC.visibility == visibility)
     
+    # Specific entries, in the order asked for
+    if ids is not None:
+        items = multiget.in_order(query.filter(NPC.id.in_(ids)).all(), ids)
+        return {"total": len(items), "items": items}
+    
     # Get total count
     total = query.count()
     
@@ -111,6 +123,33 @@ async def get_npc(
     
     return npc
 
+@router.get("/{npc_id}/bundle", response_model=NPCBundle)
+async def get_npc_bundle(
+    campaign_id: int,
+    npc_id: int,
+    include: Optional[str] = Query(None, description="Comma-separated parts to embed, all by default"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get an NPC together with its related entities, for its detail page."""
+    try:
+        parts = bundles.parse_includes("npc", include)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    result = bundles.bundle(db, campaign_id, "npc", npc_id, parts)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="NPC not found"
+        )
+    
+    return result
+
 @router.put("/{npc_id}", response_model=NPCSchema)
 async def update_npc(
     campaign_id: int,
@@ -159,26 +198,79 @@ async def update_npc(
 async def delete_npc(
     campaign_id: int,
     npc_id: int,
+    mode: str = Query("nullify", pattern="^(block|nullify|cascade)$", description="What to do with entities that refer to this NPC"),
     current_user: User = Depends(get_current_user),
     campaign: Campaign = Depends(verify_campaign_access),
     db: Session = Depends(get_db)
 ):
-    """Delete an NPC."""
-    npc = db.query(NPC).filter(
+    """Delete an NPC; see /delete-impact for what it affects."""
+    exists = db.query(NPC.id).filter(
         NPC.id == npc_id,
         NPC.campaign_id == campaign_id
     ).first()
     
-    if not npc:
+    if not exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="NPC not found"
         )
     
-    db.delete(npc)
+    if mode == "block":
+        report = deletion.impact(db, campaign_id, "npc", npc_id)
+        if report["blocked"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=deletion.blocked_detail("NPC", report)
+            )
+    
+    result = deletion.delete_entity(db, campaign_id, "npc", npc_id, mode)
     db.commit()
     
-    return {"message": "NPC deleted successfully"}
+    return {"message": "NPC deleted successfully", **result}
+
+@router.get("/{npc_id}/delete-impact")
+async def get_npc_delete_impact(
+    campaign_id: int,
+    npc_id: int,
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get everything that refers to this NPC, and what a cascading delete would remove."""
+    exists = db.query(NPC.id).filter(
+        NPC.id == npc_id,
+        NPC.campaign_id == campaign_id
+    ).first()
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="NPC not found"
+        )
+    
+    return deletion.impact(db, campaign_id, "npc", npc_id)
+
+@router.get("/{npc_id}/backlinks")
+async def get_npc_backlinks(
+    campaign_id: int,
+    npc_id: int,
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get the plot hooks, organizations, events and other entities that refer to this NPC."""
+    exists = db.query(NPC.id).filter(
+        NPC.id == npc_id,
+        NPC.campaign_id == campaign_id
+    ).first()
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="NPC not found"
+        )
+    
+    return references.backlinks(db, campaign_id, "npc", npc_id)
 
 @router.get("/{npc_id}/relationships")
 async def get_npc_relationships(
@@ -200,25 +292,8 @@ async def get_npc_relationships(
             detail="NPC not found"
         )
     
-    relationships = npc.relationships or []
-    
-    # Enrich relationships with target NPC details
-    enriched_relationships = []
-    for rel in relationships:
-        if rel.get('target_type') == 'npc':
-            target_npc = db.query(NPC).filter(
-                NPC.id == rel.get('target_id'),
-                NPC.campaign_id == campaign_id
-            ).first()
-            if target_npc:
-                enriched_rel = {
-                    **rel,
-                    'target_name': target_npc.name,
-                    'target_occupation': target_npc.occupation
-                }
-                enriched_relationships.append(enriched_rel)
-        else:
-            enriched_relationships.append(rel)
+    # Enrich relationships with target details, one lookup per target type
+    enriched_relationships = _enrich_relationships(db, campaign_id, npc.relationships or [])
     
     return {
         "npc_id": npc_id,
@@ -247,152 +322,137 @@ async def update_npc_relationships(
             detail="NPC not found"
         )
     
-    # Validate relationship targets exist in the campaign
-    for rel in relationships:
-        if rel.get('target_type') == 'npc':
-            target_npc = db.query(NPC).filter(
-                NPC.id == rel.get('target_id'),
-                NPC.campaign_id == campaign_id
-            ).first()
-            if not target_npc:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Target NPC {rel.get('target_id')} not found in this campaign"
-                )
-    
     # Get the old relationships to determine what changed
     old_relationships = npc.relationships or []
     
+    # One query for every NPC on either side of the change, used both to
+    # validate the new targets and to update their reciprocal relationships
+    target_npcs = _fetch_target_npcs(db, campaign_id, old_relationships + relationships)
+    
+    # Validate relationship targets exist in the campaign
+    for rel in relationships:
+        if rel.get('target_type') == 'npc' and rel.get('target_id') not in target_npcs:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Target NPC {rel.get('target_id')} not found in this campaign"
+            )
+    
     # Update the NPC's relationships
     npc.relationships = relationships
     # Force SQLAlchemy to detect the change to the JSON field
     flag_modified(npc, 'relationships')
     
     # Handle bidirectional relationships
-    _update_bidirectional_relationships(db, campaign_id, npc_id, old_relationships, relationships)
+    _update_bidirectional_relationships(npc, old_relationships, relationships, target_npcs)
     
     db.commit()
     db.refresh(npc)
     
     return {"message": "Relationships updated successfully", "relationships": relationships}
 
-def _update_bidirectional_relationships(db: Session, campaign_id: int, source_npc_id: int, old_relationships: List[dict], new_relationships: List[dict]):
-    """Update bidirectional relationships when an NPC's relationships change."""
+# Columns attached to relationships per target type: (model, {relationship key: column})
+_TARGET_DETAILS = {
+    'npc': (NPC, {'target_name': NPC.name, 'target_occupation': NPC.occupation}),
+    'location': (Location, {'target_name': Location.name, 'target_location_type': Location.type}),
+    'organization': (Organization, {'target_name': Organization.name, 'target_organization_type': Organization.type})
+}
+
+def _enrich_relationships(db: Session, campaign_id: int, relationships: List[dict]) -> List[dict]:
+    """Attach target names and details to relationships with one query per target type."""
+    ids_by_type: Dict[str, set] = {}
+    for rel in relationships:
+        if rel.get('target_type') in _TARGET_DETAILS and rel.get('target_id'):
+            ids_by_type.setdefault(rel['target_type'], set()).add(rel['target_id'])
+    
+    details: Dict[str, Dict[int, dict]] = {}
+    for target_type, ids in ids_by_type.items():
+        model, columns = _TARGET_DETAILS[target_type]
+        rows = db.query(model.id, *columns.values()).filter(
+            model.id.in_(ids),
+            model.campaign_id == campaign_id
+        )
+        details[target_type] = {row[0]: dict(zip(columns, row[1:])) for row in rows}
     
-    # Create sets of target IDs for comparison (NPCs and Locations separately)
-    old_npc_targets = {rel.get('target_id') for rel in old_relationships if rel.get('target_type') == 'npc' and rel.get('target_id')}
-    new_npc_targets = {rel.get('target_id') for rel in new_relationships if rel.get('target_type') == 'npc' and rel.get('target_id')}
+    enriched_relationships = []
+    for rel in relationships:
+        target_type = rel.get('target_type')
+        target = details.get(target_type, {}).get(rel.get('target_id'))
+        if target:
+            enriched_relationships.append({**rel, **target})
+        elif target_type != 'npc':
+            # Unresolved locations and organizations are passed through as stored
+            enriched_relationships.append(rel)
+        # Relationships to NPCs that no longer exist are left out
     
-    old_location_targets = {rel.get('target_id') for rel in old_relationships if rel.get('target_type') == 'location' and rel.get('target_id')}
-    new_location_targets = {rel.get('target_id') for rel in new_relationships if rel.get('target_type') == 'location' and rel.get('target_id')}
+    return enriched_relationships
+
+def _fetch_target_npcs(db: Session, campaign_id: int, relationships: List[dict]) -> Dict[int, NPC]:
+    """Load every NPC referenced by the relationships in a single query."""
+    target_ids = {rel.get('target_id') for rel in relationships if rel.get('target_type') == 'npc' and rel.get('target_id')}
+    if not target_ids:
+        return {}
+    return {
+        target.id: target
+        for target in db.query(NPC).filter(NPC.id.in_(target_ids), NPC.campaign_id == campaign_id)
+    }
+
+def _update_bidirectional_relationships(source_npc: NPC, old_relationships: List[dict], new_relationships: List[dict], target_npcs: Dict[int, NPC]):
+    """Update reciprocal relationships on the target NPCs when an NPC's relationships change.
     
-    # Find relationships that were added or removed
-    added_npc_targets = new_npc_targets - old_npc_targets
-    removed_npc_targets = old_npc_targets - new_npc_targets
+    Targets come preloaded from _fetch_target_npcs; every changed target gets a new
+    list and is flagged as modified, so all of them are written in the one flush at commit.
+    Locations have no relationships column, so links to locations are only kept on the NPC.
+    """
+    source_npc_id = source_npc.id
     
-    added_location_targets = new_location_targets - old_location_targets
-    removed_location_targets = old_location_targets - new_location_targets
+    # Create sets of target IDs for comparison
+    old_npc_targets = {rel.get('target_id') for rel in old_relationships if rel.get('target_type') == 'npc' and rel.get('target_id')}
+    new_npc_targets = {rel.get('target_id') for rel in new_relationships if rel.get('target_type') == 'npc' and rel.get('target_id')}
     
-    # Get source NPC info for reciprocal relationships
-    source_npc = db.query(NPC).filter(NPC.id == source_npc_id).first()
+    # Relationship details by (target type, target id), first entry wins
+    new_by_target = {}
+    for rel in new_relationships:
+        new_by_target.setdefault((rel.get('target_type'), rel.get('target_id')), rel)
     
     # Add reciprocal NPC relationships for new connections
-    for target_id in added_npc_targets:
-        target_npc = db.query(NPC).filter(
-            NPC.id == target_id,
-            NPC.campaign_id == campaign_id
-        ).first()
+    for target_id in new_npc_targets - old_npc_targets:
+        target_npc = target_npcs.get(target_id)
+        source_rel = new_by_target.get(('npc', target_id))
+        if not target_npc or not source_rel:
+            continue
         
-        if target_npc:
-            # Find the relationship details from the new relationships
-            source_rel = next((rel for rel in new_relationships if rel.get('target_id') == target_id), None)
-            if source_rel:
-                # Create reciprocal relationship
-                target_relationships = target_npc.relationships or []
-                
-                # Check if reciprocal relationship already exists
-                existing_reciprocal = any(
-                    rel.get('target_id') == source_npc_id for rel in target_relationships
-                )
-                
-                if not existing_reciprocal:
-                    reciprocal_rel = {
-                        'target_id': source_npc_id,
-                        'target_type': 'npc',
-                        'target_name': source_npc.name,
-                        'target_occupation': source_npc.occupation,
-                        'relationship_type': _get_reciprocal_relationship_type(source_rel.get('relationship_type')),
-                        'description': f"Reciprocal relationship with {source_npc.name}",
-                        'strength': source_rel.get('strength', 'moderate'),
-                        'public_knowledge': source_rel.get('public_knowledge', False)
-                    }
-                    target_relationships.append(reciprocal_rel)
-                    target_npc.relationships = target_relationships
-    
-    # Add reciprocal Location relationships for new connections
-    for target_id in added_location_targets:
-        target_location = db.query(Location).filter(
-            Location.id == target_id,
-            Location.campaign_id == campaign_id
-        ).first()
+        target_relationships = target_npc.relationships or []
         
-        if target_location:
-            # Find the relationship details from the new relationships
-            source_rel = next((rel for rel in new_relationships if rel.get('target_id') == target_id and rel.get('target_type') == 'location'), None)
-            if source_rel:
-                # Create reciprocal relationship on location
-                target_relationships = target_location.relationships or []
-                
-                # Check if reciprocal relationship already exists
-                existing_reciprocal = any(
-                    rel.get('target_id') == source_npc_id and rel.get('target_type') == 'npc' for rel in target_relationships
-                )
-                
-                if not existing_reciprocal:
-                    reciprocal_rel = {
-                        'target_id': source_npc_id,
-                        'target_type': 'npc',
-                        'target_name': source_npc.name,
-                        'target_occupation': source_npc.occupation,
-                        'relationship_type': _get_reciprocal_location_relationship_type(source_rel.get('relationship_type')),
-                        'description': f"Connected to {source_npc.name}",
-                        'strength': source_rel.get('strength', 'moderate'),
-                        'public_knowledge': source_rel.get('public_knowledge', False)
-                    }
-                    target_relationships.append(reciprocal_rel)
-                    target_location.relationships = target_relationships
-                    flag_modified(target_location, 'relationships')
+        # Check if reciprocal relationship already exists
+        if any(rel.get('target_type') == 'npc' and rel.get('target_id') == source_npc_id for rel in target_relationships):
+            continue
+        
+        reciprocal_rel = {
+            'target_id': source_npc_id,
+            'target_type': 'npc',
+            'target_name': source_npc.name,
+            'target_occupation': source_npc.occupation,
+            'relationship_type': _get_reciprocal_relationship_type(source_rel.get('relationship_type')),
+            'description': f"Reciprocal relationship with {source_npc.name}",
+            'strength': source_rel.get('strength', 'moderate'),
+            'public_knowledge': source_rel.get('public_knowledge', False)
+        }
+        target_npc.relationships = target_relationships + [reciprocal_rel]
+        flag_modified(target_npc, 'relationships')
     
     # Remove reciprocal NPC relationships for removed connections
-    for target_id in removed_npc_targets:
-        target_npc = db.query(NPC).filter(
-            NPC.id == target_id,
-            NPC.campaign_id == campaign_id
-        ).first()
+    for target_id in old_npc_targets - new_npc_targets:
+        target_npc = target_npcs.get(target_id)
+        if not target_npc or not target_npc.relationships:
+            continue
         
-        if target_npc and target_npc.relationships:
-            # Remove reciprocal relationship
-            target_relationships = [
-                rel for rel in target_npc.relationships 
-                if rel.get('target_id') != source_npc_id
-            ]
+        target_relationships = [
+            rel for rel in target_npc.relationships
+            if not (rel.get('target_type') == 'npc' and rel.get('target_id') == source_npc_id)
+        ]
+        if len(target_relationships) != len(target_npc.relationships):
             target_npc.relationships = target_relationships
-    
-    # Remove reciprocal Location relationships for removed connections
-    for target_id in removed_location_targets:
-        target_location = db.query(Location).filter(
-            Location.id == target_id,
-            Location.campaign_id == campaign_id
-        ).first()
-        
-        if target_location and target_location.relationships:
-            # Remove reciprocal relationship
-            target_relationships = [
-                rel for rel in target_location.relationships 
-                if not (rel.get('target_id') == source_npc_id and rel.get('target_type') == 'npc')
-            ]
-            target_location.relationships = target_relationships
-            flag_modified(target_location, 'relationships')
+            flag_modified(target_npc, 'relationships')
 
 def _get_reciprocal_relationship_type(relationship_type: str) -> str:
     """Get the reciprocal relationship type."""
@@ -419,29 +479,3 @@ def _get_reciprocal_relationship_type(relationship_type: str) -> str:
         'other': 'other'
     }
     return reciprocal_map.get(relationship_type, 'other')
-
-def _get_reciprocal_location_relationship_type(relationship_type: str) -> str:
-    """Get the reciprocal relationship type for location relationships."""
-    reciprocal_map = {
-        'lives_in': 'inhabitant',
-        'works_at': 'workplace_for',
-        'owns': 'owned_by',
-        'frequents': 'frequently_visited_by',
-        'avoids': 'avoided_by',
-        'born_in': 'birthplace_of',
-        'exiled_from': 'exiled',
-        'wants_to_visit': 'desired_destination_of',
-        'has_history_with': 'connected_to',
-        'protects': 'protected_by',
-        'seeks_to_destroy': 'threatened_by',
-        'hiding_in': 'hiding_place_for',
-        'imprisoned_in': 'imprisons',
-        'rules': 'ruled_by',
-        'serves': 'served_by',
-        'trades_with': 'trades_with',
-        'studies_at': 'place_of_study_for',
-        'worships_at': 'place_of_worship_for',
-        'performs_at': 'performance_venue_for',
-        'other': 'connected_to'
-    }
-    return reciprocal_map.get(relationship_type, 'connected_to')
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+Faction network: alliances and rivalries between a campaign's organizations.
+
+Organizations list their allies and enemies one-sidedly, so the lists
+rarely agree. The network reads them from the campaign graph's ally and
+enemy edges into two organization-by-organization boolean matrices, and
+everything else is matrix arithmetic:
+
+- relations are symmetrized (an alliance declared by either side counts)
+- asymmetries are the one-sided declarations, to fix on the other side
+- conflicts are pairs recorded as both allies and enemies
+- potential allies share enemies (the enemy of my enemy), counted by E @ E
+- potential enemies are allied to each other's enemies, counted by A @ E
+- blocs are groups connected by alliances, with any enemies inside them
+
+The result is stored on the CampaignGraph it was computed from, which is
+replaced when the campaign's organizations change, so it is cached per
+campaign version like the graph analytics.
+
+Usage:
+    from app.organizations.factions import faction_network
+
+    network = faction_network(campaign_graphs.get(db, campaign_id))
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.campaigns.graph import CampaignGraph
+from app.campaigns.graph_analytics import component_labels
+
+# Suggested pairs returned per list unless asked for more
+DEFAULT_SUGGESTIONS = 50
+
+
+def _pairs(matrix: np.ndarray, ids: np.ndarray) -> List[List[int]]:
+    rows, cols = np.nonzero(matrix)
+    return np.stack([ids[rows], ids[cols]], axis=1).tolist()
+
+
+def _ranked(counts: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Id pairs with a positive count in the upper triangle, and their counts, highest first"""
+    rows, cols = np.nonzero(np.triu(counts, 1))
+    values = counts[rows, cols]
+    order = np.argsort(-values, kind="stable")
+    return np.stack([ids[rows[order]], ids[cols[order]]], axis=1), values[order]
+
+
+def _suggestions(ranked: Tuple[np.ndarray, np.ndarray], key: str, limit: int) -> List[Dict[str, Any]]:
+    pairs, values = ranked
+    return [
+        {"organizations": pair, key: value}
+        for pair, value in zip(pairs[:limit].tolist(), values[:limit].tolist())
+    ]
+
+
+def _compute(graph: CampaignGraph) -> Dict[str, Any]:
+    orgs = np.array([index for index, node in enumerate(graph.nodes) if node.type == "organization"], dtype=np.int64)
+    k = len(orgs)
+    ids = np.array([graph.nodes[index].id for index in orgs], dtype=np.int64)
+    position = np.full(len(graph.nodes), -1, dtype=np.int64)
+    position[orgs] = np.arange(k)
+
+    # Declared relations, row organization -> column organization
+    declared = {"ally": np.zeros((k, k), dtype=bool), "enemy": np.zeros((k, k), dtype=bool)}
+    for edge in graph.edges:
+        matrix = declared.get(edge.type)
+        if matrix is not None:
+            matrix[position[edge.source], position[edge.target]] = True
+    allies = declared["ally"] | declared["ally"].T
+    enemies = declared["enemy"] | declared["enemy"].T
+    related = allies | enemies | np.eye(k, dtype=bool)
+
+    # float32 products go through BLAS and are exact for counts this small
+    ally_counts = allies.astype(np.float32)
+    enemy_counts = enemies.astype(np.float32)
+    shared_enemies = np.where(related, 0, enemy_counts @ enemy_counts).astype(np.int32)
+    # i's allies that are j's enemies, from either side
+    via_allies = ally_counts @ enemy_counts
+    via_allies = np.where(related, 0, via_allies + via_allies.T).astype(np.int32)
+
+    labels = component_labels(graph, frozenset({"ally"}))[orgs] if k else np.zeros(0, dtype=np.int32)
+    same_bloc = labels[:, None] == labels[None, :]
+    groups: Dict[int, List[int]] = {}
+    for row, label in enumerate(labels.tolist()):
+        groups.setdefault(label, []).append(row)
+    blocs = sorted((rows for rows in groups.values() if len(rows) > 1), key=lambda rows: (-len(rows), rows[0]))
+    bloc_of = {row: number for number, rows in enumerate(blocs) for row in rows}
+    internal = np.triu(enemies & same_bloc, 1)
+
+    asymmetries = [
+        {"relation": relation, "from": source, "to": target}
+        for relation, matrix in declared.items()
+        for source, target in _pairs(matrix & ~matrix.T, ids)
+    ]
+
+    return {
+        "version": graph.version,
+        "organizations": [
+            {
+                "id": int(ids[row]),
+                "name": graph.nodes[orgs[row]].name,
+                "type": graph.nodes[orgs[row]].subtype,
+                "allies": ids[allies[row]].tolist(),
+                "enemies": ids[enemies[row]].tolist(),
+                "bloc": bloc_of.get(row)
+            }
+            for row in range(k)
+        ],
+        "blocs": [
+            {
+                "members": ids[rows].tolist(),
+                "internal_enemies": _pairs(internal[np.ix_(rows, rows)], ids[rows])
+            }
+            for rows in blocs
+        ],
+        "asymmetries": asymmetries,
+        "conflicts": _pairs(np.triu(allies & enemies, 1), ids),
+        # Ranked arrays; faction_network() formats the top of each
+        "potential_allies": _ranked(shared_enemies, ids),
+        "potential_enemies": _ranked(via_allies, ids)
+    }
+
+
+def faction_network(graph: CampaignGraph, limit: int = DEFAULT_SUGGESTIONS) -> Dict[str, Any]:
+    """Alliances, rivalries, blocs and suggested relations between organizations"""
+    network = graph.memo.get("factions")
+    if network is None:
+        network = graph.memo["factions"] = _compute(graph)
+    return {
+        **network,
+        "potential_allies": _suggestions(network["potential_allies"], "shared_enemies", limit),
+        "potential_enemies": _suggestions(network["potential_enemies"], "via_allies", limit)
+    }
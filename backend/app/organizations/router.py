@@ -5,10 +5,13 @@ from app.database import get_db
 from app.models import Organization, Campaign, NPC, Location, User
 from app.schemas import (
     OrganizationCreate, OrganizationUpdate, Organization as OrganizationSchema,
-    PaginatedOrganizationResponse
+    PaginatedOrganizationResponse, OrganizationBundle
 )
 from app.auth.router import get_current_user
-from app.campaigns.router import verify_campaign_access
+from app.campaigns.router import verify_campaign_access, requested_ids
+from app.campaigns import references, deletion, bundles, multiget
+from app.campaigns.graph import campaign_graphs
+from app.organizations.factions import faction_network, DEFAULT_SUGGESTIONS
 
 router = APIRouter()
 
@@ -25,7 +28,8 @@ async def get_organizations(
     scope: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     visibility: Optional[str] = Query(None),
-    headquarters_location_id: Optional[int] = Query(None)
+    headquarters_location_id: Optional[int] = Query(None),
+    ids: Optional[List[int]] = Depends(requested_ids)
 ):
     """Get organizations for a campaign with optional filtering."""
     query = db.query(Organization).filter(Organization.campaign_id == campaign_id)
@@ -54,6 +58,11 @@ async def get_organizations(
     if headquarters_location_id:
         query = query.filter(Organization.headquarters_location_id == headquarters_location_id)
     
+    # Specific entries, in the order asked for
+    if ids is not None:
+        items = multiget.in_order(query.filter(Organization.id.in_(ids)).all(), ids)
+        return {"total": len(items), "items": items}
+    
     # Get total count
     total = query.count()
     
@@ -121,6 +130,23 @@ async def create_organization(
     
     return db_org
 
+@router.get("/network")
+async def get_faction_network(
+    campaign_id: int,
+    limit: int = Query(DEFAULT_SUGGESTIONS, ge=0, le=1000, description="Suggested alliances and rivalries to return"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Alliances and rivalries between the campaign's organizations.
+
+    Includes alliance blocs, one-sided declarations to reconcile, pairs that
+    are both allies and enemies, and suggested alliances (shared enemies)
+    and rivalries (allied to each other's enemies).
+    """
+    graph = campaign_graphs.get(db, campaign_id)
+    return faction_network(graph, limit)
+
 @router.get("/{org_id}", response_model=OrganizationSchema)
 async def get_organization(
     campaign_id: int,
@@ -143,6 +169,33 @@ async def get_organization(
     
     return org
 
+@router.get("/{org_id}/bundle", response_model=OrganizationBundle)
+async def get_organization_bundle(
+    campaign_id: int,
+    org_id: int,
+    include: Optional[str] = Query(None, description="Comma-separated parts to embed, all by default"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get an organization together with its related entities, for its detail page."""
+    try:
+        parts = bundles.parse_includes("organization", include)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    result = bundles.bundle(db, campaign_id, "organization", org_id, parts)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found"
+        )
+    
+    return result
+
 @router.put("/{org_id}", response_model=OrganizationSchema)
 async def update_organization(
     campaign_id: int,
@@ -200,30 +253,83 @@ async def update_organization(
     
     return org
 
+@router.get("/{org_id}/backlinks")
+async def get_organization_backlinks(
+    campaign_id: int,
+    org_id: int,
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get the plot hooks, organizations, events and other entities that refer to this organization."""
+    exists = db.query(Organization.id).filter(
+        Organization.id == org_id,
+        Organization.campaign_id == campaign_id
+    ).first()
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found"
+        )
+    
+    return references.backlinks(db, campaign_id, "organization", org_id)
+
 @router.delete("/{org_id}")
 async def delete_organization(
     campaign_id: int,
     org_id: int,
+    mode: str = Query("nullify", pattern="^(block|nullify|cascade)$", description="What to do with entities that refer to this organization"),
     current_user: User = Depends(get_current_user),
     campaign: Campaign = Depends(verify_campaign_access),
     db: Session = Depends(get_db)
 ):
-    """Delete an organization."""
-    org = db.query(Organization).filter(
+    """Delete an organization; see /delete-impact for what it affects."""
+    exists = db.query(Organization.id).filter(
         Organization.id == org_id,
         Organization.campaign_id == campaign_id
     ).first()
     
-    if not org:
+    if not exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Organization not found"
         )
     
-    db.delete(org)
+    if mode == "block":
+        report = deletion.impact(db, campaign_id, "organization", org_id)
+        if report["blocked"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=deletion.blocked_detail("organization", report)
+            )
+    
+    result = deletion.delete_entity(db, campaign_id, "organization", org_id, mode)
     db.commit()
     
-    return {"message": "Organization deleted successfully"}
+    return {"message": "Organization deleted successfully", **result}
+
+@router.get("/{org_id}/delete-impact")
+async def get_organization_delete_impact(
+    campaign_id: int,
+    org_id: int,
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get everything that refers to this organization, and what a cascading delete would remove."""
+    exists = db.query(Organization.id).filter(
+        Organization.id == org_id,
+        Organization.campaign_id == campaign_id
+    ).first()
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found"
+        )
+    
+    return deletion.impact(db, campaign_id, "organization", org_id)
 
 @router.get("/templates/fields")
 async def get_organization_template_fields():
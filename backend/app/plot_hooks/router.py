@@ -5,10 +5,11 @@ from app.database import get_db
 from app.models import PlotHook, Campaign, NPC, Location, Organization, User
 from app.schemas import (
     PlotHookCreate, PlotHookUpdate, PlotHook as PlotHookSchema,
-    PaginatedPlotHookResponse
+    PaginatedPlotHookResponse, PlotHookBundle
 )
 from app.auth.router import get_current_user
-from app.campaigns.router import verify_campaign_access
+from app.campaigns.router import verify_campaign_access, requested_ids
+from app.campaigns import bundles, multiget
 
 router = APIRouter()
 
@@ -25,7 +26,8 @@ async def get_plot_hooks(
     urgency: Optional[str] = Query(None),
     complexity: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
-    visibility: Optional[str] = Query(None)
+    visibility: Optional[str] = Query(None),
+    ids: Optional[List[int]] = Depends(requested_ids)
 ):
     """Get plot hooks for a campaign with optional filtering."""
     query = db.query(PlotHook).filter(PlotHook.campaign_id == campaign_id)
@@ -54,6 +56,11 @@ async def get_plot_hooks(
     if visibility:
         query = query.filter(PlotHook.visibility == visibility)
     
+    # Specific entries, in the order asked for
+    if ids is not None:
+        items = multiget.in_order(query.filter(PlotHook.id.in_(ids)).all(), ids)
+        return {"total": len(items), "items": items}
+    
     # Get total count
     total = query.count()
     
@@ -145,6 +152,33 @@ async def get_plot_hook(
     
     return hook
 
+@router.get("/{hook_id}/bundle", response_model=PlotHookBundle)
+async def get_plot_hook_bundle(
+    campaign_id: int,
+    hook_id: int,
+    include: Optional[str] = Query(None, description="Comma-separated parts to embed, all by default"),
+    current_user: User = Depends(get_current_user),
+    campaign: Campaign = Depends(verify_campaign_access),
+    db: Session = Depends(get_db)
+):
+    """Get a plot hook together with its related entities, for its detail page."""
+    try:
+        parts = bundles.parse_includes("plot_hook", include)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    result = bundles.bundle(db, campaign_id, "plot_hook", hook_id, parts)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Plot hook not found"
+        )
+    
+    return result
+
 @router.put("/{hook_id}", response_model=PlotHookSchema)
 async def update_plot_hook(
     campaign_id: int,
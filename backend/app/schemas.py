@@ -349,6 +349,14 @@ class Idea(IdeaBase):
     class Config:
         from_attributes = True
 
+class DuplicateMatch(BaseModel):
+    id: int
+    name: str
+    similarity: float
+
+class IdeaCreated(Idea):
+    possible_duplicates: List[DuplicateMatch] = []
+
 # Pagination
 T = TypeVar('T')
 
@@ -365,6 +373,22 @@ class PaginatedLocationResponse(BaseModel):
     total: int
     items: List['Location']
 
+class LocationTreeNode(BaseModel):
+    id: int
+    name: str
+    type: Optional[str] = None
+    status: Optional[str] = None
+    visibility: Optional[str] = None
+    parent_location_id: Optional[int] = None
+    child_count: int = 0
+    npc_count: int = 0
+    item_count: int = 0
+    children: List['LocationTreeNode'] = []  # Empty beyond the requested depth even if child_count > 0
+
+class LocationTree(BaseModel):
+    total: int
+    nodes: List[LocationTreeNode]
+
 # Organization schemas
 class OrganizationBase(BaseModel):
     name: str
@@ -501,4 +525,93 @@ class SessionNote(SessionNoteBase):
 
 class PaginatedSessionNoteResponse(BaseModel):
     total: int
-    items: List['SessionNote']
\ No newline at end of file
+    items: List['SessionNote']
+
+# AI job schemas
+class AIJobCreate(BaseModel):
+    kind: str
+    location_type: Optional[str] = None
+    locked_fields: Optional[Dict[str, Any]] = {}
+    seed: Optional[int] = None
+
+class AIJob(BaseModel):
+    id: int
+    campaign_id: int
+    kind: str
+    params: Optional[Dict[str, Any]] = None
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+# Entity detail bundles; parts that weren't requested with include= are null
+class ResolvedReference(BaseModel):
+    entry: Dict[str, Any]  # As stored, e.g. a relationship or event participant
+    npc: Optional[NPC] = None
+    location: Optional[Location] = None
+    organization: Optional[Organization] = None
+
+class NPCBundle(BaseModel):
+    npc: NPC
+    location: Optional[Location] = None
+    relationships: Optional[List[ResolvedReference]] = None
+    organizations: Optional[List[Organization]] = None  # Led or with the NPC as a notable member
+    items: Optional[List[Item]] = None  # Owned
+    plot_hooks: Optional[List[PlotHook]] = None
+    events: Optional[List[Event]] = None  # Participated in
+
+class LocationBundle(BaseModel):
+    location: Location
+    parent: Optional[Location] = None
+    children: Optional[List[Location]] = None
+    npcs: Optional[List[NPC]] = None
+    organizations: Optional[List[Organization]] = None  # Headquartered here
+    items: Optional[List[Item]] = None
+    events: Optional[List[Event]] = None
+    plot_hooks: Optional[List[PlotHook]] = None
+
+class OrganizationBundle(BaseModel):
+    organization: Organization
+    leader: Optional[NPC] = None
+    headquarters: Optional[Location] = None
+    members: Optional[List[NPC]] = None
+    allies: Optional[List[Organization]] = None
+    enemies: Optional[List[Organization]] = None
+    plot_hooks: Optional[List[PlotHook]] = None
+    events: Optional[List[Event]] = None  # Participated in
+
+class PlotHookBundle(BaseModel):
+    plot_hook: PlotHook
+    npcs: Optional[List[NPC]] = None
+    locations: Optional[List[Location]] = None
+    organizations: Optional[List[Organization]] = None
+
+class EventBundle(BaseModel):
+    event: Event
+    location: Optional[Location] = None
+    participants: Optional[List[ResolvedReference]] = None
+
+class ItemBundle(BaseModel):
+    item: Item
+    owner: Optional[NPC] = None
+    location: Optional[Location] = None
+
+# Multi-get of mixed entity references, in the order requested
+class ResolvedEntity(BaseModel):
+    type: str
+    id: int
+    found: bool
+    npc: Optional[NPC] = None
+    location: Optional[Location] = None
+    organization: Optional[Organization] = None
+    plot_hook: Optional[PlotHook] = None
+    event: Optional[Event] = None
+    item: Optional[Item] = None
+
+class ResolvedEntities(BaseModel):
+    results: List[ResolvedEntity]
@@ -8,7 +8,8 @@ from app.schemas import (
     PaginatedSessionNoteResponse
 )
 from app.auth.router import get_current_user
-from app.campaigns.router import verify_campaign_access
+from app.campaigns.router import verify_campaign_access, requested_ids
+from app.campaigns import multiget
 
 router = APIRouter()
 
@@ -23,7 +24,8 @@ async def get_session_notes(
     search: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     visibility: Optional[str] = Query(None),
-    session_number: Optional[int] = Query(None)
+    session_number: Optional[int] = Query(None),
+    ids: Optional[List[int]] = Depends(requested_ids)
 ):
     query = db.query(SessionNote).filter(SessionNote.campaign_id == campaign_id)
     
@@ -45,6 +47,11 @@ async def get_session_notes(
     if session_number is not None:
         query = query.filter(SessionNote.session_number == session_number)
     
+    # Specific entries, in the order asked for
+    if ids is not None:
+        items = multiget.in_order(query.filter(SessionNote.id.in_(ids)).all(), ids)
+        return PaginatedSessionNoteResponse(total=len(items), items=items)
+    
     # Get total count for pagination
     total = query.count()
     
@@ -0,0 +1,72 @@
+"""
+Benchmark AI generation throughput and parser behavior against the stub provider.
+
+Runs NPC and location generations through the real generators, AIManager,
+fair scheduler and JSON parser, with the deterministic stub standing in for
+the model, so no Ollama server or API key is needed. Reports generations per
+second, latency percentiles and how many responses fell back after parse
+failures.
+
+The stub settings (AI_STUB_TTFT, AI_STUB_TOKENS_PER_SECOND,
+AI_STUB_MALFORMED_RATE, ...) shape the simulated model; see app/ai/stub.py.
+
+Usage (from the backend directory):
+    python benchmarks/bench_ai_stub.py
+    BENCH_REQUESTS=200 BENCH_CONCURRENCY=16 AI_MAX_CONCURRENT=16 python benchmarks/bench_ai_stub.py
+    AI_STUB_MALFORMED_RATE=0.3 AI_STUB_TTFT=fixed:0 AI_STUB_TOKENS_PER_SECOND=0 python benchmarks/bench_ai_stub.py
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ["AI_STUB"] = "1"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.generators.location_generator import LocationGenerator  # noqa: E402
+from app.ai.generators.npc_generator import NPCGenerator  # noqa: E402
+from app.ai.metrics import ai_metrics  # noqa: E402
+
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "100"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "8"))
+
+CONTEXT = {'world_name': 'Eldoria', 'campaign_name': 'Benchmark'}
+
+
+async def run_kind(name: str, generate):
+    ai_metrics.reset()
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await generate(index)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    snapshot = ai_metrics.snapshot()
+    fallbacks = sum(fallback["count"] for fallback in snapshot["fallbacks"])
+    print(
+        f"{name:<9} {REQUESTS / elapsed:8.1f} gen/s   "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms   "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms   "
+        f"parse failures {sum(snapshot['parse_failures'].values()):4.0f}   "
+        f"fallbacks {fallbacks:4.0f}"
+    )
+
+
+async def main():
+    print(f"{REQUESTS} generations per kind, {CONCURRENCY} concurrent")
+    await run_kind("npc", lambda index: NPCGenerator.generate_npc(CONTEXT))
+    await run_kind("location", lambda index: LocationGenerator.generate_location("settlement", CONTEXT))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
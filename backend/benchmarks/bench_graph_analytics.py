@@ -0,0 +1,65 @@
+"""
+Benchmark campaign graph analytics on a large synthetic graph.
+
+Builds a CampaignGraph of BENCH_NODES NPCs joined by BENCH_EDGES random
+relationships, then times the first (uncached) and repeated calls of:
+
+- degree and betweenness centrality
+- connected components
+- shortest path between two NPCs
+
+Usage (from the backend directory):
+    python benchmarks/bench_graph_analytics.py
+    BENCH_NODES=2000 BENCH_EDGES=10000 python benchmarks/bench_graph_analytics.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.campaigns.graph import CampaignGraph, Node  # noqa: E402
+from app.campaigns.graph_analytics import centrality, components, shortest_path  # noqa: E402
+
+NODES = int(os.getenv("BENCH_NODES", "10000"))
+EDGES = int(os.getenv("BENCH_EDGES", "40000"))
+
+RELATIONSHIP_TYPES = ["friend", "rival", "family", "employer", "ally", "enemy"]
+
+
+def synthetic_graph(rng: random.Random) -> CampaignGraph:
+    graph = CampaignGraph(campaign_id=1, version=1)
+    for npc_id in range(1, NODES + 1):
+        graph.add_node(Node("npc", npc_id, f"NPC {npc_id}", None, "dm_only"))
+    for _ in range(EDGES):
+        graph.add_edge(
+            ("npc", rng.randint(1, NODES)),
+            ("npc", rng.randint(1, NODES)),
+            rng.choice(RELATIONSHIP_TYPES)
+        )
+    return graph
+
+
+def timed(label, call):
+    started = time.perf_counter()
+    call()
+    first = time.perf_counter() - started
+    started = time.perf_counter()
+    call()
+    cached = time.perf_counter() - started
+    print(f"{label:22} {first * 1000:10.1f} ms first   {cached * 1000:8.2f} ms cached")
+
+
+def main():
+    graph = synthetic_graph(random.Random(7))
+    print(f"{len(graph.nodes)} nodes, {len(graph.edges)} edges")
+    timed("degree centrality", lambda: centrality(graph, "degree"))
+    timed("betweenness", lambda: centrality(graph, "betweenness"))
+    timed("components", lambda: components(graph))
+    timed("shortest path", lambda: shortest_path(graph, ("npc", 1), ("npc", NODES)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark the tolerant JSON parser against the previous repair strategy.
+
+Runs both over a corpus of malformed model responses (llm_responses.json) and
+reports how many responses each recovers with the expected fields, plus the
+average parse time.
+
+Usage (from the backend directory):
+    python benchmarks/bench_json_parser.py
+"""
+
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.json_parser import parse_json_object  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_responses.json")
+ITERATIONS = 200
+
+
+def legacy_parse(response: str):
+    """The brace-counting repair the generators used before the tolerant parser"""
+    cleaned = response.strip()
+    start_idx = cleaned.find('{')
+    if start_idx > 0:
+        cleaned = cleaned[start_idx:]
+    cleaned = re.sub(r'"age":\s*"([^"]*?(\d+)[^"]*?)"', r'"age": \2', cleaned)
+    if not cleaned.endswith('}'):
+        cleaned = cleaned.rstrip() + '}'
+    missing = cleaned.count('{') - cleaned.count('}')
+    if missing > 0:
+        cleaned += '}' * missing
+    return json.loads(cleaned)
+
+
+def tolerant_parse(response: str):
+    return parse_json_object(response)
+
+
+def recovered(parser, case) -> bool:
+    try:
+        result = parser(case["response"])
+    except ValueError:
+        return case["expect"] is None
+    if case["expect"] is None:
+        return False
+    return all(result.get(field) == value for field, value in case["expect"].items())
+
+
+def main():
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+
+    print(f"{'case':<28}{'legacy':>10}{'tolerant':>10}")
+    totals = {"legacy": 0, "tolerant": 0}
+    for case in corpus:
+        legacy_ok = recovered(legacy_parse, case)
+        tolerant_ok = recovered(tolerant_parse, case)
+        totals["legacy"] += legacy_ok
+        totals["tolerant"] += tolerant_ok
+        print(f"{case['name']:<28}{'ok' if legacy_ok else 'FAIL':>10}{'ok' if tolerant_ok else 'FAIL':>10}")
+
+    print()
+    print(f"recovered: legacy {totals['legacy']}/{len(corpus)}, tolerant {totals['tolerant']}/{len(corpus)}")
+
+    for name, parser in (("legacy", legacy_parse), ("tolerant", tolerant_parse)):
+        def run_corpus():
+            for case in corpus:
+                try:
+                    parser(case["response"])
+                except ValueError:
+                    pass
+        seconds = timeit.timeit(run_corpus, number=ITERATIONS)
+        print(f"{name}: {seconds / (ITERATIONS * len(corpus)) * 1e6:.1f} us per response")
+
+
+if __name__ == "__main__":
+    main()
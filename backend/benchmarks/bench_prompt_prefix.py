@@ -0,0 +1,114 @@
+"""
+Benchmark time-to-first-token with and without a reusable prompt prefix.
+
+Sends a series of NPC prompts with different campaign contexts to a local
+Ollama server and measures how long the first token takes for two layouts:
+
+- legacy: the per-request context sits in the middle of the prompt, before
+  the static height guidance, as the old prompt builder did
+- prefix: the compiled template, with all static text first and the
+  per-request suffix last
+
+Ollama can only reuse the evaluation of an identical leading part of the
+prompt, so the prefix layout should need far less prompt evaluation per
+request once the model is warm.
+
+Usage (from the backend directory, with Ollama running):
+    python benchmarks/bench_prompt_prefix.py
+    OLLAMA_URL=http://localhost:11434 OLLAMA_MODEL=llama3.2 python benchmarks/bench_prompt_prefix.py
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.generators.npc_generator import NPC_INSTRUCTIONS, NPC_HEIGHT_GUIDANCE, NPC_PROMPT  # noqa: E402
+from app.ai.prompts import RETURN_JSON_ONLY  # noqa: E402
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "8"))
+
+WORLDS = ["Eldoria", "Kharzul", "The Shattered Isles", "Veythra", "Mournvale", "Duskreach", "Solmere", "Ironhold"]
+
+
+def contexts():
+    for index in range(REQUESTS):
+        yield {
+            'world_name': WORLDS[index % len(WORLDS)],
+            'avoid_names': [f"Taken Name {index}"]
+        }
+
+
+def legacy_prompt(context) -> str:
+    rendered = NPC_PROMPT.render(campaign_context=context)
+    dynamic = rendered.suffix[:-len(RETURN_JSON_ONLY)].strip()
+    return f"{NPC_INSTRUCTIONS}\n\n{dynamic}\n\n{RETURN_JSON_ONLY}\n\n{NPC_HEIGHT_GUIDANCE}"
+
+
+def prefix_prompt(context) -> str:
+    return NPC_PROMPT.render(campaign_context=context).text
+
+
+async def first_token(client: httpx.AsyncClient, prompt: str):
+    """Return (seconds to first token, prompt tokens evaluated)"""
+    started = time.perf_counter()
+    async with client.stream(
+        "POST",
+        f"{OLLAMA_URL}/api/generate",
+        json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": True, "keep_alive": "30m", "options": {"num_predict": 1}}
+    ) as response:
+        response.raise_for_status()
+        ttft = None
+        evaluated = None
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if ttft is None and chunk.get("response"):
+                ttft = time.perf_counter() - started
+            if chunk.get("done"):
+                evaluated = chunk.get("prompt_eval_count")
+        return ttft if ttft is not None else time.perf_counter() - started, evaluated
+
+
+async def run_layout(client: httpx.AsyncClient, name: str, build):
+    # Warm the model and the prefix before measuring
+    await first_token(client, build({'world_name': 'Warmup'}))
+
+    ttfts = []
+    evaluated = []
+    for context in contexts():
+        ttft, tokens = await first_token(client, build(context))
+        ttfts.append(ttft)
+        if tokens is not None:
+            evaluated.append(tokens)
+
+    print(
+        f"{name:<8} median ttft {statistics.median(ttfts) * 1000:7.1f} ms   "
+        f"max {max(ttfts) * 1000:7.1f} ms   "
+        f"prompt tokens evaluated {statistics.mean(evaluated) if evaluated else float('nan'):6.0f}"
+    )
+
+
+async def main():
+    print(f"{OLLAMA_MODEL} at {OLLAMA_URL}, {REQUESTS} requests per layout")
+    async with httpx.AsyncClient(timeout=300.0) as client:
+        try:
+            await client.get(f"{OLLAMA_URL}/api/tags")
+        except httpx.HTTPError as e:
+            print(f"Ollama is not reachable: {e}")
+            return
+        await run_layout(client, "legacy", legacy_prompt)
+        await run_layout(client, "prefix", prefix_prompt)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
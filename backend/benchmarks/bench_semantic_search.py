@@ -0,0 +1,91 @@
+"""
+Benchmark semantic search over a large embedding index.
+
+Embeds synthetic entity descriptions with the built-in hashing embedder and
+measures, at BENCH_VECTORS vectors:
+
+- embedding throughput
+- loading the index from float32 blobs, as stored in entity_embeddings
+- query latency of the vectorized NumPy search
+- query latency of a per-row Python cosine loop, for comparison (on a sample)
+
+Usage (from the backend directory):
+    python benchmarks/bench_semantic_search.py
+    BENCH_VECTORS=20000 AI_EMBEDDING_DIM=256 python benchmarks/bench_semantic_search.py
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.embeddings import HashingEmbedder, VectorTable, normalize  # noqa: E402
+
+VECTORS = int(os.getenv("BENCH_VECTORS", "100000"))
+QUERIES = int(os.getenv("BENCH_QUERIES", "50"))
+LOOP_SAMPLE = int(os.getenv("BENCH_LOOP_SAMPLE", "10000"))
+
+TABLES = ["npcs", "locations", "organizations", "plot_hooks", "events", "items", "ideas_inbox", "session_notes"]
+
+WORDS = (
+    "smuggler ring docks captain merchant guild thief assassin priest temple ruins dragon cave forest "
+    "village baker blacksmith noble court spy rebellion cult necromancer tower wizard library harbor "
+    "ship pirate treasure map curse artifact sword shield knight order crown throne heir plague"
+).split()
+
+
+def synthetic_text(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 40)))
+
+
+def python_search(vectors, query, limit):
+    scored = []
+    for index, vector in enumerate(vectors):
+        dot = sum(a * b for a, b in zip(vector, query))
+        scored.append((dot, index))
+    scored.sort(reverse=True)
+    return scored[:limit]
+
+
+async def main():
+    rng = random.Random(7)
+    embedder = HashingEmbedder()
+    texts = [synthetic_text(rng) for _ in range(VECTORS)]
+
+    started = time.perf_counter()
+    vectors = normalize(await embedder.embed(texts))
+    elapsed = time.perf_counter() - started
+    print(f"{VECTORS} vectors, {embedder.dim} dimensions, {vectors.nbytes / 1e6:.1f} MB as float32")
+    print(f"embed            {VECTORS / elapsed:10.0f} texts/s")
+
+    blobs = [vector.tobytes() for vector in vectors]
+    started = time.perf_counter()
+    loaded = np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(blobs), -1)
+    table = VectorTable(loaded.shape[1])
+    table.put([(TABLES[index % len(TABLES)], index) for index in range(VECTORS)], [""] * VECTORS, loaded)
+    print(f"load from blobs  {(time.perf_counter() - started) * 1000:10.1f} ms")
+
+    queries = normalize(await embedder.embed([synthetic_text(rng) for _ in range(QUERIES)]))
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        table.search(query, limit=20, min_score=embedder.min_score)
+        timings.append(time.perf_counter() - started)
+    print(f"numpy search     {statistics.median(timings) * 1000:10.2f} ms median   {max(timings) * 1000:8.2f} ms max")
+
+    sample = [list(map(float, vector)) for vector in vectors[:LOOP_SAMPLE]]
+    started = time.perf_counter()
+    python_search(sample, list(map(float, queries[0])), 20)
+    loop_seconds = (time.perf_counter() - started) * VECTORS / len(sample)
+    print(f"python loop      {loop_seconds * 1000:10.2f} ms (extrapolated from {len(sample)} rows)")
+    print(f"speedup          {loop_seconds / statistics.median(timings):10.0f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import itertools
+import os
+import tempfile
+from contextlib import contextmanager
+
+# The app creates its engine and tables on import, so the test database is chosen first
+_db_dir = tempfile.mkdtemp(prefix="dm_toolkit_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import SessionLocal, engine
+from app.main import app
+
+engine.echo = False
+_users = itertools.count()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    # Not entered as a context manager, so the AI workers aren't started
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers(client):
+    # A user (and so campaigns) of its own per test: the database and the
+    # in-memory caches keyed by campaign id are shared by the whole run
+    username = f"dm{next(_users)}"
+    client.post("/auth/register", json={"email": f"{username}@example.com", "username": username, "password": "secret"})
+    token = client.post("/auth/login", data={"username": f"{username}@example.com", "password": "secret"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def campaign_id(client, auth_headers):
+    response = client.post("/campaigns/", json={"name": "Test Campaign", "world_name": "Testworld"}, headers=auth_headers)
+    return response.json()["id"]
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager counting the statements run against the test database"""
+    @contextmanager
+    def counting():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return counting
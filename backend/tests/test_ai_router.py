@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/ai/cache", "/ai/prompts", "/ai/limits"])
+def test_stats_need_a_login(client, auth_headers, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=auth_headers).status_code == 200
+
+
+def test_metrics_are_a_public_scrape_target(client):
+    response = client.get("/ai/metrics", params={"format": "prometheus"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
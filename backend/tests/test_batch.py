@@ -0,0 +1,45 @@
+import pytest
+
+from app.ai import batch
+
+
+@pytest.fixture
+def generated_seeds(monkeypatch):
+    seeds = []
+
+    async def generate_one(kind, campaign_context, locked_fields, location_type, seed):
+        seeds.append(seed)
+        return {"name": f"NPC {len(seeds)}"}
+
+    monkeypatch.setattr(batch, "_generate_one", generate_one)
+    return seeds
+
+
+async def _run(**kwargs):
+    return [result async for result in batch.generate_batch("npc", 3, {}, **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_items_get_consecutive_seeds(generated_seeds):
+    await _run(seed=10)
+
+    assert sorted(generated_seeds) == [10, 11, 12]
+
+
+@pytest.mark.asyncio
+async def test_global_seed_is_spread_over_the_items(generated_seeds, monkeypatch):
+    monkeypatch.setattr(batch, "DEFAULT_SEED", 42)
+
+    await _run()
+
+    assert sorted(generated_seeds) == [42, 43, 44]
+
+
+@pytest.mark.asyncio
+async def test_unseeded_batches_stay_unseeded(generated_seeds, monkeypatch):
+    monkeypatch.setattr(batch, "DEFAULT_SEED", None)
+
+    results = await _run()
+
+    assert generated_seeds == [None, None, None]
+    assert sorted(result["data"]["name"] for result in results) == ["NPC 1", "NPC 2", "NPC 3"]
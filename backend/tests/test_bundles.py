@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.campaigns import bundles
+from app.models import NPC, Location, Organization, PlotHook, Event, Item
+
+
+@pytest.fixture
+def world(db, campaign_id):
+    """Kingdom > City > Market, two NPCs in the city and a guild, sword, festival and hook around them"""
+    kingdom = Location(campaign_id=campaign_id, name="Kingdom")
+    db.add(kingdom)
+    db.flush()
+    city = Location(campaign_id=campaign_id, name="City", parent_location_id=kingdom.id)
+    db.add(city)
+    db.flush()
+    market = Location(campaign_id=campaign_id, name="Market", parent_location_id=city.id)
+    bram = NPC(campaign_id=campaign_id, name="Bram", location_id=city.id)
+    alda = NPC(campaign_id=campaign_id, name="Alda", location_id=city.id)
+    db.add_all([market, bram, alda])
+    db.flush()
+    alda.relationships = [
+        {"target_id": bram.id, "target_type": "npc", "relationship_type": "friend"},
+        {"target_id": 999999, "target_type": "npc", "relationship_type": "rival"},
+        {"target_name": "The Crown", "relationship_type": "loyal"},
+    ]
+    guild = Organization(campaign_id=campaign_id, name="Guild", leader_npc_id=alda.id, headquarters_location_id=city.id,
+                         notable_members=[bram.id, alda.id, bram.id, 999999], allies=[], enemies=[])
+    db.add(guild)
+    db.flush()
+    sword = Item(campaign_id=campaign_id, name="Sword", current_owner_id=alda.id, current_location_id=city.id)
+    festival = Event(campaign_id=campaign_id, title="Festival", location_id=city.id,
+                     participants=[{"type": "npc", "id": alda.id}, {"type": "organization", "id": guild.id}])
+    hook = PlotHook(campaign_id=campaign_id, title="Missing Ledger", related_npcs=[alda.id], related_locations=[city.id])
+    db.add_all([sword, festival, hook])
+    db.commit()
+    return SimpleNamespace(kingdom=kingdom, city=city, market=market, alda=alda, bram=bram,
+                           guild=guild, sword=sword, festival=festival, hook=hook)
+
+
+def _ids(entities):
+    return [entity.id for entity in entities]
+
+
+def test_location_bundle(db, campaign_id, world):
+    result = bundles.bundle(db, campaign_id, "location", world.city.id, bundles.parse_includes("location", None))
+
+    assert result["location"].id == world.city.id
+    assert result["parent"].id == world.kingdom.id
+    assert _ids(result["children"]) == [world.market.id]
+    # References to the location come in name order
+    assert _ids(result["npcs"]) == [world.alda.id, world.bram.id]
+    assert _ids(result["organizations"]) == [world.guild.id]
+    assert _ids(result["items"]) == [world.sword.id]
+    assert _ids(result["events"]) == [world.festival.id]
+    assert _ids(result["plot_hooks"]) == [world.hook.id]
+
+
+def test_organization_members_keep_stored_order(db, campaign_id, world):
+    result = bundles.bundle(db, campaign_id, "organization", world.guild.id, bundles.parse_includes("organization", None))
+
+    assert result["leader"].id == world.alda.id
+    assert result["headquarters"].id == world.city.id
+    # Duplicate and missing members are left out
+    assert _ids(result["members"]) == [world.bram.id, world.alda.id]
+    assert result["allies"] == result["enemies"] == []
+    assert _ids(result["events"]) == [world.festival.id]
+
+
+def test_npc_relationships_resolve_entries(db, campaign_id, world):
+    result = bundles.bundle(db, campaign_id, "npc", world.alda.id, bundles.parse_includes("npc", None))
+
+    relationships = result["relationships"]
+    # Every stored entry is kept; only those pointing at an existing NPC resolve
+    assert [entry["entry"]["relationship_type"] for entry in relationships] == ["friend", "rival", "loyal"]
+    assert relationships[0]["npc"].id == world.bram.id
+    assert "npc" not in relationships[1] and "npc" not in relationships[2]
+    assert result["location"].id == world.city.id
+    assert _ids(result["organizations"]) == [world.guild.id]
+    assert _ids(result["items"]) == [world.sword.id]
+    assert _ids(result["plot_hooks"]) == [world.hook.id]
+    assert _ids(result["events"]) == [world.festival.id]
+
+
+def test_only_requested_parts_are_loaded(db, campaign_id, world, count_queries):
+    city_id = world.city.id
+    with count_queries() as statements:
+        result = bundles.bundle(db, campaign_id, "location", city_id, bundles.parse_includes("location", "parent"))
+
+    assert set(result) == {"location", "parent"}
+    # The location and its parent; no reference lookup
+    assert len(statements) == 2
+
+
+def test_query_count_does_not_grow_with_related_entities(db, campaign_id, world, count_queries):
+    parts = bundles.parse_includes("location", None)
+    city_id = world.city.id
+    with count_queries() as before:
+        bundles.bundle(db, campaign_id, "location", city_id, parts)
+
+    db.add_all([NPC(campaign_id=campaign_id, name=f"Villager {n}", location_id=city_id) for n in range(15)])
+    db.add_all([Location(campaign_id=campaign_id, name=f"Street {n}", parent_location_id=city_id) for n in range(5)])
+    db.commit()
+    with count_queries() as after:
+        result = bundles.bundle(db, campaign_id, "location", city_id, parts)
+
+    assert len(result["npcs"]) == 17
+    assert len(after) == len(before)
+
+
+def test_parse_includes():
+    assert bundles.parse_includes("item", "") == ["owner", "location"]
+    assert bundles.parse_includes("npc", "items, location,items") == ["items", "location"]
+    with pytest.raises(ValueError):
+        bundles.parse_includes("npc", "location,friends")
+
+
+def test_bundle_endpoint(client, auth_headers, campaign_id, world):
+    base = f"/campaigns/{campaign_id}/locations"
+
+    response = client.get(f"{base}/{world.city.id}/bundle", params={"include": "parent"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["parent"]["name"] == "Kingdom"
+    assert body["npcs"] is None
+
+    assert client.get(f"{base}/{world.city.id}/bundle", params={"include": "rumours"}, headers=auth_headers).status_code == 400
+    assert client.get(f"{base}/999999/bundle", headers=auth_headers).status_code == 404
@@ -0,0 +1,143 @@
+import pytest
+from sqlalchemy import delete
+
+from app.campaigns import deletion, references
+from app.locations import hierarchy, travel
+from app.models import NPC, EntityReference, Item, Location, LocationClosure, Organization, PlotHook, TravelRoute
+
+
+@pytest.fixture
+def world(db, campaign_id):
+    """Region > Town > Inn, with things referring to the town and to an NPC at the inn"""
+    region = Location(campaign_id=campaign_id, name="Region")
+    town = Location(campaign_id=campaign_id, name="Town", parent_location=region)
+    inn = Location(campaign_id=campaign_id, name="Inn", parent_location=town)
+    db.add_all([region, town, inn])
+    db.flush()
+    region.connected_locations = [{"location_id": town.id, "travel_time": "3 hours"}]
+    barkeep = NPC(campaign_id=campaign_id, name="Barkeep", location_id=inn.id)
+    db.add(barkeep)
+    db.flush()
+    mira = NPC(campaign_id=campaign_id, name="Mira", relationships=[
+        {"target_id": barkeep.id, "target_type": "npc"}, {"target_id": town.id, "target_type": "location"}
+    ])
+    guild = Organization(campaign_id=campaign_id, name="Guild", headquarters_location_id=town.id,
+                         leader_npc_id=barkeep.id, notable_members=[barkeep.id])
+    hook = PlotHook(campaign_id=campaign_id, title="Trouble in Town", related_locations=[town.id, region.id],
+                    related_npcs=[barkeep.id])
+    key = Item(campaign_id=campaign_id, name="Key", current_location_id=town.id, current_owner_id=barkeep.id)
+    db.add_all([mira, guild, hook, key])
+    db.commit()
+    return {obj.name if hasattr(obj, "name") and obj.name else obj.title: obj
+            for obj in (region, town, inn, barkeep, mira, guild, hook, key)}
+
+
+def _derived(db, campaign_id):
+    location_ids = [location_id for (location_id,) in db.query(Location.id).filter(Location.campaign_id == campaign_id)]
+    return (
+        {(row.ancestor_id, row.descendant_id, row.depth) for row in
+         db.query(LocationClosure).filter(LocationClosure.descendant_id.in_(location_ids))},
+        {(row.source_type, row.source_id, row.field, row.target_type, row.target_id) for row in
+         db.query(EntityReference).filter(EntityReference.campaign_id == campaign_id)},
+        {(row.from_location_id, row.to_location_id, row.travel_hours) for row in
+         db.query(TravelRoute).filter(TravelRoute.campaign_id == campaign_id)},
+    )
+
+
+def _assert_derived_tables_consistent(db, campaign_id):
+    maintained = _derived(db, campaign_id)
+    hierarchy.rebuild(db, campaign_id)
+    references.rebuild(db, campaign_id)
+    db.execute(delete(TravelRoute).where(TravelRoute.campaign_id == campaign_id))
+    travel.rebuild(db, campaign_id)
+    assert maintained == _derived(db, campaign_id)
+    db.rollback()
+
+
+def _delete(db, campaign_id, entity_type, entity_id, mode):
+    result = deletion.delete_entity(db, campaign_id, entity_type, entity_id, mode)
+    db.commit()
+    db.expire_all()
+    return result
+
+
+def test_impact_report(db, campaign_id, world):
+    report = deletion.impact(db, campaign_id, "location", world["Town"].id)
+
+    assert report["blocked"] is True
+    # The inn is contained rather than a reference: a cascade deletes it too
+    assert report["references"]["by_type"] == {"item": 1, "location": 1, "npc": 1, "organization": 1, "plot_hook": 1}
+    assert [entry["name"] for entry in report["contained"]] == ["Inn"]
+    assert [(source["name"], source["fields"]) for source in report["contained_references"]] == [("Barkeep", ["location_id"])]
+    assert deletion.blocked_detail("location", report).startswith(
+        "Cannot delete location referenced by 1 item, 1 location, 1 NPC, 1 organization, 1 plot hook, 1 sub-location;"
+    )
+
+
+def test_sub_locations_alone_block_a_delete(db, campaign_id):
+    region = Location(campaign_id=campaign_id, name="Region")
+    db.add(Location(campaign_id=campaign_id, name="Town", parent_location=region))
+    db.commit()
+
+    report = deletion.impact(db, campaign_id, "location", region.id)
+
+    assert report["references"]["total"] == 0
+    assert report["blocked"] is True
+
+
+def test_nullify_clears_references_and_keeps_sub_locations(db, campaign_id, world):
+    town_id, region_id = world["Town"].id, world["Region"].id
+
+    result = _delete(db, campaign_id, "location", town_id, "nullify")
+
+    assert result["deleted"] == [{"type": "location", "id": town_id}]
+    assert db.get(Location, town_id) is None
+    assert world["Inn"].parent_location_id is None
+    assert world["Key"].current_location_id is None
+    assert world["Guild"].headquarters_location_id is None
+    assert world["Trouble in Town"].related_locations == [region_id]
+    assert world["Mira"].relationships == [{"target_id": world["Barkeep"].id, "target_type": "npc"}]
+    assert world["Region"].connected_locations == []
+    assert [location.name for location in hierarchy.ancestors(db, world["Inn"].id)] == []
+    _assert_derived_tables_consistent(db, campaign_id)
+
+
+def test_cascade_deletes_contained_locations(db, campaign_id, world):
+    town_id, inn_id = world["Town"].id, world["Inn"].id
+
+    result = _delete(db, campaign_id, "location", town_id, "cascade")
+
+    assert {entry["id"] for entry in result["deleted"]} == {town_id, inn_id}
+    assert db.get(Location, inn_id) is None
+    assert world["Barkeep"].location_id is None
+    assert db.get(Location, world["Region"].id) is not None
+    _assert_derived_tables_consistent(db, campaign_id)
+
+
+def test_deleting_an_npc_rewrites_json_lists(db, campaign_id, world):
+    barkeep_id = world["Barkeep"].id
+
+    result = _delete(db, campaign_id, "npc", barkeep_id, "nullify")
+
+    # Mira, the guild, the plot hook and the key referred to the barkeep
+    assert result["updated"] == 4
+    assert world["Guild"].notable_members == []
+    assert world["Guild"].leader_npc_id is None
+    assert world["Trouble in Town"].related_npcs == []
+    assert world["Key"].current_owner_id is None
+    assert world["Mira"].relationships == [{"target_id": world["Town"].id, "target_type": "location"}]
+    _assert_derived_tables_consistent(db, campaign_id)
+
+
+def test_block_mode_refuses_referenced_locations(client, auth_headers, campaign_id):
+    base = f"/campaigns/{campaign_id}/locations/"
+    town = client.post(base, json={"name": "Town"}, headers=auth_headers).json()
+    client.post(f"/campaigns/{campaign_id}/npcs/", json={"name": "Guard", "location_id": town["id"]}, headers=auth_headers)
+
+    blocked = client.delete(f"{base}{town['id']}", headers=auth_headers)
+    nullified = client.delete(f"{base}{town['id']}", params={"mode": "nullify"}, headers=auth_headers)
+
+    assert blocked.status_code == 400
+    assert "1 NPC" in blocked.json()["detail"]
+    assert nullified.status_code == 200
+    assert client.get(f"{base}{town['id']}", headers=auth_headers).status_code == 404
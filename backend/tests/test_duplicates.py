@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.campaigns.duplicates import _CampaignIndex, _shingles, duplicate_index, signature, similarity
+from app.models import NPC, Idea
+
+STRANGER = "A hooded stranger in a dark cloak who watches the tavern door and never gives a name"
+
+
+def _jaccard(first, second):
+    first, second = _shingles(first), _shingles(second)
+    return len(first & second) / len(first | second)
+
+
+def test_identical_texts_have_identical_signatures():
+    assert similarity(signature(STRANGER), signature(STRANGER.upper())) == 1.0
+
+
+@pytest.mark.parametrize("other", [
+    "A hooded stranger in a dark cloak who watches the tavern door and never gives a name to anyone",
+    "A hooded stranger in a grey cloak who watches the market gate and never gives a name",
+    "A cheerful baker who sells honey cakes by the river and sings while she works",
+])
+def test_similarity_estimates_jaccard(other):
+    estimate = similarity(signature(STRANGER), signature(other))
+
+    # 128 permutations: the standard error is at most about 0.045
+    assert abs(estimate - _jaccard(STRANGER, other)) < 0.15
+
+
+def test_texts_without_words_have_no_signature():
+    assert signature("  -- !! ") is None
+
+
+def _row(row_id, text):
+    return SimpleNamespace(id=row_id, content=text)
+
+
+def test_lsh_buckets_near_duplicates_together():
+    index = _CampaignIndex()
+    index.add("ideas_inbox", _row(1, STRANGER))
+    index.add("ideas_inbox", _row(2, "A cheerful baker who sells honey cakes by the river and sings while she works"))
+
+    near = signature(STRANGER + " to anyone")
+
+    assert index.candidates("ideas_inbox", near) == {1}
+    assert index.candidates("npcs", near) == set()
+
+
+def test_removing_an_entry_empties_its_buckets():
+    index = _CampaignIndex()
+    index.add("ideas_inbox", _row(1, STRANGER))
+    index.remove("ideas_inbox", 1)
+
+    assert index.buckets == {}
+    assert index.candidates("ideas_inbox", signature(STRANGER)) == set()
+
+
+def test_find_and_cluster_campaign_duplicates(db, campaign_id):
+    first = NPC(campaign_id=campaign_id, name="Mysterious Stranger", occupation="wanderer", background=STRANGER)
+    second = NPC(campaign_id=campaign_id, name="Mysterious Stranger", occupation="wanderer", background=STRANGER + " to anyone")
+    baker = NPC(campaign_id=campaign_id, name="Hilda", occupation="baker", background="Sells honey cakes by the river")
+    db.add_all([first, second, baker, Idea(campaign_id=campaign_id, content=STRANGER)])
+    db.commit()
+
+    matches = duplicate_index.find(db, campaign_id, "npcs", {"name": "Mysterious Stranger", "occupation": "wanderer", "background": STRANGER})
+    clusters = duplicate_index.clusters(db, campaign_id)
+
+    assert {match["id"] for match in matches} == {first.id, second.id}
+    assert [(cluster["table"], [member["id"] for member in cluster["members"]]) for cluster in clusters] == [
+        ("npcs", sorted([first.id, second.id]))
+    ]
+
+
+def test_index_follows_deletes(db, campaign_id):
+    first = NPC(campaign_id=campaign_id, name="Mysterious Stranger", background=STRANGER)
+    second = NPC(campaign_id=campaign_id, name="Mysterious Stranger", background=STRANGER)
+    db.add_all([first, second])
+    db.commit()
+    assert len(duplicate_index.clusters(db, campaign_id)) == 1
+
+    db.delete(second)
+    db.commit()
+
+    assert duplicate_index.clusters(db, campaign_id) == []
+    assert [match["id"] for match in duplicate_index.find(db, campaign_id, "npcs", first, exclude_id=first.id)] == []
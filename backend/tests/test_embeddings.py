@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.ai.embeddings import VectorTable, normalize
+
+
+def _table(entries):
+    """A VectorTable of 2-d unit vectors at the given angles, keyed by (table, id)"""
+    table = VectorTable(2)
+    keys = [key for key, _ in entries]
+    angles = np.array([angle for _, angle in entries])
+    table.put(keys, [str(key) for key in keys], np.stack([np.cos(angles), np.sin(angles)], axis=1).astype(np.float32))
+    return table
+
+
+def test_each_table_gets_its_own_top_results():
+    # Twenty NPCs closer to the query than any location
+    entries = [(("npcs", npc_id), 0.01 * npc_id) for npc_id in range(1, 21)]
+    entries += [(("locations", 1), 0.9), (("locations", 2), 0.8), (("locations", 3), 1.0)]
+    table = _table(entries)
+
+    results = table.search(normalize(np.array([1.0, 0.0], dtype=np.float32)), limit=2)
+
+    assert [entity_id for entity_id, _ in results["npcs"]] == [1, 2]
+    assert [entity_id for entity_id, _ in results["locations"]] == [2, 1]
+
+
+def test_tables_filter_applies_before_the_cut_off():
+    entries = [(("npcs", npc_id), 0.01 * npc_id) for npc_id in range(1, 41)]
+    entries += [(("items", 1), 1.2)]
+    table = _table(entries)
+
+    results = table.search(normalize(np.array([1.0, 0.0], dtype=np.float32)), limit=1, tables={"items"})
+
+    assert list(results) == ["items"]
+    assert results["items"][0][0] == 1
+
+
+def test_removed_rows_are_not_returned():
+    table = _table([(("npcs", 1), 0.0), (("locations", 1), 0.1), (("npcs", 2), 0.2)])
+    table.remove(("npcs", 1))
+
+    results = table.search(np.array([1.0, 0.0], dtype=np.float32), limit=5)
+
+    assert results["npcs"] == [(2, round(float(np.cos(0.2)), 4))]
+    assert [entity_id for entity_id, _ in results["locations"]] == [1]
@@ -0,0 +1,91 @@
+from app.campaigns.graph import CampaignGraph, Node
+from app.organizations.factions import faction_network
+
+
+def _graph(org_ids, relations):
+    """Organizations with the given ids, declaring (source, target, type) relations"""
+    graph = CampaignGraph(campaign_id=1, version=3)
+    # An NPC ahead of the organizations, so node and matrix positions differ
+    graph.add_node(Node("npc", 1, "Hilda", None, None))
+    for org_id in org_ids:
+        graph.add_node(Node("organization", org_id, f"Org {org_id}", "guild", None))
+    graph.add_edge(("npc", 1), ("organization", org_ids[0]), "member")
+    for source, target, relation in relations:
+        graph.add_edge(("organization", source), ("organization", target), relation)
+    return graph
+
+
+# 1 and 2 allied (declared by 1 only), 2 and 3 allied both ways,
+# 1 and 4 enemies both ways, 3 -> 4 and 2 -> 5 enemies one-sided
+RELATIONS = [
+    (1, 2, "ally"), (2, 3, "ally"), (3, 2, "ally"),
+    (1, 4, "enemy"), (4, 1, "enemy"), (3, 4, "enemy"), (2, 5, "enemy"),
+]
+
+
+def test_relations_are_symmetrized():
+    network = faction_network(_graph([1, 2, 3, 4, 5], RELATIONS))
+
+    assert network["version"] == 3
+    assert {org["id"]: (org["allies"], org["enemies"], org["bloc"]) for org in network["organizations"]} == {
+        1: ([2], [4], 0),
+        2: ([1, 3], [5], 0),
+        3: ([2], [4], 0),
+        4: ([], [1, 3], None),
+        5: ([], [2], None),
+    }
+
+
+def test_asymmetries_are_one_sided_declarations():
+    network = faction_network(_graph([1, 2, 3, 4, 5], RELATIONS))
+
+    assert network["asymmetries"] == [
+        {"relation": "ally", "from": 1, "to": 2},
+        {"relation": "enemy", "from": 2, "to": 5},
+        {"relation": "enemy", "from": 3, "to": 4},
+    ]
+
+
+def test_suggestions():
+    network = faction_network(_graph([1, 2, 3, 4, 5], RELATIONS))
+
+    # 1 and 3 are both enemies of 4
+    assert network["potential_allies"] == [{"organizations": [1, 3], "shared_enemies": 1}]
+    # 2 is allied to both of 4's enemies; 1 and 3 are allied to 5's enemy
+    assert network["potential_enemies"] == [
+        {"organizations": [2, 4], "via_allies": 2},
+        {"organizations": [1, 5], "via_allies": 1},
+        {"organizations": [3, 5], "via_allies": 1},
+    ]
+    assert faction_network(_graph([1, 2, 3, 4, 5], RELATIONS), limit=1)["potential_enemies"] == [
+        {"organizations": [2, 4], "via_allies": 2}
+    ]
+
+
+def test_blocs_and_conflicts():
+    network = faction_network(_graph([1, 2, 3, 4], [(1, 2, "ally"), (2, 1, "enemy"), (3, 4, "ally")]))
+
+    assert network["conflicts"] == [[1, 2]]
+    assert network["blocs"] == [
+        {"members": [1, 2], "internal_enemies": [[1, 2]]},
+        {"members": [3, 4], "internal_enemies": []},
+    ]
+
+
+def test_result_is_cached_on_the_graph():
+    graph = _graph([1, 2], [(1, 2, "ally")])
+
+    faction_network(graph)
+    graph.memo["factions"]["conflicts"] = "cached"
+
+    assert faction_network(graph)["conflicts"] == "cached"
+
+
+def test_campaign_without_organizations():
+    graph = CampaignGraph(campaign_id=1, version=0)
+    graph.add_node(Node("npc", 1, "Hilda", None, None))
+
+    network = faction_network(graph)
+
+    assert network["organizations"] == network["blocs"] == network["conflicts"] == []
+    assert network["potential_allies"] == network["potential_enemies"] == []
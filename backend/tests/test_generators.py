@@ -0,0 +1,65 @@
+import pytest
+
+from app.ai.generators import location_generator, npc_generator
+from app.ai.generators import LocationGenerator, NPCGenerator
+
+CONTEXT = {"world_name": "Testworld", "campaign_name": "Test Campaign", "description": None}
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Stand-in for the AI manager answering with `provider.response`, and the fallbacks recorded"""
+    class Provider:
+        response = None
+        fallbacks = []
+
+        async def generate_text(self, prompt, **kwargs):
+            if isinstance(self.response, Exception):
+                raise self.response
+            return self.response
+
+    provider = Provider()
+    provider.fallbacks = []
+    for module in (location_generator, npc_generator):
+        monkeypatch.setattr(module, "ai_manager", provider)
+        monkeypatch.setattr(module.ai_metrics, "record_fallback", lambda kind, reason: provider.fallbacks.append((kind, reason)))
+    return provider
+
+
+@pytest.mark.asyncio
+async def test_location_is_parsed_and_normalized(provider):
+    provider.response = 'Here you go: {"name": "Millbrook", "population": "about 1,200", "government_type": "Elected council", "notable_features": "mill, bridge"'
+
+    location = await LocationGenerator.generate_location("settlement", CONTEXT)
+
+    assert (location["name"], location["population"], location["type"]) == ("Millbrook", 1200, "settlement")
+    assert location["notable_features"] == ["mill", "bridge"]
+    assert provider.fallbacks == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("response, reason", [
+    ("I'm sorry, I can't help with that.", "parse_failure"),
+    # Parsed fine, but a value of the wrong type breaks the normalization
+    ('{"name": "Millbrook", "government_type": 5}', "provider_error"),
+    (ValueError("bad request"), "provider_error"),
+])
+async def test_location_failures_are_classified(provider, response, reason):
+    provider.response = response
+
+    location = await LocationGenerator.generate_location("settlement", CONTEXT)
+
+    assert location == LocationGenerator._create_fallback_location("settlement")
+    assert provider.fallbacks == [("location", reason)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("response, reason", [
+    ("No JSON here", "parse_failure"),
+    (ValueError("bad request"), "provider_error"),
+])
+async def test_npc_failures_are_classified(provider, response, reason):
+    provider.response = response
+
+    assert await NPCGenerator.generate_npc(CONTEXT) == NPCGenerator._create_fallback_npc()
+    assert provider.fallbacks == [("npc", reason)]
@@ -0,0 +1,113 @@
+
+from app.campaigns.graph import CampaignGraph, Node
+from app.campaigns.graph_analytics import adjacency, centrality, component_labels, components, shortest_path
+
+
+def _graph(names, links):
+    """NPCs named by `names` and linked by (first, second, type) triples"""
+    graph = CampaignGraph(campaign_id=1, version=0)
+    for npc_id, name in enumerate(names, start=1):
+        graph.add_node(Node("npc", npc_id, name, None, None))
+    for first, second, link_type in links:
+        graph.add_edge(("npc", names.index(first) + 1), ("npc", names.index(second) + 1), link_type)
+    return graph
+
+
+def _scores(result):
+    return {entry["name"]: entry["score"] for entry in result["results"]}
+
+
+def test_adjacency_is_undirected_and_simple():
+    # A friendship recorded on both NPCs is one link
+    graph = _graph(["a", "b", "c"], [("a", "b", "friend"), ("b", "a", "friend"), ("b", "c", "rival")])
+
+    adj = adjacency(graph)
+
+    assert adj.indptr.tolist() == [0, 1, 3, 4]
+    assert adj.indices.tolist() == [1, 0, 2, 1]
+
+
+def test_betweenness_on_a_path():
+    graph = _graph(["a", "b", "c", "d", "e"], [("a", "b", "friend"), ("b", "c", "friend"), ("c", "d", "friend"), ("d", "e", "friend")])
+
+    result = centrality(graph, "betweenness")
+
+    # b lies on 3 of the 6 pairs not involving it, c on 4
+    assert result["exact"] is True
+    assert _scores(result) == {"c": round(4 / 6, 6), "b": 0.5, "d": 0.5, "a": 0.0, "e": 0.0}
+
+
+def test_betweenness_splits_between_equal_paths():
+    graph = _graph(["a", "b", "c", "d"], [("a", "b", "friend"), ("b", "c", "friend"), ("c", "d", "friend"), ("d", "a", "friend")])
+
+    # Each node is on one of the two shortest paths between its neighbours
+    assert set(_scores(centrality(graph, "betweenness")).values()) == {round(0.5 / 3, 6)}
+
+
+def test_betweenness_of_a_star_centre():
+    graph = _graph(["hub", "a", "b", "c", "d"], [("hub", leaf, "friend") for leaf in "abcd"])
+
+    result = centrality(graph, "betweenness", limit=1)
+
+    assert result["results"][0]["name"] == "hub"
+    assert result["results"][0]["score"] == 1.0
+    assert result["results"][0]["degree"] == 4
+
+
+def test_sampled_betweenness_is_flagged(monkeypatch):
+    from app.campaigns import graph_analytics
+    monkeypatch.setattr(graph_analytics, "BETWEENNESS_SAMPLES", 3)
+    graph = _graph(["a", "b", "c", "d", "e"], [("a", "b", "friend"), ("b", "c", "friend"), ("c", "d", "friend"), ("d", "e", "friend")])
+
+    assert centrality(graph, "betweenness")["exact"] is False
+
+
+def test_degree_centrality():
+    graph = _graph(["hub", "a", "b", "c"], [("hub", "a", "friend"), ("hub", "b", "friend"), ("a", "b", "rival")])
+
+    assert _scores(centrality(graph)) == {"hub": round(2 / 3, 6), "a": round(2 / 3, 6), "b": round(2 / 3, 6), "c": 0.0}
+
+
+def test_components_by_label_propagation():
+    # A long chain needs several propagation rounds to settle
+    chain = [("n%d" % index, "n%d" % (index + 1), "friend") for index in range(6)]
+    names = ["n%d" % index for index in range(7)] + ["x", "y", "z"]
+    graph = _graph(names, chain + [("x", "y", "rival")])
+
+    labels = component_labels(graph).tolist()
+    result = components(graph)
+
+    assert len(set(labels[:7])) == 1
+    assert labels[7] == labels[8] != labels[0]
+    assert result["total_components"] == 3
+    assert result["isolated"] == 1
+    assert [component["size"] for component in result["components"]] == [7, 2]
+
+
+def test_components_over_some_link_types():
+    graph = _graph(["a", "b", "c"], [("a", "b", "friend"), ("b", "c", "rival")])
+
+    assert components(graph, frozenset({"friend"}))["total_components"] == 2
+    assert components(graph)["total_components"] == 1
+
+
+def test_shortest_path():
+    graph = _graph(["a", "b", "c", "d"], [("a", "b", "friend"), ("b", "c", "rival"), ("c", "d", "friend"), ("a", "d", "enemy")])
+
+    assert shortest_path(graph, ("npc", 1), ("npc", 3))["degrees"] == 2
+    path = shortest_path(graph, ("npc", 1), ("npc", 3), frozenset({"friend", "rival"}))
+    assert [node["name"] for node in path["nodes"]] == ["a", "b", "c"]
+    assert path["links"] == ["friend", "rival"]
+    assert shortest_path(graph, ("npc", 1), ("npc", 4), frozenset({"rival"})) is None
+
+
+def test_graph_endpoints_check_campaign_ownership(client, auth_headers, campaign_id):
+    paths = ["graph", "graph/components", "graph/centrality", "graph/path?source=npc:1&target=npc:2", "resolve?refs=npc:1"]
+    client.post("/auth/register", json={"email": "graph-owner@example.com", "username": "other", "password": "secret"})
+    token = client.post("/auth/login", data={"username": "graph-owner@example.com", "password": "secret"}).json()["access_token"]
+    other = {"Authorization": f"Bearer {token}"}
+
+    for path in paths:
+        assert client.get(f"/campaigns/{campaign_id}/{path}", headers=other).status_code == 404, path
+        assert client.get(f"/campaigns/{campaign_id}/{path}").status_code == 401, path
+    assert client.get(f"/campaigns/{campaign_id}/graph/components", headers=auth_headers).status_code == 200
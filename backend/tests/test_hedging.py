@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.ai.hedging import HedgePolicy, run_hedged
+
+
+def _provider(result=None, error=None, delay=0.0):
+    async def start():
+        await asyncio.sleep(delay)
+        if error:
+            raise Exception(error)
+        return result
+    return start
+
+
+def _policy(max_cost):
+    return HedgePolicy(max_cost=max_cost, min_delay=0.01, max_delay=0.05)
+
+
+@pytest.mark.asyncio
+async def test_backup_starts_after_head_start():
+    candidates = [
+        ("slow", _provider("slow answer", delay=1.0), []),
+        ("fast", _provider("fast answer"), [])
+    ]
+    assert await run_hedged(candidates, _policy(1.0), None, [0.0, 0.0]) == "fast answer"
+
+
+@pytest.mark.asyncio
+async def test_cost_ceiling_blocks_parallel_hedge():
+    started = []
+
+    def tracked(name, **kwargs):
+        inner = _provider(**kwargs)
+
+        async def start():
+            started.append(name)
+            return await inner()
+        return start
+
+    candidates = [
+        ("local", tracked("local", result="local answer", delay=0.2), []),
+        ("paid", tracked("paid", result="paid answer"), [])
+    ]
+    assert await run_hedged(candidates, _policy(0.01), None, [0.0, 0.05]) == "local answer"
+    assert started == ["local"]
+
+
+@pytest.mark.asyncio
+async def test_candidate_skipped_for_cost_is_still_a_fallback():
+    candidates = [
+        ("local", _provider(error="connection refused", delay=0.1), []),
+        ("paid", _provider("paid answer"), [])
+    ]
+    # The paid provider is too expensive to race, but is used once local fails
+    assert await run_hedged(candidates, _policy(0.01), None, [0.0, 0.05]) == "paid answer"
+
+
+@pytest.mark.asyncio
+async def test_invalid_responses_fall_through_to_the_next_provider():
+    candidates = [
+        ("first", _provider("not json"), []),
+        ("second", _provider("{}"), [])
+    ]
+    assert await run_hedged(candidates, _policy(1.0), lambda text: text.startswith("{"), [0.0, 0.0]) == "{}"
+
+
+@pytest.mark.asyncio
+async def test_all_failures_are_reported():
+    candidates = [
+        ("first", _provider(error="down"), []),
+        ("second", _provider(error="also down"), [])
+    ]
+    with pytest.raises(Exception, match="first: down; second: also down"):
+        await run_hedged(candidates, _policy(1.0), None, [0.0, 0.0])
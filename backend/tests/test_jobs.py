@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+from app.ai.jobs import JobQueue
+from app.models import AIJob
+
+
+@pytest.fixture
+def submit(client, auth_headers, campaign_id):
+    """Queue an NPC job through the API (the app's workers aren't running) and return its id"""
+    def submit_job():
+        response = client.post(f"/ai/jobs/{campaign_id}", json={"kind": "npc"}, headers=auth_headers)
+        assert response.status_code == 202, response.text
+        assert response.json()["status"] == "queued"
+        return response.json()["id"]
+    return submit_job
+
+
+def _set_status(db, job_id, job_status):
+    db.query(AIJob).filter(AIJob.id == job_id).update({"status": job_status})
+    db.commit()
+
+
+def test_submit_poll_and_cancel(client, auth_headers, campaign_id, submit):
+    job_id = submit()
+
+    started = time.perf_counter()
+    response = client.get(f"/ai/jobs/{job_id}", params={"wait": 0.2}, headers=auth_headers)
+    assert response.json()["status"] == "queued"
+    assert time.perf_counter() - started >= 0.2
+
+    response = client.delete(f"/ai/jobs/{job_id}", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "cancelled"
+    assert client.delete(f"/ai/jobs/{job_id}", headers=auth_headers).status_code == 409
+
+    jobs = client.get("/ai/jobs", params={"campaign_id": campaign_id, "status": "cancelled"}, headers=auth_headers).json()
+    assert [job["id"] for job in jobs] == [job_id]
+
+
+def test_jobs_of_other_users_are_hidden(client, campaign_id, submit):
+    job_id = submit()
+    client.post("/auth/register", json={"email": "other-jobs@example.com", "username": "other", "password": "secret"})
+    token = client.post("/auth/login", data={"username": "other-jobs@example.com", "password": "secret"}).json()["access_token"]
+    other = {"Authorization": f"Bearer {token}"}
+
+    assert client.get(f"/ai/jobs/{job_id}", headers=other).status_code == 404
+    assert client.delete(f"/ai/jobs/{job_id}", headers=other).status_code == 404
+
+
+def test_invalid_jobs_are_rejected(client, auth_headers, campaign_id):
+    base = f"/ai/jobs/{campaign_id}"
+    assert client.post(base, json={"kind": "dragon"}, headers=auth_headers).status_code == 400
+    assert client.post(base, json={"kind": "location"}, headers=auth_headers).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_wait_returns_for_a_job_finished_before_it_started(db, submit):
+    # The job finishes between the endpoint's status check and wait()
+    queue = JobQueue(workers=0)
+    job_id = submit()
+    _set_status(db, job_id, "completed")
+
+    await asyncio.wait_for(queue.wait(job_id, 5), 1)
+
+    assert queue._waiters == {}
+
+
+@pytest.mark.asyncio
+async def test_wait_times_out_without_leaking(submit):
+    queue = JobQueue(workers=0)
+    job_id = submit()
+
+    await queue.wait(job_id, 0.05)
+
+    assert queue._waiters == {}
+
+
+@pytest.mark.asyncio
+async def test_cancel_wakes_every_waiter(submit):
+    queue = JobQueue(workers=0)
+    job_id = submit()
+    waiters = [asyncio.create_task(queue.wait(job_id, 5)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+
+    assert queue.cancel(job_id) is True
+    await asyncio.wait_for(asyncio.gather(*waiters), 1)
+    assert queue._waiters == {}
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_queued_job(db, monkeypatch, submit):
+    queue = JobQueue(workers=1)
+    # Only the job submitted here, not ones left queued by other tests
+    monkeypatch.setattr(queue, "_recover", lambda: None)
+
+    async def execute(kind, params, campaign_context):
+        return {"name": "Mira", "world": campaign_context["world_name"]}
+
+    monkeypatch.setattr(queue, "_execute", execute)
+    job_id = submit()
+    queue.start()
+    try:
+        queue._queue.put_nowait(job_id)
+        await asyncio.wait_for(queue.wait(job_id, 5), 2)
+    finally:
+        await queue.stop()
+
+    job = db.query(AIJob).filter(AIJob.id == job_id).one()
+    assert (job.status, job.result) == ("completed", {"name": "Mira", "world": "Testworld"})
+    assert job.started_at is not None and job.completed_at is not None
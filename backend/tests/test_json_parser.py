@@ -0,0 +1,103 @@
+import pytest
+
+from app.ai.json_parser import extract_int, extract_json, is_json_object, parse_json_object
+
+
+def test_clean_json_takes_the_fast_path():
+    assert extract_json('{"name": "Mira", "age": 31}') == ({"name": "Mira", "age": 31}, True)
+
+
+@pytest.mark.parametrize("text", [
+    'Here is your NPC:\n{"name": "Mira", "age": 31}\nEnjoy!',
+    'Sure!\n```json\n{"name": "Mira", "age": 31}\n```\nLet me know if you need more.',
+    '```\n{"name": "Mira", "age": 31}',
+])
+def test_prose_and_fences_are_skipped(text):
+    assert parse_json_object(text) == {"name": "Mira", "age": 31}
+
+
+def test_fenced_object_is_preferred_over_braces_in_prose():
+    text = 'Fill in {placeholders} as needed.\n```json\n{"name": "Mira"}\n```'
+
+    assert parse_json_object(text) == {"name": "Mira"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"name": "Mira", "background": "Raised by the river folk and', {"name": "Mira", "background": "Raised by the river folk and"}),
+    ('{"name": "Mira", "traits": ["brave", "curious"', {"name": "Mira", "traits": ["brave", "curious"]}),
+    ('{"name": "Mira", "stats": {"str": 12, "dex": 15', {"name": "Mira", "stats": {"str": 12, "dex": 15}}),
+    ('{"name": "Mira", "age":', {"name": "Mira"}),
+])
+def test_truncated_output_is_closed(text, expected):
+    value, clean = extract_json(text)
+
+    assert value == expected
+    assert clean is False
+
+
+def test_trailing_commas():
+    assert parse_json_object('{"traits": ["brave", "curious",], "age": 31,}') == {"traits": ["brave", "curious"], "age": 31}
+
+
+def test_single_quotes_and_unquoted_keys():
+    assert parse_json_object("{'name': 'Mira', race: 'elf'}") == {"name": "Mira", "race": "elf"}
+
+
+def test_raw_newlines_and_inner_quotes_in_strings():
+    text = '{"background": "First line\nSecond line", "quote": "She said "never again" and left", "age": 31}'
+
+    assert parse_json_object(text) == {
+        "background": "First line\nSecond line",
+        "quote": 'She said "never again" and left',
+        "age": 31
+    }
+
+
+def test_escapes():
+    assert parse_json_object('{"name": "Mira \\u00e9\\tthe \\"Bold\\"", "age": 31,}') == {"name": 'Mira é\tthe "Bold"', "age": 31}
+
+
+def test_bad_value_is_dropped_and_parsing_resumes():
+    text = '{"name": "Mira", "age": , "race": "elf", "level": 3 levels, "class": "ranger"}'
+
+    assert parse_json_object(text) == {"name": "Mira", "race": "elf", "level": "3 levels", "class": "ranger"}
+
+
+def test_missing_commas_between_fields():
+    assert parse_json_object('{"name": "Mira"\n"race": "elf"}') == {"name": "Mira", "race": "elf"}
+
+
+def test_python_literals_and_numbers():
+    text = "{'alive': True, 'dead': False, 'title': None, 'age': 31, 'gold': 2.5, 'xp': 1e3, 'debt': -4,}"
+
+    assert parse_json_object(text) == {"alive": True, "dead": False, "title": None, "age": 31, "gold": 2.5, "xp": 1000.0, "debt": -4}
+
+
+def test_array_closed_with_a_brace():
+    assert parse_json_object('{"traits": ["brave", "curious"}, "age": 31}') == {"traits": ["brave", "curious"], "age": 31}
+
+
+@pytest.mark.parametrize("text", ["", "No JSON here, sorry.", "[1, 2, 3]", "{ , }"])
+def test_nothing_recoverable(text):
+    with pytest.raises(ValueError):
+        parse_json_object(text)
+
+
+def test_is_json_object():
+    assert is_json_object('Result: {"name": "Mira"')
+    assert not is_json_object("The tavern is quiet tonight.")
+
+
+@pytest.mark.parametrize("value, expected", [
+    (42, 42),
+    (42.9, 42),
+    ("42", 42),
+    ("about 1,200 people", 1200),
+    ("35 years", 35),
+    ("-3", -3),
+    (True, None),
+    ("unknown", None),
+    (None, None),
+])
+def test_extract_int(value, expected):
+    assert extract_int(value) == expected
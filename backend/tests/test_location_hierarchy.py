@@ -0,0 +1,85 @@
+import pytest
+
+from app.locations import hierarchy
+from app.models import Location, LocationClosure
+
+
+@pytest.fixture
+def kingdom(db, campaign_id):
+    """kingdom > city > tavern, and kingdom > forest, created in one flush"""
+    kingdom = Location(campaign_id=campaign_id, name="Kingdom")
+    city = Location(campaign_id=campaign_id, name="City", parent_location=kingdom)
+    tavern = Location(campaign_id=campaign_id, name="Tavern", parent_location=city)
+    forest = Location(campaign_id=campaign_id, name="Forest", parent_location=kingdom)
+    db.add_all([tavern, forest, city, kingdom])
+    db.commit()
+    return {location.name: location for location in (kingdom, city, tavern, forest)}
+
+
+def _closure(db, campaign_id):
+    """Closure rows of a campaign as (ancestor name, descendant name, depth)"""
+    names = dict(db.query(Location.id, Location.name).filter(Location.campaign_id == campaign_id).all())
+    rows = db.query(LocationClosure).filter(LocationClosure.descendant_id.in_(names)).all()
+    return {(names[row.ancestor_id], names[row.descendant_id], row.depth) for row in rows}
+
+
+def _assert_matches_rebuild(db, campaign_id):
+    maintained = _closure(db, campaign_id)
+    hierarchy.rebuild(db, campaign_id)
+    assert maintained == _closure(db, campaign_id)
+    db.rollback()
+
+
+def test_paths_are_recorded_on_create(db, campaign_id, kingdom):
+    assert _closure(db, campaign_id) == {
+        ("Kingdom", "Kingdom", 0), ("City", "City", 0), ("Tavern", "Tavern", 0), ("Forest", "Forest", 0),
+        ("Kingdom", "City", 1), ("Kingdom", "Forest", 1), ("City", "Tavern", 1),
+        ("Kingdom", "Tavern", 2)
+    }
+    assert [location.name for location in hierarchy.ancestors(db, kingdom["Tavern"].id)] == ["Kingdom", "City"]
+    assert [location.name for location in hierarchy.descendants(db, kingdom["Kingdom"].id)] == ["City", "Forest", "Tavern"]
+    assert [location.name for location in hierarchy.descendants(db, kingdom["Kingdom"].id, max_depth=1)] == ["City", "Forest"]
+
+
+def test_moving_a_location_moves_its_subtree(db, campaign_id, kingdom):
+    kingdom["City"].parent_location_id = kingdom["Forest"].id
+    db.commit()
+
+    assert [location.name for location in hierarchy.ancestors(db, kingdom["Tavern"].id)] == ["Kingdom", "Forest", "City"]
+    assert hierarchy.is_within(db, kingdom["Tavern"].id, kingdom["Forest"].id)
+    _assert_matches_rebuild(db, campaign_id)
+
+
+def test_moving_to_the_top_level_detaches_the_subtree(db, campaign_id, kingdom):
+    kingdom["City"].parent_location_id = None
+    db.commit()
+
+    assert hierarchy.ancestors(db, kingdom["Tavern"].id)[0].name == "City"
+    assert not hierarchy.is_within(db, kingdom["Tavern"].id, kingdom["Kingdom"].id)
+    _assert_matches_rebuild(db, campaign_id)
+
+
+def test_deleting_a_leaf_drops_its_paths(db, campaign_id, kingdom):
+    db.delete(kingdom["Tavern"])
+    db.commit()
+
+    assert not any("Tavern" in row[:2] for row in _closure(db, campaign_id))
+    _assert_matches_rebuild(db, campaign_id)
+
+
+def test_bulk_remove_drops_paths_through_the_removed_location(db, campaign_id, kingdom):
+    hierarchy.remove(db.connection(), [kingdom["City"].id])
+
+    # The tavern is left as its own root, for the caller to make top-level
+    assert _closure(db, campaign_id) == {
+        ("Kingdom", "Kingdom", 0), ("Tavern", "Tavern", 0), ("Forest", "Forest", 0), ("Kingdom", "Forest", 1)
+    }
+    db.rollback()
+
+
+def test_subtree_filter(db, campaign_id, kingdom):
+    inside = db.query(Location.name).filter(
+        Location.id.in_(hierarchy.subtree_ids(kingdom["City"].id, include_self=False))
+    ).all()
+
+    assert [name for (name,) in inside] == ["Tavern"]
@@ -0,0 +1,68 @@
+import pytest
+
+
+@pytest.fixture
+def locations(client, auth_headers, campaign_id):
+    """Kingdom > City > Tavern > Cellar, and Kingdom > Forest, with an NPC in the tavern"""
+    base = f"/campaigns/{campaign_id}/locations/"
+    created = {}
+    for name, parent in (("Kingdom", None), ("City", "Kingdom"), ("Forest", "Kingdom"), ("Tavern", "City"), ("Cellar", "Tavern")):
+        payload = {"name": name, "parent_location_id": created[parent] if parent else None}
+        response = client.post(base, json=payload, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        created[name] = response.json()["id"]
+    client.post(f"/campaigns/{campaign_id}/npcs/", json={"name": "Barkeep", "location_id": created["Tavern"]}, headers=auth_headers)
+    return created
+
+
+def _tree(client, headers, campaign_id, **params):
+    response = client.get(f"/campaigns/{campaign_id}/locations/tree", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _shape(nodes):
+    return [(node["name"], _shape(node["children"])) for node in nodes]
+
+
+def test_full_tree_is_nested_and_sorted(client, auth_headers, campaign_id, locations):
+    tree = _tree(client, auth_headers, campaign_id)
+
+    assert tree["total"] == 5
+    assert _shape(tree["nodes"]) == [
+        ("Kingdom", [("City", [("Tavern", [("Cellar", [])])]), ("Forest", [])])
+    ]
+    tavern = tree["nodes"][0]["children"][0]["children"][0]
+    assert (tavern["child_count"], tavern["npc_count"]) == (1, 1)
+
+
+def test_depth_limits_levels_but_keeps_child_counts(client, auth_headers, campaign_id, locations):
+    tree = _tree(client, auth_headers, campaign_id, depth=2)
+
+    assert _shape(tree["nodes"]) == [("Kingdom", [("City", []), ("Forest", [])])]
+    assert tree["nodes"][0]["children"][0]["child_count"] == 1
+
+
+def test_subtree_below_a_root(client, auth_headers, campaign_id, locations):
+    tree = _tree(client, auth_headers, campaign_id, root_id=locations["City"], depth=1)
+
+    assert _shape(tree["nodes"]) == [("Tavern", [])]
+
+
+def test_tree_query_count_does_not_grow_with_locations(client, auth_headers, campaign_id, locations, count_queries):
+    with count_queries() as before:
+        _tree(client, auth_headers, campaign_id)
+    for index in range(10):
+        client.post(f"/campaigns/{campaign_id}/locations/", json={"name": f"Room {index}", "parent_location_id": locations["Cellar"]},
+                    headers=auth_headers)
+    with count_queries() as after:
+        _tree(client, auth_headers, campaign_id)
+
+    assert len(before) == len(after)
+
+
+def test_cannot_move_a_location_inside_itself(client, auth_headers, campaign_id, locations):
+    response = client.put(f"/campaigns/{campaign_id}/locations/{locations['City']}",
+                          json={"parent_location_id": locations["Cellar"]}, headers=auth_headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.campaigns import multiget
+from app.models import NPC, Location
+
+
+def test_parse_ids_keeps_order_and_drops_duplicates():
+    assert multiget.parse_ids(" 3,1,,3, 2 ") == [3, 1, 2]
+
+
+@pytest.mark.parametrize("value", ["1,two,3", "1,-2", ",".join(str(n) for n in range(multiget.MAX_IDS + 1))])
+def test_parse_ids_rejects(value):
+    with pytest.raises(ValueError):
+        multiget.parse_ids(value)
+
+
+def test_parse_refs():
+    assert multiget.parse_refs("npc:3, location:1,npc:3,plot_hook:2") == [("npc", 3), ("location", 1), ("plot_hook", 2)]
+    for value in ("dragon:1", "npc:x", "npc"):
+        with pytest.raises(ValueError):
+            multiget.parse_refs(value)
+
+
+def test_in_order():
+    rows = [SimpleNamespace(id=row_id) for row_id in (1, 2, 3)]
+
+    assert [row.id for row in multiget.in_order(rows, [3, 9, 1])] == [3, 1]
+
+
+def test_resolve_one_query_per_type(db, campaign_id, count_queries):
+    npcs = [NPC(campaign_id=campaign_id, name=name) for name in ("Alda", "Bram")]
+    city = Location(campaign_id=campaign_id, name="City")
+    db.add_all([*npcs, city])
+    db.commit()
+    refs = [("npc", npcs[1].id), ("location", city.id), ("npc", 999999), ("npc", npcs[0].id)]
+
+    with count_queries() as statements:
+        results = multiget.resolve(db, campaign_id, refs)
+
+    assert len(statements) == 2
+    assert [(result["type"], result["id"], result["found"]) for result in results] == [
+        ("npc", npcs[1].id, True), ("location", city.id, True), ("npc", 999999, False), ("npc", npcs[0].id, True)
+    ]
+    assert results[0]["npc"].name == "Bram"
+    assert "npc" not in results[2]
+
+
+def test_list_and_resolve_endpoints(client, auth_headers, campaign_id):
+    base = f"/campaigns/{campaign_id}"
+    ids = [client.post(f"{base}/npcs/", json={"name": name}, headers=auth_headers).json()["id"] for name in ("Alda", "Bram", "Cora")]
+    # Another campaign's NPC is never returned
+    other = client.post("/campaigns/", json={"name": "Other"}, headers=auth_headers).json()["id"]
+    foreign = client.post(f"/campaigns/{other}/npcs/", json={"name": "Stranger"}, headers=auth_headers).json()["id"]
+
+    response = client.get(f"{base}/npcs/", params={"ids": f"{ids[2]},{ids[0]},{foreign}"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert [npc["name"] for npc in response.json()["items"]] == ["Cora", "Alda"]
+    assert client.get(f"{base}/npcs/", params={"ids": "1,x"}, headers=auth_headers).status_code == 400
+
+    response = client.get(f"{base}/resolve", params={"refs": f"npc:{ids[1]},npc:{foreign}"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [(result["found"], (result["npc"] or {}).get("name")) for result in results] == [(True, "Bram"), (False, None)]
+    assert client.get(f"{base}/resolve", params={"refs": "dragon:1"}, headers=auth_headers).status_code == 400
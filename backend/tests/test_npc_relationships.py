@@ -0,0 +1,105 @@
+def _create_npc(client, headers, campaign_id, **fields):
+    response = client.post(f"/campaigns/{campaign_id}/npcs/", json={"name": "NPC", **fields}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _npc_with_relationships(client, headers, campaign_id, count):
+    """An NPC related to `count` NPCs, locations and organizations in turn"""
+    relationships = []
+    for index in range(count):
+        kind = ("npc", "location", "organization")[index % 3]
+        if kind == "npc":
+            target = _create_npc(client, headers, campaign_id, name=f"Friend {index}")
+        elif kind == "location":
+            target = client.post(f"/campaigns/{campaign_id}/locations/", json={"name": f"Place {index}"}, headers=headers).json()
+        else:
+            target = client.post(f"/campaigns/{campaign_id}/organizations/", json={"name": f"Guild {index}"}, headers=headers).json()
+        relationships.append({"target_id": target["id"], "target_type": kind, "relationship_type": "ally", "strength": 5})
+    return _create_npc(client, headers, campaign_id, name=f"Hub {count}", relationships=relationships)
+
+
+def _relationship_queries(client, headers, campaign_id, npc_id, count_queries):
+    with count_queries() as statements:
+        response = client.get(f"/campaigns/{campaign_id}/npcs/{npc_id}/relationships", headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()["relationships"]
+
+
+def test_relationship_enrichment_query_count_is_constant(client, auth_headers, campaign_id, count_queries):
+    few = _npc_with_relationships(client, auth_headers, campaign_id, 3)
+    many = _npc_with_relationships(client, auth_headers, campaign_id, 20)
+
+    few_queries, few_relationships = _relationship_queries(client, auth_headers, campaign_id, few["id"], count_queries)
+    many_queries, many_relationships = _relationship_queries(client, auth_headers, campaign_id, many["id"], count_queries)
+
+    assert len(few_relationships) == 3
+    assert len(many_relationships) == 20
+    assert few_queries == many_queries
+
+
+def test_relationships_are_enriched_with_target_details(client, auth_headers, campaign_id, count_queries):
+    npc = _npc_with_relationships(client, auth_headers, campaign_id, 3)
+
+    _, relationships = _relationship_queries(client, auth_headers, campaign_id, npc["id"], count_queries)
+
+    assert [rel["target_type"] for rel in relationships] == ["npc", "location", "organization"]
+    assert relationships[0]["target_name"] == "Friend 0"
+
+
+def _put_relationships(client, headers, campaign_id, npc_id, relationships):
+    response = client.put(f"/campaigns/{campaign_id}/npcs/{npc_id}/relationships", json=relationships, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def _relationships(client, headers, campaign_id, npc_id):
+    return client.get(f"/campaigns/{campaign_id}/npcs/{npc_id}", headers=headers).json()["relationships"] or []
+
+
+def test_reciprocal_relationships_are_synced_in_one_batch(client, auth_headers, campaign_id, count_queries):
+    hub = _create_npc(client, auth_headers, campaign_id, name="Hub")
+    friends = [_create_npc(client, auth_headers, campaign_id, name=f"Friend {n}") for n in range(6)]
+
+    def relate(targets):
+        relationships = [{"target_id": friend["id"], "target_type": "npc", "relationship_type": "mentor", "strength": 7} for friend in targets]
+        with count_queries() as statements:
+            _put_relationships(client, auth_headers, campaign_id, hub["id"], relationships)
+        return [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+
+    few = relate(friends[:2])
+    relate([])
+    many = relate(friends)
+
+    assert len(few) == len(many)
+    for friend in friends:
+        assert [(rel["target_id"], rel["relationship_type"], rel["strength"]) for rel in _relationships(client, auth_headers, campaign_id, friend["id"])] == [
+            (hub["id"], "student", 7)
+        ]
+
+    relate(friends[3:])
+    assert [bool(_relationships(client, auth_headers, campaign_id, friend["id"])) for friend in friends] == [False] * 3 + [True] * 3
+
+
+def test_reciprocal_ignores_other_target_types_with_the_same_id(client, auth_headers, campaign_id):
+    hub = _create_npc(client, auth_headers, campaign_id, name="Hub")
+    friend = _create_npc(client, auth_headers, campaign_id, name="Friend")
+    # Links to locations aren't checked, so they can share ids with NPCs
+    _put_relationships(client, auth_headers, campaign_id, friend["id"], [
+        {"target_id": hub["id"], "target_type": "location", "relationship_type": "employer"}
+    ])
+
+    _put_relationships(client, auth_headers, campaign_id, hub["id"], [
+        {"target_id": friend["id"], "target_type": "location", "relationship_type": "employer", "strength": 1},
+        {"target_id": friend["id"], "target_type": "npc", "relationship_type": "mentor", "strength": 9},
+    ])
+
+    assert [(rel["target_type"], rel["target_id"], rel["relationship_type"], rel.get("strength")) for rel in _relationships(client, auth_headers, campaign_id, friend["id"])] == [
+        ("location", hub["id"], "employer", None),
+        ("npc", hub["id"], "student", 9),
+    ]
+
+    # Dropping the NPC link removes only the reciprocal NPC entry
+    _put_relationships(client, auth_headers, campaign_id, hub["id"], [])
+    assert [(rel["target_type"], rel["target_id"]) for rel in _relationships(client, auth_headers, campaign_id, friend["id"])] == [
+        ("location", hub["id"])
+    ]
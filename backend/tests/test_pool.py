@@ -0,0 +1,118 @@
+import asyncio
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai import pool as pool_module
+from app.ai.pool import WarmPool, warm_pool
+from app.ai.generators import NPCGenerator
+
+CONTEXT = {"world_name": "Testworld", "campaign_name": "Test Campaign", "description": None}
+
+
+def _filled(pool, campaign_id, slot, items):
+    pool._pools[(campaign_id, slot)] = deque(items)
+
+
+def test_configure_clamps_and_trims():
+    pool = WarmPool(default_size=0, location_types=["dungeon"])
+    _filled(pool, 1, "npc", [{"name": "a"}, {"name": "b"}, {"name": "c"}])
+
+    pool.configure(1, {"npc": 1, "location:dungeon": -2})
+
+    assert pool.status(1) == {
+        "enabled": False,
+        "slots": {"npc": {"ready": 1, "target": 1}, "location:dungeon": {"ready": 0, "target": 0}}
+    }
+    # The oldest item is kept
+    assert pool.take(1, "npc") == {"name": "a"}
+
+
+def test_take_serves_oldest_first():
+    pool = WarmPool(default_size=0)
+    _filled(pool, 1, "npc", [{"name": "a"}, {"name": "b"}])
+
+    assert [pool.take(1, "npc"), pool.take(1, "npc"), pool.take(1, "npc")] == [{"name": "a"}, {"name": "b"}, None]
+    assert pool.take(2, "npc") is None
+    assert pool.stats()["served"] == 2
+
+
+def test_discard_forgets_the_campaign():
+    pool = WarmPool(default_size=2)
+    pool.register(1, CONTEXT)
+    pool.register(2, CONTEXT)
+    _filled(pool, 1, "npc", [{"name": "a"}])
+    _filled(pool, 2, "npc", [{"name": "b"}])
+
+    pool.discard(1)
+
+    assert pool.stats()["campaigns"] == 1
+    assert pool.take(1, "npc") is None
+    assert pool.take(2, "npc") == {"name": "b"}
+
+
+async def _until(condition, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+@pytest.mark.asyncio
+async def test_worker_starts_when_a_target_is_set_and_refills(monkeypatch):
+    generated = iter(range(100))
+
+    async def generate_npc(context):
+        return {"name": f"NPC {next(generated)}", "world": context["world_name"]}
+
+    monkeypatch.setattr(NPCGenerator, "generate_npc", generate_npc)
+    monkeypatch.setattr(pool_module, "ai_manager", SimpleNamespace(has_services=lambda: True, in_flight=0))
+    pool = WarmPool(default_size=0, location_types=[])
+
+    # Pooling is off by default, so nothing runs until a campaign asks for it
+    pool.start()
+    pool.register(1, CONTEXT)
+    assert pool.status(1)["enabled"] is False
+
+    pool.configure(1, {"npc": 2})
+    try:
+        assert pool.status(1)["enabled"] is True
+        await _until(lambda: pool.status(1)["slots"]["npc"]["ready"] == 2)
+
+        assert pool.take(1, "npc") == {"name": "NPC 0", "world": "Testworld"}
+        await _until(lambda: pool.status(1)["slots"]["npc"]["ready"] == 2)
+        assert pool.stats()["generated"] == 3
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_fallback_results_are_not_pooled(monkeypatch):
+    async def generate_npc(context):
+        return NPCGenerator._create_fallback_npc()
+
+    monkeypatch.setattr(NPCGenerator, "generate_npc", generate_npc)
+    pool = WarmPool(default_size=0)
+    pool.register(1, CONTEXT)
+
+    assert await pool._fill_one(1, "npc") is False
+    assert pool.take(1, "npc") is None
+
+
+def test_pool_endpoints(client, auth_headers, campaign_id):
+    assert client.get("/ai/pool").status_code == 401
+
+    response = client.put(f"/ai/pool/{campaign_id}", json={"targets": {"npc": 3}}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["slots"]["npc"]["target"] == 3
+    assert client.put(f"/ai/pool/{campaign_id}", json={"targets": {"dragon": 1}}, headers=auth_headers).status_code == 400
+
+    _filled(warm_pool, campaign_id, "npc", [{"name": "a"}])
+    assert client.get("/ai/pool", headers=auth_headers).json()["ready"] >= 1
+
+    # Deleting the campaign drops its pool
+    assert client.delete(f"/campaigns/{campaign_id}", headers=auth_headers).status_code == 200
+    assert warm_pool.take(campaign_id, "npc") is None
+    assert campaign_id not in warm_pool._targets
@@ -0,0 +1,121 @@
+import json
+
+import httpx
+import pytest
+
+from app.ai.generators import LocationGenerator, NPCGenerator
+from app.ai.generators.location_generator import location_prompt_template
+from app.ai.prompts import RETURN_JSON_ONLY, PromptTemplate, prompt_registry
+from app.ai.service import AIManager, AIProvider, AnthropicService, LocalAIService, OpenAIService
+
+CONTEXT = {"world_name": "Testworld", "campaign_name": "Test Campaign", "existing_npcs": ["Alda", "Bram"]}
+
+
+def test_prefix_is_identical_across_requests():
+    plain = NPCGenerator._build_npc_prompt()
+    constrained = NPCGenerator._build_npc_prompt(CONTEXT, {"name": "Mira", "race": "", "occupation": "smith"})
+
+    assert plain.prefix == constrained.prefix
+    assert plain.suffix == RETURN_JSON_ONLY
+    # Only locked fields with a value become constraints
+    assert "- name: Mira" in constrained.suffix and "- occupation: smith" in constrained.suffix
+    assert "- race:" not in constrained.suffix
+    assert "- Known NPCs: Alda, Bram" in constrained.suffix
+    assert constrained.suffix.endswith(RETURN_JSON_ONLY)
+    assert constrained.text == f"{constrained.prefix}\n\n{constrained.suffix}"
+
+
+def test_location_templates_per_type():
+    dungeon = LocationGenerator._build_location_prompt("dungeon", CONTEXT)
+
+    assert dungeon.prefix == location_prompt_template("dungeon").prefix
+    assert dungeon.prefix != LocationGenerator._build_location_prompt("settlement").prefix
+    assert "- Campaign: Test Campaign" in dungeon.suffix
+    # Unknown types get a generic template that isn't kept in the registry
+    assert "floating island" in location_prompt_template("floating island").prefix
+    assert prompt_registry.get("location:floating island") is None
+
+
+def test_template_describe_and_empty_sections():
+    template = PromptTemplate("test", ["  Intro  ", "Schema"], lambda **kwargs: ["", kwargs["extra"]])
+
+    assert template.prefix == "Intro\n\nSchema"
+    assert template.render(extra="Per request").suffix == f"Per request\n\n{RETURN_JSON_ONLY}"
+    assert template.describe() == {"name": "test", "prefix_hash": template.prefix_hash, "prefix_chars": 13}
+    assert template.prefix_hash == PromptTemplate("other", ["Intro", "Schema"], lambda **kwargs: []).prefix_hash
+    assert {"npc", "location:dungeon"} <= {entry["name"] for entry in prompt_registry.describe()}
+
+
+def _client(handler, sent):
+    def record(request):
+        sent.append(json.loads(request.content))
+        return handler(request)
+    return httpx.AsyncClient(transport=httpx.MockTransport(record))
+
+
+@pytest.mark.asyncio
+async def test_ollama_gets_prefix_first_and_keeps_the_model_loaded():
+    sent = []
+    lines = [
+        {"response": "{\"name\": ", "done": False},
+        {"response": "\"Mira\"}", "done": False},
+        {"done": True, "prompt_eval_count": 900, "eval_count": 12, "prompt_eval_duration": 5e7, "load_duration": 0},
+    ]
+    service = LocalAIService()
+    service.client = _client(lambda request: httpx.Response(200, text="\n".join(json.dumps(line) for line in lines)), sent)
+
+    assert await service.generate_text("Suffix", prefix="Prefix") == '{"name": "Mira"}'
+
+    assert sent[0]["prompt"] == "Prefix\n\nSuffix"
+    assert sent[0]["stream"] is True and sent[0]["keep_alive"]
+    timing = service.timings[-1]
+    assert (timing["prompt_tokens"], timing["completion_tokens"], timing["prompt_eval_seconds"]) == (900, 12, 0.05)
+    assert timing["ttft"] is not None
+
+
+@pytest.mark.asyncio
+async def test_openai_gets_prefix_as_system_message():
+    sent = []
+    body = {
+        "choices": [{"message": {"content": "{}"}}],
+        "usage": {"prompt_tokens": 1000, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 768}}
+    }
+    service = OpenAIService("key")
+    service.client = _client(lambda request: httpx.Response(200, json=body), sent)
+
+    await service.generate_text("Suffix", prefix="Prefix")
+
+    assert sent[0]["messages"] == [{"role": "system", "content": "Prefix"}, {"role": "user", "content": "Suffix"}]
+    assert service.timings[-1]["cached_tokens"] == 768
+
+
+@pytest.mark.asyncio
+async def test_anthropic_marks_prefix_cacheable():
+    sent = []
+    body = {
+        "content": [{"text": "{}"}],
+        "usage": {"input_tokens": 50, "cache_read_input_tokens": 950, "cache_creation_input_tokens": 0, "output_tokens": 10}
+    }
+    service = AnthropicService("key")
+    service.client = _client(lambda request: httpx.Response(200, json=body), sent)
+
+    await service.generate_text("Suffix", prefix="Prefix")
+    await service.generate_text("No prefix")
+
+    assert sent[0]["system"] == [{"type": "text", "text": "Prefix", "cache_control": {"type": "ephemeral"}}]
+    assert "system" not in sent[1]
+    assert (service.timings[-1]["prompt_tokens"], service.timings[-1]["cached_tokens"]) == (1000, 950)
+
+
+def test_timing_stats_per_provider():
+    manager = AIManager.__new__(AIManager)
+    openai, local = OpenAIService("key"), LocalAIService()
+    openai.record_timing(latency=1.0, prompt_tokens=1000, cached_tokens=750)
+    openai.record_timing(latency=2.0, prompt_tokens=1000, cached_tokens=250)
+    local.record_timing(latency=3.0, ttft=0.5, prompt_tokens=800)
+    manager.services = {AIProvider.LOCAL: local, AIProvider.OPENAI: openai, AIProvider.ANTHROPIC: None}
+
+    assert manager.timing_stats() == {
+        "local": {"requests": 1, "avg_latency": 3.0, "avg_ttft": 0.5, "p50_ttft": 0.5, "cached_prompt_share": None},
+        "openai": {"requests": 2, "avg_latency": 1.5, "avg_ttft": None, "p50_ttft": None, "cached_prompt_share": 0.5},
+    }
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai import metrics, service
+from app.ai.metrics import mark_queued
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+
+class _Scheduler:
+    """Grants a slot after `wait` seconds of the fake clock"""
+
+    def __init__(self, clock, wait):
+        self.clock = clock
+        self.wait = wait
+
+    async def acquire(self, user_id):
+        self.clock.now += self.wait
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    clock = _Clock()
+    observed = []
+    monkeypatch.setattr(service, "time", SimpleNamespace(perf_counter=clock.perf_counter))
+    monkeypatch.setattr(metrics, "time", SimpleNamespace(perf_counter=clock.perf_counter))
+    monkeypatch.setattr(service, "fair_scheduler", _Scheduler(clock, wait=2.0))
+    monkeypatch.setattr(service.ai_metrics, "observe_queue_wait", observed.append)
+
+    manager = service.AIManager.__new__(service.AIManager)
+    manager.in_flight = 0
+
+    async def generate(prompt, preferred_provider=None, **kwargs):
+        return "text"
+
+    manager._generate_text = generate
+    return SimpleNamespace(manager=manager, clock=clock, observed=observed)
+
+
+@pytest.mark.asyncio
+async def test_direct_call_reports_scheduler_wait(manager):
+    assert await manager.manager.generate_text("prompt") == "text"
+
+    assert manager.observed == [2.0]
+
+
+@pytest.mark.asyncio
+async def test_queued_call_counts_scheduler_wait_once(manager):
+    # A job that sat in the job queue for 3 seconds, then waits 2 for a slot
+    mark_queued(3.0)
+
+    await manager.manager.generate_text("prompt")
+    await manager.manager.generate_text("prompt")
+
+    # The mark is taken by the first call only
+    assert manager.observed == [5.0, 2.0]
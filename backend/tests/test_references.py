@@ -0,0 +1,108 @@
+import pytest
+
+from app.campaigns import references
+from app.models import NPC, EntityReference, Event, Location, Organization, PlotHook
+
+
+def test_references_read_every_field_kind():
+    org = Organization(
+        name="Guild", leader_npc_id=1, headquarters_location_id=2,
+        notable_members=[1, "3", {"id": 4}, "x", True], allies=[5], enemies=[]
+    )
+
+    assert references.references(org) == [
+        ("allies", "organization", 5),
+        ("headquarters_location_id", "location", 2),
+        ("leader_npc_id", "npc", 1),
+        ("notable_members", "npc", 1),
+        ("notable_members", "npc", 3),
+        ("notable_members", "npc", 4),
+    ]
+
+
+def test_object_lists_resolve_their_own_target_types():
+    npc = NPC(name="Vex", relationships=[
+        {"target_id": 2, "target_type": "npc"},
+        {"target_id": 3, "target_type": "organization"},
+        {"target_id": 4},
+        {"target_id": 5, "target_type": "item"},
+        "garbage"
+    ])
+    event = Event(title="Heist", participants=[{"type": "npc", "id": 2}, {"type": "location", "id": "7"}])
+
+    assert references.references(npc) == [
+        ("relationships", "npc", 2), ("relationships", "npc", 4), ("relationships", "organization", 3)
+    ]
+    assert references.references(event) == [("participants", "location", 7), ("participants", "npc", 2)]
+
+
+def test_without_targets_drops_only_matching_entries():
+    relationships = [
+        {"target_id": 2, "target_type": "npc"},
+        {"target_id": 2, "target_type": "organization"},
+        {"target_id": 3}
+    ]
+
+    assert references.without_targets("relationships", relationships, "npc", {2, 3}) == [
+        {"target_id": 2, "target_type": "organization"}
+    ]
+    assert references.without_targets("ids", [1, "2", 3], "npc", {2}) == [1, 3]
+    assert references.without_targets("ids", None, "npc", {2}) is None
+
+
+def _index(db, campaign_id):
+    return {
+        (row.source_type, row.source_id, row.field, row.target_type, row.target_id)
+        for row in db.query(EntityReference).filter(EntityReference.campaign_id == campaign_id)
+    }
+
+
+def _assert_matches_rebuild(db, campaign_id):
+    maintained = _index(db, campaign_id)
+    references.rebuild(db, campaign_id)
+    assert maintained == _index(db, campaign_id)
+    db.rollback()
+
+
+@pytest.fixture
+def world(db, campaign_id):
+    tavern = Location(campaign_id=campaign_id, name="Tavern")
+    vex = NPC(campaign_id=campaign_id, name="Vex")
+    mira = NPC(campaign_id=campaign_id, name="Mira")
+    db.add_all([tavern, vex, mira])
+    db.flush()
+    vex.location_id = tavern.id
+    vex.relationships = [{"target_id": mira.id, "target_type": "npc"}]
+    hook = PlotHook(campaign_id=campaign_id, title="Missing cargo", related_npcs=[vex.id, mira.id], related_locations=[tavern.id])
+    db.add(hook)
+    db.commit()
+    return {"tavern": tavern, "vex": vex, "mira": mira, "hook": hook}
+
+
+def test_backlinks_group_fields_per_source(db, campaign_id, world):
+    links = references.backlinks(db, campaign_id, "npc", world["mira"].id)
+
+    assert links["total"] == 2
+    assert [(link["type"], link["name"], link["fields"]) for link in links["backlinks"]] == [
+        ("npc", "Vex", ["relationships"]),
+        ("plot_hook", "Missing cargo", ["related_npcs"])
+    ]
+    _assert_matches_rebuild(db, campaign_id)
+
+
+def test_updates_rewrite_a_sources_rows(db, campaign_id, world):
+    world["hook"].related_npcs = [world["vex"].id]
+    world["vex"].location_id = None
+    db.commit()
+
+    assert references.backlinks(db, campaign_id, "npc", world["mira"].id)["total"] == 1
+    assert references.backlinks(db, campaign_id, "location", world["tavern"].id)["backlinks"][0]["name"] == "Missing cargo"
+    _assert_matches_rebuild(db, campaign_id)
+
+
+def test_deleting_a_source_drops_its_rows(db, campaign_id, world):
+    db.delete(world["hook"])
+    db.commit()
+
+    assert not any(row[0] == "plot_hook" for row in _index(db, campaign_id))
+    _assert_matches_rebuild(db, campaign_id)
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from app.ai.embeddings import semantic_index
+from app.database import engine
+from app.models import EntityEmbedding
+
+
+@pytest.fixture
+def campaign_content(client, auth_headers, campaign_id):
+    base = f"/campaigns/{campaign_id}"
+    client.post(f"{base}/npcs/", json={
+        "name": "Vex", "occupation": "fence",
+        "background": "Runs a smuggling ring out of the docks, moving contraband past the harbor watch"
+    }, headers=auth_headers)
+    client.post(f"{base}/npcs/", json={
+        "name": "Captain Aldric", "occupation": "guard captain", "background": "Honest, stern, loyal to the crown"
+    }, headers=auth_headers)
+    client.post(f"{base}/locations/", json={
+        "name": "The Prancing Pony", "type": "tavern", "description": "A busy inn on the crossroads"
+    }, headers=auth_headers)
+    client.post(f"{base}/plot-hooks/", json={"title": "Hook"}, headers=auth_headers)
+
+
+def _search(client, headers, campaign_id, query):
+    response = client.get(f"/campaigns/{campaign_id}/search", params={"q": query, "mode": "semantic"}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _names(results):
+    return [result.get("name") or result.get("title") for category in results["results"].values() for result in category]
+
+
+def test_query_finds_related_content(client, auth_headers, campaign_id, campaign_content):
+    results = _search(client, auth_headers, campaign_id, "the guy who runs the smuggling ring")
+
+    assert _names(results) == ["Vex"]
+
+
+@pytest.mark.parametrize("query", ["smuggling", "xylophone", "dragon hoard"])
+def test_unrelated_content_is_left_out(client, auth_headers, campaign_id, campaign_content, query):
+    results = _search(client, auth_headers, campaign_id, query)
+
+    assert _names(results) == (["Vex"] if query == "smuggling" else [])
+
+
+def test_search_reflects_edits(client, auth_headers, campaign_id, campaign_content):
+    _search(client, auth_headers, campaign_id, "smuggling")
+    npcs = client.get(f"/campaigns/{campaign_id}/npcs/", headers=auth_headers).json()["items"]
+    aldric = next(npc for npc in npcs if npc["name"] == "Captain Aldric")
+    client.put(f"/campaigns/{campaign_id}/npcs/{aldric['id']}", json={"background": "Secretly takes bribes from smugglers"},
+               headers=auth_headers)
+
+    results = _search(client, auth_headers, campaign_id, "smuggling")
+
+    assert sorted(_names(results)) == ["Captain Aldric", "Vex"]
+
+
+def test_search_only_reads_and_vectors_are_stored_in_the_background(campaign_id, campaign_content, db):
+    writes = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn is db.connection() and not statement.lstrip().upper().startswith("SELECT"):
+            writes.append(statement)
+
+    async def search_then_wait():
+        matches = await semantic_index.search(db, campaign_id, "smuggling")
+        await semantic_index._updates[campaign_id]
+        return matches
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        matches = asyncio.run(search_then_wait())
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert len(matches["npcs"]) == 1
+    assert writes == []
+    db.rollback()
+    stored = db.query(EntityEmbedding).filter(EntityEmbedding.campaign_id == campaign_id).count()
+    assert stored == 4
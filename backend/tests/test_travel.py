@@ -0,0 +1,116 @@
+from collections import namedtuple
+
+import pytest
+
+from app.locations.travel import _CampaignRoutes, format_hours, parse_travel_time, travel_planner
+from app.models import Location, TravelRoute
+
+Route = namedtuple("Route", "id from_location_id to_location_id travel_hours distance difficulty one_way description")
+
+
+@pytest.mark.parametrize("text, hours", [
+    ("2 hours", 2.0),
+    ("1 day 4 hours", 28.0),
+    ("2-3 days", 60.0),
+    ("half a day", 12.0),
+    ("an hour", 1.0),
+    ("30 minutes", 0.5),
+    ("1.5 hrs by cart", 1.5),
+    (3, 3.0),
+    ("a short walk", None),
+    (None, None),
+])
+def test_parse_travel_time(text, hours):
+    assert parse_travel_time(text) == hours
+
+
+@pytest.mark.parametrize("hours, text", [
+    (0.75, "45 minutes"),
+    (1, "1 hour"),
+    (5, "5 hours"),
+    (24, "1 day"),
+    (26.5, "1 day, 2.5 hours"),
+    (48, "2 days"),
+])
+def test_format_hours(hours, text):
+    assert format_hours(hours) == text
+
+
+def _routes(*routes):
+    names = {location_id: f"L{location_id}" for route in routes for location_id in route[1:3]}
+    return _CampaignRoutes(names, [
+        Route(route_id, source, target, hours, None, None, one_way, None)
+        for route_id, (source, target, hours, one_way) in enumerate(routes, start=1)
+    ])
+
+
+def test_dijkstra_prefers_the_faster_detour():
+    # 1 -> 2 directly takes 10 hours, through 3 it takes 2 + 3
+    routes = _routes((1, 2, 10.0, False), (1, 3, 2.0, False), (3, 2, 3.0, False), (2, 4, 1.0, False))
+
+    hours, previous = routes.row(1)
+
+    assert hours == {1: 0.0, 3: 2.0, 2: 5.0, 4: 6.0}
+    assert previous[2] == (3, 3)
+    assert previous[4] == (2, 4)
+
+
+def test_one_way_routes_are_only_travelled_forwards():
+    routes = _routes((1, 2, 1.0, True))
+
+    assert routes.row(1)[0] == {1: 0.0, 2: 1.0}
+    assert routes.row(2)[0] == {2: 0.0}
+
+
+def test_routes_without_a_time_count_as_an_hour():
+    routes = _routes((1, 2, None, False))
+
+    assert routes.row(2)[0][1] == 1.0
+
+
+@pytest.fixture
+def road(db, campaign_id):
+    """Town - Fort - Shrine by road, and a slow forest path from Town to the Shrine"""
+    town, fort, shrine = (Location(campaign_id=campaign_id, name=name) for name in ("Town", "Fort", "Shrine"))
+    db.add_all([town, fort, shrine])
+    db.flush()
+    town.connected_locations = [
+        {"location_id": fort.id, "travel_time": "4 hours"},
+        {"location_id": shrine.id, "travel_time": "2 days", "description": "Forest path"}
+    ]
+    fort.connected_locations = [{"location_id": shrine.id, "distance": 6}]
+    db.commit()
+    return town, fort, shrine
+
+
+def test_routes_are_normalized_on_flush(db, road):
+    town, fort, shrine = road
+
+    rows = {(row.from_location_id, row.to_location_id): row.travel_hours for row in db.query(TravelRoute).filter(
+        TravelRoute.from_location_id.in_([town.id, fort.id]))}
+
+    # Six miles at walking pace is two hours
+    assert rows == {(town.id, fort.id): 4.0, (town.id, shrine.id): 48.0, (fort.id, shrine.id): 2.0}
+
+
+def test_planner_route_and_reachable(db, campaign_id, road):
+    town, fort, shrine = road
+
+    plan = travel_planner.route(db, campaign_id, shrine.id, town.id)
+
+    assert plan["total_hours"] == 6.0
+    assert plan["travel_time"] == "6 hours"
+    assert [(leg["from"]["name"], leg["to"]["name"]) for leg in plan["legs"]] == [("Shrine", "Fort"), ("Fort", "Town")]
+    assert [entry["name"] for entry in travel_planner.reachable(db, campaign_id, town.id, max_hours=5)] == ["Fort"]
+
+
+def test_planner_follows_route_changes(db, campaign_id, road):
+    town, fort, shrine = road
+    assert travel_planner.route(db, campaign_id, town.id, shrine.id)["total_hours"] == 6.0
+
+    town.connected_locations = [{"location_id": shrine.id, "travel_time": "1 hour"}]
+    db.commit()
+
+    plan = travel_planner.route(db, campaign_id, town.id, shrine.id)
+    assert plan["total_hours"] == 1.0
+    assert len(plan["legs"]) == 1
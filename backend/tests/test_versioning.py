@@ -0,0 +1,25 @@
+from app.campaigns.versioning import campaign_versions
+from app.models import AIJob, NPC
+
+
+def test_content_changes_bump_the_version(db, campaign_id):
+    before = campaign_versions.get(campaign_id)
+    db.add(NPC(campaign_id=campaign_id, name="Vex"))
+    db.commit()
+
+    assert campaign_versions.get(campaign_id) == before + 1
+
+
+def test_job_bookkeeping_leaves_the_version_alone(db, campaign_id):
+    npc = NPC(campaign_id=campaign_id, name="Vex")
+    db.add(npc)
+    db.commit()
+    before = campaign_versions.get(campaign_id)
+
+    job = AIJob(campaign_id=campaign_id, user_id=npc.campaign.user_id, kind="npc", status="queued", params={})
+    db.add(job)
+    db.commit()
+    job.status = "completed"
+    db.commit()
+
+    assert campaign_versions.get(campaign_id) == before
@@ -108,6 +108,38 @@ export const campaignAPI = {
             limit: limit.toString()
         });
         return apiRequest(`/campaigns/${campaignId}/search?${params}`);
+    },
+
+    async getDuplicates(campaignId, kind = null) {
+        const params = kind ? `?${new URLSearchParams({ kind })}` : '';
+        return apiRequest(`/campaigns/${campaignId}/duplicates${params}`);
+    },
+
+    async resolveEntities(campaignId, refs) {
+        // refs: [{ type: 'npc', id: 3 }, ...]; results come back in the same order
+        const params = new URLSearchParams({ refs: refs.map(ref => `${ref.type}:${ref.id}`).join(',') });
+        return apiRequest(`/campaigns/${campaignId}/resolve?${params}`);
+    },
+
+    async getGraph(campaignId, filters = {}) {
+        const params = new URLSearchParams(filters).toString();
+        return apiRequest(`/campaigns/${campaignId}/graph${params ? `?${params}` : ''}`);
+    },
+
+    async getGraphPath(campaignId, source, target, edgeTypes = null) {
+        const params = new URLSearchParams({ source, target });
+        if (edgeTypes) params.append('edge_types', edgeTypes);
+        return apiRequest(`/campaigns/${campaignId}/graph/path?${params}`);
+    },
+
+    async getGraphComponents(campaignId, filters = {}) {
+        const params = new URLSearchParams(filters).toString();
+        return apiRequest(`/campaigns/${campaignId}/graph/components${params ? `?${params}` : ''}`);
+    },
+
+    async getGraphCentrality(campaignId, filters = {}) {
+        const params = new URLSearchParams(filters).toString();
+        return apiRequest(`/campaigns/${campaignId}/graph/centrality${params ? `?${params}` : ''}`);
     }
 };
 
@@ -122,6 +154,11 @@ export const npcAPI = {
         return apiRequest(`/campaigns/${campaignId}/npcs/${npcId}`);
     },
 
+    async getNPCBundle(campaignId, npcId, include = null) {
+        const query = include ? `?include=${include}` : '';
+        return apiRequest(`/campaigns/${campaignId}/npcs/${npcId}/bundle${query}`);
+    },
+
     async createNPC(campaignId, npcData) {
         return apiRequest(`/campaigns/${campaignId}/npcs`, {
             method: 'POST',
@@ -136,8 +173,9 @@ export const npcAPI = {
         });
     },
 
-    async deleteNPC(campaignId, npcId) {
-        return apiRequest(`/campaigns/${campaignId}/npcs/${npcId}`, {
+    async deleteNPC(campaignId, npcId, mode = null) {
+        const query = mode ? `?mode=${mode}` : '';
+        return apiRequest(`/campaigns/${campaignId}/npcs/${npcId}${query}`, {
             method: 'DELETE'
         });
     },
@@ -151,6 +189,14 @@ export const npcAPI = {
             method: 'PUT',
             body: JSON.stringify(relationships)
         });
+    },
+
+    async getNPCBacklinks(campaignId, id) {
+        return apiRequest(`/campaigns/${campaignId}/npcs/${id}/backlinks`);
+    },
+
+    async getNPCDeleteImpact(campaignId, id) {
+        return apiRequest(`/campaigns/${campaignId}/npcs/${id}/delete-impact`);
     }
 };
 
@@ -165,6 +211,39 @@ export const locationAPI = {
         return apiRequest(`/campaigns/${campaignId}/locations/${locationId}`);
     },
 
+    async getLocationBundle(campaignId, locationId, include = null) {
+        const query = include ? `?include=${include}` : '';
+        return apiRequest(`/campaigns/${campaignId}/locations/${locationId}/bundle${query}`);
+    },
+
+    async getLocationTree(campaignId, params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return apiRequest(`/campaigns/${campaignId}/locations/tree${query ? `?${query}` : ''}`);
+    },
+
+    async planTravel(campaignId, fromId, toId) {
+        const params = new URLSearchParams({ from_id: fromId, to_id: toId });
+        return apiRequest(`/campaigns/${campaignId}/locations/travel/plan?${params}`);
+    },
+
+    async getLocationRoutes(campaignId, locationId) {
+        return apiRequest(`/campaigns/${campaignId}/locations/${locationId}/routes`);
+    },
+
+    async getReachableLocations(campaignId, locationId, maxHours = null) {
+        const params = maxHours ? `?${new URLSearchParams({ max_hours: maxHours })}` : '';
+        return apiRequest(`/campaigns/${campaignId}/locations/${locationId}/reachable${params}`);
+    },
+
+    async getLocationAncestors(campaignId, locationId) {
+        return apiRequest(`/campaigns/${campaignId}/locations/${locationId}/ancestors`);
+    },
+
+    async getLocationDescendants(campaignId, locationId, maxDepth = null) {
+        const params = maxDepth ? `?${new URLSearchParams({ max_depth: maxDepth })}` : '';
+        return apiRequest(`/campaigns/${campaignId}/locations/${locationId}/descendants${params}`);
+    },
+
     async createLocation(campaignId, locationData) {
         return apiRequest(`/campaigns/${campaignId}/locations`, {
             method: 'POST',
@@ -179,14 +258,23 @@ export const locationAPI = {
         });
     },
 
-    async deleteLocation(campaignId, locationId) {
-        return apiRequest(`/campaigns/${campaignId}/locations/${locationId}`, {
+    async deleteLocation(campaignId, locationId, mode = null) {
+        const query = mode ? `?mode=${mode}` : '';
+        return apiRequest(`/campaigns/${campaignId}/locations/${locationId}${query}`, {
             method: 'DELETE'
         });
     },
 
     async getLocationTemplateFields(campaignId) {
         return apiRequest(`/campaigns/${campaignId}/locations/templates/fields`);
+    },
+
+    async getLocationBacklinks(campaignId, id) {
+        return apiRequest(`/campaigns/${campaignId}/locations/${id}/backlinks`);
+    },
+
+    async getLocationDeleteImpact(campaignId, id) {
+        return apiRequest(`/campaigns/${campaignId}/locations/${id}/delete-impact`);
     }
 };
 
@@ -201,6 +289,11 @@ export const plotHookAPI = {
         return apiRequest(`/campaigns/${campaignId}/plot-hooks/${hookId}`);
     },
 
+    async getPlotHookBundle(campaignId, hookId, include = null) {
+        const query = include ? `?include=${include}` : '';
+        return apiRequest(`/campaigns/${campaignId}/plot-hooks/${hookId}/bundle${query}`);
+    },
+
     async createPlotHook(campaignId, hookData) {
         return apiRequest(`/campaigns/${campaignId}/plot-hooks`, {
             method: 'POST',
@@ -237,6 +330,11 @@ export const itemAPI = {
         return apiRequest(`/campaigns/${campaignId}/items/${itemId}`);
     },
 
+    async getItemBundle(campaignId, itemId, include = null) {
+        const query = include ? `?include=${include}` : '';
+        return apiRequest(`/campaigns/${campaignId}/items/${itemId}/bundle${query}`);
+    },
+
     async createItem(campaignId, itemData) {
         return apiRequest(`/campaigns/${campaignId}/items`, {
             method: 'POST',
@@ -273,6 +371,11 @@ export const eventAPI = {
         return apiRequest(`/campaigns/${campaignId}/events/${eventId}`);
     },
 
+    async getEventBundle(campaignId, eventId, include = null) {
+        const query = include ? `?include=${include}` : '';
+        return apiRequest(`/campaigns/${campaignId}/events/${eventId}/bundle${query}`);
+    },
+
     async createEvent(campaignId, eventData) {
         return apiRequest(`/campaigns/${campaignId}/events`, {
             method: 'POST',
@@ -343,6 +446,11 @@ export const organizationAPI = {
         return apiRequest(`/campaigns/${campaignId}/organizations/${organizationId}`);
     },
 
+    async getOrganizationBundle(campaignId, organizationId, include = null) {
+        const query = include ? `?include=${include}` : '';
+        return apiRequest(`/campaigns/${campaignId}/organizations/${organizationId}/bundle${query}`);
+    },
+
     async createOrganization(campaignId, organizationData) {
         return apiRequest(`/campaigns/${campaignId}/organizations`, {
             method: 'POST',
@@ -357,14 +465,28 @@ export const organizationAPI = {
         });
     },
 
-    async deleteOrganization(campaignId, organizationId) {
-        return apiRequest(`/campaigns/${campaignId}/organizations/${organizationId}`, {
+    async deleteOrganization(campaignId, organizationId, mode = null) {
+        const query = mode ? `?mode=${mode}` : '';
+        return apiRequest(`/campaigns/${campaignId}/organizations/${organizationId}${query}`, {
             method: 'DELETE'
         });
     },
 
     async getOrganizationTemplateFields() {
         return apiRequest('/campaigns/0/organizations/templates/fields');
+    },
+
+    async getOrganizationBacklinks(campaignId, id) {
+        return apiRequest(`/campaigns/${campaignId}/organizations/${id}/backlinks`);
+    },
+
+    async getOrganizationDeleteImpact(campaignId, id) {
+        return apiRequest(`/campaigns/${campaignId}/organizations/${id}/delete-impact`);
+    },
+
+    async getFactionNetwork(campaignId, limit = null) {
+        const query = limit !== null ? `?limit=${limit}` : '';
+        return apiRequest(`/campaigns/${campaignId}/organizations/network${query}`);
     }
 };
 
@@ -428,6 +550,30 @@ export const aiAPI = {
         });
     },
 
+    async generateBatch(campaignId, kind, count, options = {}) {
+        return apiRequest(`/ai/generate/batch/${campaignId}`, {
+            method: 'POST',
+            body: JSON.stringify({ kind, count, ...options })
+        });
+    },
+
+    async submitJob(campaignId, kind, options = {}) {
+        return apiRequest(`/ai/jobs/${campaignId}`, {
+            method: 'POST',
+            body: JSON.stringify({ kind, ...options })
+        });
+    },
+
+    async getJob(jobId, wait = 0) {
+        return apiRequest(`/ai/jobs/${jobId}?wait=${wait}`);
+    },
+
+    async cancelJob(jobId) {
+        return apiRequest(`/ai/jobs/${jobId}`, {
+            method: 'DELETE'
+        });
+    },
+
     async updateAPIKeys(keys) {
         return apiRequest('/ai/update-keys', {
             method: 'POST',